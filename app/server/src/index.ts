@@ -39,7 +39,7 @@ app.get('/api/episodes', async (c) => {
       if (orderByLastName) {
         episodes = await sql<ProgramListItem[]>`
           SELECT id, title, guest, air_date, summary, book_title
-          FROM programs
+          FROM program_list
           WHERE guest ILIKE ${searchPattern} OR title ILIKE ${searchPattern}
           ORDER BY SPLIT_PART(guest, ' ', -1) ASC, guest ASC
           LIMIT ${limit} OFFSET ${offset}
@@ -47,14 +47,14 @@ app.get('/api/episodes', async (c) => {
       } else {
         episodes = await sql<ProgramListItem[]>`
           SELECT id, title, guest, air_date, summary, book_title
-          FROM programs
+          FROM program_list
           WHERE guest ILIKE ${searchPattern} OR title ILIKE ${searchPattern}
           ORDER BY air_date DESC
           LIMIT ${limit} OFFSET ${offset}
         `;
       }
       const countResult = await sql`
-        SELECT COUNT(*) as count FROM programs
+        SELECT COUNT(*) as count FROM program_list
         WHERE guest ILIKE ${searchPattern} OR title ILIKE ${searchPattern}
       `;
       total = parseInt(countResult[0].count);
@@ -62,19 +62,19 @@ app.get('/api/episodes', async (c) => {
       if (orderByLastName) {
         episodes = await sql<ProgramListItem[]>`
           SELECT id, title, guest, air_date, summary, book_title
-          FROM programs
+          FROM program_list
           ORDER BY SPLIT_PART(guest, ' ', -1) ASC, guest ASC
           LIMIT ${limit} OFFSET ${offset}
         `;
       } else {
         episodes = await sql<ProgramListItem[]>`
           SELECT id, title, guest, air_date, summary, book_title
-          FROM programs
+          FROM program_list
           ORDER BY air_date DESC
           LIMIT ${limit} OFFSET ${offset}
         `;
       }
-      const countResult = await sql`SELECT COUNT(*) as count FROM programs`;
+      const countResult = await sql`SELECT COUNT(*) as count FROM program_list`;
       total = parseInt(countResult[0].count);
     }
 
@@ -97,7 +97,7 @@ app.get('/api/episodes/random', async (c) => {
   try {
     const results = await sql<ProgramListItem[]>`
       SELECT id, title, guest, air_date, summary, book_title
-      FROM programs
+      FROM program_list
       ORDER BY RANDOM()
       LIMIT 1
     `;
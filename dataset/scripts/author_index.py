@@ -1,118 +1,41 @@
-import logging
-import string
-from typing import Literal
-from urllib.parse import urljoin
+import argparse
 
 import polars as pl
-import ray
-import requests
-from bs4 import BeautifulSoup
-from pydantic import BaseModel
 
-from cspan_booknotes.models import ProgramId
-from cspan_booknotes.models.fields import ProgramTitle
-
-ray.init(log_to_driver=False, logging_level=logging.CRITICAL)
-
-AUTHOR_INDEX_URL = "https://booknotes.c-span.org/AuthorIndex/"
-
-DEFAULT_HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
-}
+from cspan_booknotes.author_index import AUTHOR_INDEX_PAGE_URLS, parse_author_index_page
+from cspan_booknotes.executors import EXECUTOR_BACKENDS, get_executor
+from cspan_booknotes.fetch import fetch_pages
 
 OUTPUT_FILEPATH = "data/author_index.parquet"
 
+## -- WHERE INDEX PAGES ARE PARSED: "serial", "thread", "process" OR "ray" ("auto"
+## -- PICKS ONE FROM THE NUMBER OF PAGES); OVERRIDE WITH --executor AND --workers
+EXECUTOR: str = "auto"
+MAX_WORKERS: int | None = None
 
-AlphaIndexSchema = Literal[
-    "A",
-    "B",
-    "C",
-    "D",
-    "E",
-    "F",
-    "G",
-    "H",
-    "I",
-    "J",
-    "K",
-    "L",
-    "M",
-    "N",
-    "O",
-    "P",
-    "Q",
-    "R",
-    "S",
-    "T",
-    "U",
-    "V",
-    "W",
-    "X",
-    "Y",
-    "Z",
-]
-
-
-class AuthorIndexEntry(BaseModel):
-    program_id: ProgramId
-    program_path: str
-    author_name: str
-    program_title: ProgramTitle
-
-
-def process_index_entry(index_entry) -> dict:
-    ## -- get path
-    program_path = (
-        index_entry.find("td", class_="aLinkItem")
-        .find("a", class_="aLinkItem")
-        .get("href")
-    )
-
-    ## -- extract id from path
-    program_id = program_path.split("/")[-1]
-
-    ## -- get author name
-    author_name = index_entry.find("td", class_="aLinkItem").get_text(
-        strip=True, separator=" "
-    )
-
-    ## -- get program title
-    program_title = index_entry.find("a", class_="pLinkItem").get_text()
-
-    return AuthorIndexEntry(
-        program_id=program_id,
-        program_path=program_path,
-        author_name=author_name,
-        program_title=program_title,
-    ).model_dump()
-
-
-@ray.remote
-def get_author_index(url: str, headers: dict = DEFAULT_HEADERS) -> list[dict]:
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.content, features="lxml")
 
-    ## -- get all entry tags
-    entry_tags = soup.find_all("tr", {"class": "rowStyl"})
-
-    return [process_index_entry(entry) for entry in entry_tags]
-
-
-def main():
+def main(executor: str = EXECUTOR, max_workers: int | None = MAX_WORKERS):
     ## -- start with letter 'A'
-    all_index_page_urls = [
-        urljoin(AUTHOR_INDEX_URL, letter) for letter in string.ascii_uppercase
-    ]
+    all_index_page_urls = AUTHOR_INDEX_PAGE_URLS
 
     print(
         f"Author index organized alphabetically. Collecting and processing {len(all_index_page_urls)} pages in parallel."
     )
 
-    ## -- get all author index entries
-    author_index_entries = ray.get(
-        [get_author_index.remote(url) for url in all_index_page_urls]
-    )
+    ## -- download all index pages over a shared connection pool
+    index_pages = fetch_pages(all_index_page_urls)
+
+    ## -- get all author index entries (in page order, so the output is the same every run)
+    with get_executor(
+        executor, num_tasks=len(index_pages), max_workers=max_workers
+    ) as task_executor:
+        author_index_entries = list(
+            task_executor.map(
+                parse_author_index_page,
+                [page["content"] for page in index_pages],
+                ordered=True,
+            )
+        )
 
     ## -- flatten list of lists
     author_index_entries = [
@@ -131,4 +54,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--executor", choices=EXECUTOR_BACKENDS, default=EXECUTOR)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+    main(executor=args.executor, max_workers=args.workers)
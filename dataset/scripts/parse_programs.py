@@ -1,21 +1,33 @@
-import json
-import logging
+import argparse
 import os
 from pathlib import Path
+from typing import Literal
 from urllib.parse import urljoin
 
 import polars as pl
-import ray
-from bs4 import BeautifulSoup
+import pyarrow as pa
 from tqdm import tqdm
 
-from cspan_booknotes import get_program_page
+from cspan_booknotes.archive import HtmlArchive
+from cspan_booknotes.cache import HtmlCache
 from cspan_booknotes.constants import ROOT_URL
-from cspan_booknotes.get import PageContent
-from cspan_booknotes.parser import ProgramParser
-
-ray.init(log_to_driver=False, logging_level=logging.CRITICAL)
-
+from cspan_booknotes.executors import EXECUTOR_BACKENDS, get_executor
+from cspan_booknotes.fetch import NOT_MODIFIED, fetch_pages
+from cspan_booknotes.fragments import FragmentCache
+from cspan_booknotes.get import PageContent, ParserBackend, build_html
+from cspan_booknotes.manifest import RunManifest, parsed_digest
+from cspan_booknotes.models.schema import stamp_program
+from cspan_booknotes.parser import get_parser
+from cspan_booknotes.parser.parity import parse_with_parity
+from cspan_booknotes.parser.program_id import get_program_id
+from cspan_booknotes.quarantine import (
+    QuarantineRecord,
+    QuarantineStore,
+    quarantine_record,
+)
+from cspan_booknotes.rate import AdaptiveRateController
+from cspan_booknotes.retry import call_with_retries
+from cspan_booknotes.store import PARSED_PROGRAM_ARROW_SCHEMA, ParsedProgramStore
 
 AUTHOR_INDEX_FILEPATH = "data/author_index.parquet"
 
@@ -29,68 +41,240 @@ PROJECT_ROOT = Path(
 HTML_CACHE_DIR = PROJECT_ROOT / "data" / "html_cache"
 os.makedirs(HTML_CACHE_DIR, exist_ok=True)
 
+HTML_ARCHIVE_PATH = PROJECT_ROOT / "data" / "html_cache.pack"
+
+## -- HOW RAW RESPONSES ARE CACHED: ONE PACKED, MEMORY-MAPPED ARCHIVE FILE ("archive")
+## -- OR ONE FILE PER RESPONSE ("directory"); BOTH ZSTD-COMPRESSED, CONTENT-ADDRESSED
+HTML_CACHE_FORMAT: Literal["archive", "directory"] = "archive"
+
+HTML_STORE: HtmlArchive | HtmlCache = (
+    HtmlArchive(HTML_ARCHIVE_PATH)
+    if HTML_CACHE_FORMAT == "archive"
+    else HtmlCache(HTML_CACHE_DIR)
+)
+
+## -- ONLY CACHE THE PAGE REGIONS THE PARSERS READ (KEYED BY SELECTOR VERSION, SO
+## -- CHANGING A PARSER SELECTOR INVALIDATES THEM) INSTEAD OF WHOLE PAGES
+CACHE_FRAGMENTS_ONLY: bool = False
+
+## -- SHARE OF PROGRAMS THAT ALSO KEEP THEIR FULL PAGE IN FRAGMENT MODE (FOR DEBUGGING)
+FULL_PAGE_SAMPLE_RATE: float = 0.01
+
+HTML_CACHE: HtmlArchive | HtmlCache | FragmentCache = (
+    FragmentCache(HTML_STORE, full_page_sample_rate=FULL_PAGE_SAMPLE_RATE)
+    if CACHE_FRAGMENTS_ONLY
+    else HTML_STORE
+)
+
+
+## -- PARSED PROGRAMS ARE APPENDED TO A CHUNKED ARROW IPC STORE (INDEXED BY PROGRAM ID)
+PARSED_STORE_DIR = PROJECT_ROOT / "data" / "parsed_programs"
+PARSED_STORE = ParsedProgramStore(PARSED_STORE_DIR)
+
+## -- RUN MANIFEST (PER PROGRAM: PAGE DIGEST, PARSER VERSION AND PARSED DIGEST); PROGRAMS
+## -- ARE ONLY RE-PARSED WHEN THEIR CACHED PAGE OR THE PARSER CODE CHANGED
+MANIFEST_PATH = PROJECT_ROOT / "data" / "manifest.json"
+MANIFEST = RunManifest(MANIFEST_PATH)
 
-PARSED_PROGRAM_DIR = PROJECT_ROOT / "data" / "programs"
-os.makedirs(PARSED_PROGRAM_DIR, exist_ok=True)
+## -- PROGRAMS WHOSE PAGE COULD NOT BE FETCHED OR PARSED (AFTER RETRIES), WITH THE ERROR,
+## -- FIELD AND A PAGE SNIPPET; SKIPPED UNTIL THEIR PAGE OR THE PARSER CHANGES
+QUARANTINE_PATH = PROJECT_ROOT / "data" / "quarantine.json"
+QUARANTINE = QuarantineStore(QUARANTINE_PATH)
 
 ## -- NUMBER OF CONCURRENT STORES FOR READING JSON FILES
 NUM_STORES: int = 4
 
+## -- WHERE PARSE TASKS RUN: "serial", "thread", "process" OR "ray" ("auto" PICKS ONE
+## -- FROM THE NUMBER OF PAGES TO PARSE); OVERRIDE WITH --executor AND --workers
+EXECUTOR: str = "auto"
+MAX_WORKERS: int | None = None
 
-def read_html_from_file(filepath) -> BeautifulSoup:
-    """Read HTML content from a local file."""
-    with open(filepath, "r") as f:
-        page_content = f.read()
-    return BeautifulSoup(page_content, "lxml")
+## -- TREE BUILDER USED FOR PARSING PAGES ("bs4" OR "lxml")
+PARSER_BACKEND: ParserBackend = "bs4"
 
+## -- PARSE EVERY PAGE WITH ALL BACKENDS AND FAIL WHEN THEY DISAGREE
+PARITY_MODE: bool = False
 
-def save_to_json(data: dict, filepath: str) -> None:
-    with open(filepath, "w") as outfile:
-        json.dump(data, outfile)
-        outfile.close()
+## -- ONLY BUILD THE PAGE REGIONS THE PARSER READS ("bs4" BACKEND ONLY)
+PARTIAL_PARSE: bool = False
 
+## -- MAX NUMBER OF CONCURRENT REQUESTS WHEN DOWNLOADING UNCACHED PAGES
+FETCH_CONCURRENCY: int = 8
 
-@ray.remote
-def parse_program_webpage(url: str) -> None:
-    parser = ProgramParser()
-    program_id = parser.get_program_id(url)
+## -- ADAPT CONCURRENCY TO 429/5xx RESPONSES AND LATENCY (UP TO FETCH_CONCURRENCY)
+ADAPTIVE_RATE: bool = True
 
-    ## -- set output path for parsed data
-    parsed_output_path = os.path.join(PARSED_PROGRAM_DIR, f"{program_id}.json")
+## -- MAX REQUESTS PER SECOND SENT TO THE ORIGIN (None FOR NO LIMIT)
+MAX_REQUESTS_PER_SECOND: float | None = 5.0
 
-    ## -- check if parsed data already exists
-    if os.path.exists(parsed_output_path):
-        return
+## -- REVALIDATE CACHED PAGES WITH CONDITIONAL GETS (UNCHANGED PAGES AREN'T RE-PARSED)
+REFRESH_CACHE: bool = False
+
+
+def fetch_pages_to_cache(urls: list[str]) -> None:
+    """Download pages missing from the html cache over a shared connection pool.
 
-    ## -- check if html already downloaded in cache
-    html_cache_path = os.path.join(HTML_CACHE_DIR, f"{program_id}.html")
-    if os.path.exists(html_cache_path):
-        html = read_html_from_file(html_cache_path)
-        page_content = PageContent(url=url, html=html)
+    With `REFRESH_CACHE`, cached pages are revalidated with conditional GETs
+    as well; pages whose content changed are dropped from the parsed store so
+    they are parsed again.
+    """
+    if REFRESH_CACHE:
+        fetch_urls = urls
     else:
-        ## -- download and cache html content
-        page_content = get_program_page(url)
-        try:
-            with open(html_cache_path, "w") as f:
-                f.write(str(page_content["html"]))
-        except Exception as e:
-            raise ValueError(f"Error caching HTML for {url}: {e}. CWD: {os.getcwd()}")
-
-    ## -- parse program html
-    try:
-        program_object = parser.parse(page_content)
-    except Exception as e:
-        raise ValueError(f"Error parsing program '{program_id}' HTML for {url}: {e}")
-
-    ## -- convert to dictionary
-    program_data = program_object.model_dump()
-
-    ## -- save as json to disk
-    save_to_json(program_data, parsed_output_path)
-    return
+        fetch_urls = [
+            url
+            for url in urls
+            if get_program_id(url) not in PARSED_STORE
+            and get_program_id(url) not in HTML_CACHE
+        ]
+    if not fetch_urls:
+        return
+
+    request_headers = {
+        url: HTML_CACHE.conditional_headers(get_program_id(url)) for url in fetch_urls
+    }
+
+    print(f"Fetching {len(fetch_urls)} program pages...")
+    controller = (
+        AdaptiveRateController(
+            max_window=FETCH_CONCURRENCY, rate_limit=MAX_REQUESTS_PER_SECOND
+        )
+        if ADAPTIVE_RATE
+        else None
+    )
+    results = fetch_pages(
+        fetch_urls,
+        return_exceptions=True,
+        request_headers=request_headers,
+        max_concurrency=FETCH_CONCURRENCY,
+        controller=controller,
+    )
+    if controller is not None:
+        print(f"Crawl rate metrics: {controller.metrics()}")
+
+    num_not_modified = num_changed = 0
+    for url, result in zip(fetch_urls, results):
+        ## -- failed pages are retried by the parse task itself
+        if isinstance(result, BaseException):
+            print(f"Failed to download {url}: {result!r}")
+            continue
+
+        program_id = get_program_id(url)
+        if result["status"] == NOT_MODIFIED:
+            HTML_CACHE.touch(program_id, result)
+            num_not_modified += 1
+            continue
 
+        previous = HTML_CACHE.get_metadata(program_id)
+        cached = HTML_CACHE.put(program_id, result)
 
-def main():
+        ## -- content changed since the last crawl: parse it again
+        if previous is not None and previous["digest"] != cached["digest"]:
+            num_changed += 1
+            PARSED_STORE.discard(program_id)
+
+    print(f"Pages not modified: {num_not_modified}, changed: {num_changed}")
+
+    if isinstance(HTML_STORE, HtmlArchive):
+        HTML_STORE.flush_index()
+
+
+## -- parse task results: parsed programs plus what the manifest records about them
+PARSE_RESULT_SCHEMA = PARSED_PROGRAM_ARROW_SCHEMA.append(
+    pa.field("html_digest", pa.string())
+).append(pa.field("parsed_digest", pa.string()))
+
+
+def cached_html_digest(program_id: str) -> str | None:
+    metadata = HTML_CACHE.get_metadata(program_id)
+    return None if metadata is None else metadata["digest"]
+
+
+def load_program_page(url: str) -> tuple[bytes, str]:
+    """Raw page (and its digest) from the html cache, downloading and caching
+    it when missing."""
+    program_id = get_program_id(url)
+    html_content = HTML_CACHE.get_content(program_id)
+    if html_content is not None:
+        return html_content, cached_html_digest(program_id)
+
+    result = fetch_pages([url])[0]
+    return result["content"], HTML_CACHE.put(program_id, result)["digest"]
+
+
+def parse_program_page(url: str, html_content: bytes) -> dict:
+    """Parse (and validate) a program page; parser errors are raised as-is
+    (e.g. a `FieldNotFoundError` naming the missing field)."""
+    if PARITY_MODE:
+        program_object, diffs = parse_with_parity(url, html_content)
+        if diffs:
+            raise ValueError(f"parser backends disagree on {sorted(diffs)}")
+    else:
+        html = build_html(html_content, backend=PARSER_BACKEND, partial=PARTIAL_PARSE)
+        program_object = get_parser(PARSER_BACKEND).parse(
+            PageContent(url=url, html=html)
+        )
+
+    ## -- convert to dictionary (stamped with the schema it was validated against)
+    return stamp_program(program_object)
+
+
+def parse_program_webpage(url: str) -> tuple[dict, str]:
+    html_content, html_digest = load_program_page(url)
+    return parse_program_page(url, html_content), html_digest
+
+
+def parse_program_webpages(
+    urls: list[str],
+) -> tuple[pa.RecordBatch, list[QuarantineRecord]]:
+    """Parse a batch of pages into one record batch of parsed programs (plus
+    their `html_digest` and `parsed_digest`); the driver appends it to the
+    parsed store as-is and records it in the manifest.
+
+    Pages are retried as their failure's retry policy allows; pages that
+    still fail are returned as quarantine records instead of failing the
+    batch.
+    """
+    programs = []
+    failures = []
+    for url in urls:
+        program_id = get_program_id(url)
+        loaded = call_with_retries(load_program_page, url)
+        if loaded.error is not None:
+            failures.append(
+                quarantine_record(
+                    program_id, url, "fetch", loaded.error, loaded.attempts
+                )
+            )
+            continue
+
+        html_content, html_digest = loaded.result
+        parsed = call_with_retries(parse_program_page, url, html_content)
+        if parsed.error is not None:
+            failures.append(
+                quarantine_record(
+                    program_id,
+                    url,
+                    "parse",
+                    parsed.error,
+                    parsed.attempts,
+                    html=html_content,
+                    html_digest=html_digest,
+                )
+            )
+            continue
+
+        programs.append(
+            {
+                **parsed.result,
+                "html_digest": html_digest,
+                "parsed_digest": parsed_digest(parsed.result),
+            }
+        )
+    return pa.RecordBatch.from_pylist(programs, schema=PARSE_RESULT_SCHEMA), failures
+
+
+def main(executor: str = EXECUTOR, max_workers: int | None = MAX_WORKERS):
     ## -- read author index file
     df = pl.read_parquet(AUTHOR_INDEX_FILEPATH)
     print(f"Loaded {len(df)} index entries from '{AUTHOR_INDEX_FILEPATH}'")
@@ -101,34 +285,88 @@ def main():
     ]
     print(f"Example program URLs: {program_page_urls[:3]}")
 
-    all_program_results = []
-    futures = [parse_program_webpage.remote(url) for url in program_page_urls]
-
-    progress_bar = tqdm(
-        total=len(program_page_urls), desc="Processing parsed programs..."
+    ## -- download uncached pages up front so parse tasks only do cpu work
+    fetch_pages_to_cache(program_page_urls)
+
+    ## -- only parse programs that aren't in the parsed store yet, or whose cached
+    ## -- page or parser code changed since they were parsed
+    unparsed_urls = [
+        url
+        for url in program_page_urls
+        if get_program_id(url) not in PARSED_STORE
+        or MANIFEST.needs_parse(
+            get_program_id(url), cached_html_digest(get_program_id(url))
+        )
+    ]
+    print(
+        f"Programs unchanged since last parse: {len(program_page_urls) - len(unparsed_urls)}"
     )
 
-    while futures:
-        ## -- wait for first task to complete
-        ready, futures = ray.wait(futures, num_returns=1)
-
-        # -- get results from completed tasks
-        for future in ready:
-            result = ray.get(future)
-            all_program_results.append(result)
-            progress_bar.update(1)
-            progress_bar.set_postfix(completed=len(all_program_results))
+    ## -- skip quarantined programs that would fail the same way again
+    num_unparsed = len(unparsed_urls)
+    unparsed_urls = [
+        url
+        for url in unparsed_urls
+        if not QUARANTINE.should_skip(
+            get_program_id(url), cached_html_digest(get_program_id(url))
+        )
+    ]
+    num_skipped = num_unparsed - len(unparsed_urls)
+
+    num_parsed = 0
+    progress_bar = tqdm(total=len(unparsed_urls), desc="Processing parsed programs...")
+
+    with get_executor(
+        executor, num_tasks=len(unparsed_urls), max_workers=max_workers
+    ) as task_executor:
+        print(
+            f"Parsing {len(unparsed_urls)} programs on the '{task_executor.backend}' executor"
+        )
+        ## -- one task per (adaptively sized) batch of pages, with a bounded number
+        ## -- of tasks in flight; each result is a record batch of parsed programs
+        for batch, failures in task_executor.map_batches(
+            parse_program_webpages, unparsed_urls
+        ):
+            if batch.num_rows:
+                PARSED_STORE.put_batch(batch)
+            for program_id, html_digest, digest in zip(
+                batch.column("id").to_pylist(),
+                batch.column("html_digest").to_pylist(),
+                batch.column("parsed_digest").to_pylist(),
+            ):
+                MANIFEST.record_parse(program_id, html_digest, digest)
+                QUARANTINE.release(program_id)
+            ## -- failed pages don't stop the run; they're reported at the end
+            for record in failures:
+                QUARANTINE.add(record)
+            num_parsed += batch.num_rows
+            progress_bar.update(batch.num_rows + len(failures))
 
     progress_bar.close()
-    ray.shutdown()
+
+    ## -- write the remaining buffered programs to the store
+    PARSED_STORE.close()
+    MANIFEST.save()
+    QUARANTINE.save()
+
+    ## -- run summary
+    print(
+        f"Parsed: {num_parsed}, quarantined: {len(set(QUARANTINE.added))},"
+        f" skipped (quarantined, unchanged): {num_skipped}"
+    )
+    print(QUARANTINE.summary())
 
     ## -- check total results parsed
-    num_parsed_programs = len(os.listdir(PARSED_PROGRAM_DIR))
-    num_webpages_cached = len(os.listdir(HTML_CACHE_DIR))
+    num_parsed_programs = len(PARSED_STORE)
+    num_webpages_cached = len(HTML_CACHE.program_ids())
     print(f"Total programs parsed: {num_parsed_programs}/{len(program_page_urls)}")
     print(f"Total webpages cached: {num_webpages_cached}/{len(program_page_urls)}")
     return
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--executor", choices=EXECUTOR_BACKENDS, default=EXECUTOR)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+    main(executor=args.executor, max_workers=args.workers)
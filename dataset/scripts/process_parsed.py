@@ -1,225 +1,329 @@
 """
 This script flattens the collected and parsed programs data
-(stored in individual JSON files via `scripts/parse_programs.py`).
+(stored in the parsed program store via `scripts/parse_programs.py`).
 The result is multiple parquet files, including program metadata,
 transcript entries, and related programs.
 """
 
-import json
-import logging
 import os
-from datetime import datetime
-from typing import Literal, TypedDict
 
 import polars as pl
-import ray
-from obstore.store import LocalStore
 from tqdm import tqdm
 
+from cspan_booknotes.flatten import FLAT_DATASET_SCHEMAS, flatten_parsed_programs
+from cspan_booknotes.layout import DATASET_LAYOUTS, patch_with_layout
+from cspan_booknotes.manifest import FLATTEN_VERSION, RunManifest
 from cspan_booknotes.models.program import Program
-
-ray.init(log_to_driver=False, logging_level=logging.CRITICAL)
-
-
-## -- LOCAL INPUT DIRECTORY CONTAINING PARSED JSON FILES (OUTPUT OF scripts/parse_programs.py)
-PARSED_DIR = "data/programs"
-
-## -- MAX NUMBER OF CONCURRENT TASKS FOR FLATTENING JOB
-MAX_CONCURRENT: int = 10
+from cspan_booknotes.models.schema import (
+    SCHEMA_FINGERPRINT,
+    SCHEMA_FINGERPRINT_KEY,
+    load_program_data,
+)
+from cspan_booknotes.partition import (
+    PartitionScheme,
+    partition_keys,
+    patch_partitioned,
+)
+from cspan_booknotes.publish import (
+    PublishOptions,
+    dataset_data_files,
+    publish_datasets,
+    write_hf_repo_config,
+)
+from cspan_booknotes.quarantine import QuarantineStore, quarantine_record
+from cspan_booknotes.sink import ParquetDatasetSink
+from cspan_booknotes.store import ParsedProgramStore
+
+## -- LOCAL PARSED PROGRAM STORE (OUTPUT OF scripts/parse_programs.py)
+PARSED_STORE_DIR = "data/parsed_programs"
+
+## -- LEGACY DIRECTORY OF ONE JSON FILE PER PARSED PROGRAM (IMPORTED INTO THE STORE)
+LEGACY_PARSED_DIR = "data/programs"
 
 ## -- LOCAL OUTPUT DIRECTORY FOR FLATTENED DATA
 PROCESSED_DIR = "data/processed"
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-## -- NUMBER OF CONCURRENT STORES FOR READING JSON FILES
-NUM_STORES: int = 4
-
-TEST_MODE: bool = False
-
-
-def read_program(filepath: str) -> Program:
-    with open(filepath, "r") as f:
-        data = json.load(f)
-    return Program(**data)
-
-
-## --------------------------------------------------------- ##
-## ---- DEFINE ROW-LEVEL SCHEMA FOR FINAL FLAT DATASETS ---- ##
-## --------------------------------------------------------- ##
-
+## -- ROWS PER PARQUET ROW GROUP, AND MAX MEGABYTES OF ROWS BUFFERED BEFORE WRITING
+## -- (PROGRAMS ARE FLATTENED AND WRITTEN ONE STORE BATCH AT A TIME, AND THE LAYOUT
+## -- REWRITE READS ROWS BACK IN SORTED CHUNKS OF THIS SIZE)
+ROW_GROUP_SIZE: int = 64 * 1024
+MAX_BUFFER_MB: int = 256
 
-class ProgramRow(TypedDict):
-    program_id: str
-    guest: str
-    title: str
-    air_date: datetime
-    description: str | None
-    book_isbn: str | None
-    url: str
+## -- REWRITE THE PARQUET FILES SORTED, WITH PAGE INDEXES AND BLOOM FILTERS
+## -- (SEE `cspan_booknotes.layout`) SO READERS CAN PRUNE BY PROGRAM ID / AIR DATE
+OPTIMIZE_LAYOUT: bool = True
 
+## -- SHARD THESE DATASETS INTO HIVE PARTITIONS (`<name>/<scheme>=<value>/part-0.parquet`)
+## -- BY "air_year" OR "program_bucket" (NUM_BUCKETS HASH BUCKETS OF THE PROGRAM ID);
+## -- None WRITES ONE FILE PER DATASET
+PARTITION_BY: PartitionScheme | None = None
+NUM_BUCKETS: int = 16
+PARTITIONED_DATASETS: tuple[str, ...] = ("programs", "transcripts")
 
-class TranscriptEntryRow(TypedDict):
-    program_id: str
-    sequence: int
-    speaker_role: Literal["host", "guest"]
-    speaker_name: str
-    text: str
+## -- RUN MANIFEST SHARED WITH scripts/parse_programs.py; ONLY PROGRAMS WHOSE PARSED RECORD
+## -- CHANGED SINCE THE LAST RUN ARE RE-FLATTENED AND PATCHED INTO THE PARQUET OUTPUTS
+## -- (EVERYTHING IS REBUILT WHEN THE FLATTENING CODE OR THE SETTINGS ABOVE CHANGE)
+MANIFEST_PATH = "data/manifest.json"
+INCREMENTAL: bool = True
 
+## -- PROGRAMS THAT FAIL VALIDATION ARE QUARANTINED (SHARED WITH scripts/parse_programs.py)
+QUARANTINE_PATH = "data/quarantine.json"
 
-class RelatedItemRow(TypedDict):
-    program_id: str
-    related_id: str
-    guest: str
-    title: str
-    url: str
+## -- HUGGINGFACE REPO CONFIG, WHOSE `configs` ARE POINTED AT THE WRITTEN FILES
+HF_REPO_CONFIG = "hf_repo.yaml"
 
+TEST_MODE: bool = False
 
-## -- below uses local store but could be S3Store in a production case...
-@ray.remote
-class LocalStoreManager:
-    def __init__(self, path: str):
-        self.store = LocalStore(path)
-
-    def read_json(self, file_path: str) -> dict:
-        data = self.store.get(str(file_path)).bytes().to_bytes()
-        return json.loads(data)
-
-
-def load_local_stores(path: str, num_stores: int) -> list:
-    return [LocalStoreManager.remote(path) for _ in range(num_stores)]
-
-
-@ray.remote
-def flatten_program_from_file(
-    store_manager,
-    filepath: str,
-) -> tuple[ProgramRow, list[TranscriptEntryRow], list[RelatedItemRow]]:
-    ## -- read json file containing parsed program data
-    data = ray.get(store_manager.read_json.remote(str(filepath)))
-
-    ## -- re-validate program data
-    program = Program.model_validate(data)
+## -- FULLY RE-VALIDATE PARSED PROGRAMS (OTHERWISE ONLY FILES WITHOUT A MATCHING
+## -- SCHEMA FINGERPRINT ARE VALIDATED; THE REST WERE VALIDATED WHEN PARSED)
+VALIDATE_PARSED: bool = False
 
-    ## -- convert air date from string to datetime
-    air_datetime = datetime.strptime(program.air_date, "%B %d, %Y")
 
-    ## -- create program row (single dictionary)
-    program_row = ProgramRow(
-        program_id=program.id,
-        title=program.title,
-        air_date=air_datetime,
-        book_isbn=program.book_isbn,
-        description=program.description,
-        guest=program.guest,
-        url=program.url,
+def read_program(filepath: str) -> Program:
+    ## -- validate straight from bytes (pydantic-core parses the JSON itself)
+    with open(filepath, "rb") as f:
+        return Program.model_validate_json(f.read())
+
+
+def import_legacy_json(store: ParsedProgramStore) -> None:
+    """Seed an empty store from parsed JSON files (one-off migration)."""
+    if len(store) > 0 or not os.path.isdir(LEGACY_PARSED_DIR):
+        return
+    filepaths = [
+        os.path.join(LEGACY_PARSED_DIR, filename)
+        for filename in os.listdir(LEGACY_PARSED_DIR)
+        if filename.endswith(".json")
+    ]
+    if filepaths:
+        num_imported = store.import_json(filepaths)
+        print(f"> Imported {num_imported} parsed JSON files from '{LEGACY_PARSED_DIR}'")
+
+
+def validate_stored_programs(
+    store: ParsedProgramStore,
+    program_ids: list[str],
+    manifest: RunManifest,
+    quarantine: QuarantineStore,
+) -> None:
+    """Validate stored programs, re-writing them in the current (stamped) format.
+
+    Invalid programs are quarantined and dropped from the store (so they are
+    left out of the outputs and parsed again by `scripts/parse_programs.py`)
+    instead of failing the run.
+    """
+    for program_id in tqdm(program_ids, desc="Validating parsed programs..."):
+        stored_data = store.get(program_id)
+        try:
+            program_data = load_program_data(stored_data, validate=True)
+        except ValueError as e:
+            ## -- pydantic's `ValidationError` is a `ValueError`
+            quarantine.add(
+                quarantine_record(
+                    program_id, stored_data.get("url") or "", "validate", e
+                )
+            )
+            store.discard(program_id)
+            continue
+        store.put(program_data)
+        manifest.record_parsed(program_id, program_data)
+        quarantine.release(program_id)
+    store.flush()
+
+
+def output_settings() -> dict:
+    """Code version and settings the flat outputs are built with."""
+    return {
+        "flatten_version": FLATTEN_VERSION,
+        "optimize_layout": OPTIMIZE_LAYOUT,
+        "partition_by": PARTITION_BY,
+        "num_buckets": NUM_BUCKETS,
+        "partitioned_datasets": list(PARTITIONED_DATASETS),
+    }
+
+
+def publish_options() -> PublishOptions:
+    return PublishOptions(
+        optimize_layout=OPTIMIZE_LAYOUT,
+        partition_by=PARTITION_BY,
+        num_buckets=NUM_BUCKETS,
+        partitioned_datasets=PARTITIONED_DATASETS,
+        max_buffer_bytes=MAX_BUFFER_MB * 1024 * 1024,
     )
 
-    ## -- create array of transcript entry rows
-    transcript_entry_rows = [
-        TranscriptEntryRow(
-            program_id=program.id,
-            sequence=i,
-            speaker_role=entry.speaker_role,
-            speaker_name=entry.speaker_name,
-            text=entry.text,
-        )
-        for i, entry in enumerate(program.transcript)
-    ]
 
-    ## -- create array of related item rows (these are provided on program webpage)
-    related_item_rows = [
-        RelatedItemRow(
-            program_id=program.id,
-            related_id=item.id,
-            url=item.url,
-            guest=item.author,  # <- couldn't decide on standard name for this field :)
-            title=item.title,
+def is_partitioned(name: str) -> bool:
+    return publish_options().is_partitioned(name)
+
+
+def output_exists(name: str) -> bool:
+    if is_partitioned(name):
+        return os.path.isdir(os.path.join(PROCESSED_DIR, name))
+    return os.path.exists(os.path.join(PROCESSED_DIR, f"{name}.parquet"))
+
+
+def write_datasets(store: ParsedProgramStore, num_programs: int) -> None:
+    """Flatten the first `num_programs` stored programs into freshly written outputs."""
+    output_paths = {
+        name: os.path.join(PROCESSED_DIR, f"{name}.parquet")
+        for name in FLAT_DATASET_SCHEMAS
+    }
+    arrow_schemas = {
+        name: pl.DataFrame(schema=schema).to_arrow().schema
+        for name, schema in FLAT_DATASET_SCHEMAS.items()
+    }
+
+    progress_bar = tqdm(total=num_programs, desc="Flattening parsed programs...")
+    with ParquetDatasetSink(
+        output_paths,
+        schemas=arrow_schemas,
+        row_group_size=ROW_GROUP_SIZE,
+        max_buffer_bytes=MAX_BUFFER_MB * 1024 * 1024,
+    ) as sink:
+        num_flattened = 0
+        for batch in store.iter_batches():
+            batch = batch.slice(0, num_programs - num_flattened)
+            datasets = flatten_parsed_programs(pl.from_arrow(batch).lazy())
+
+            ## -- the three plans share one read of the batch
+            for name, df in zip(datasets, pl.collect_all(list(datasets.values()))):
+                sink.write(name, df.to_arrow())
+
+            num_flattened += batch.num_rows
+            progress_bar.update(batch.num_rows)
+            if num_flattened >= num_programs:
+                break
+    progress_bar.close()
+
+    for name in output_paths:
+        print(
+            f"> Created {name} dataset with {sink.rows_written[name]:,} rows"
+            f" ({sink.row_groups_written[name]} row groups)"
         )
-        for item in program.related
-    ]
 
-    return program_row, transcript_entry_rows, related_item_rows
+    ## -- rewrite the datasets with a query-optimized layout (or as shards)
+    for summary in tqdm(
+        publish_datasets(output_paths, publish_options()),
+        total=len(output_paths),
+        desc="Optimizing layouts...",
+    ):
+        print(f"> {summary}")
+
+
+def patch_datasets(
+    store: ParsedProgramStore, changed_ids: list[str], removed_ids: list[str]
+) -> None:
+    """Replace the flat rows of changed and removed programs in the existing outputs."""
+    changed_programs = store.scan().filter(pl.col("id").is_in(changed_ids))
+    datasets = flatten_parsed_programs(changed_programs)
+    rows = dict(zip(datasets, pl.collect_all(list(datasets.values()))))
+
+    ## -- a changed program may move to another partition (e.g. a corrected air date)
+    if PARTITION_BY is not None:
+        keys = partition_keys(rows["programs"], PARTITION_BY, NUM_BUCKETS)
+
+    patched_ids = changed_ids + removed_ids
+    for name in FLAT_DATASET_SCHEMAS:
+        if is_partitioned(name):
+            shard_paths = patch_partitioned(
+                os.path.join(PROCESSED_DIR, name),
+                rows[name],
+                patched_ids,
+                keys,
+                DATASET_LAYOUTS[name],
+                MAX_BUFFER_MB * 1024 * 1024,
+            )
+            print(f"> Patched {len(shard_paths)} {name} shards")
+        else:
+            patch_with_layout(
+                os.path.join(PROCESSED_DIR, f"{name}.parquet"),
+                rows[name],
+                patched_ids,
+                DATASET_LAYOUTS[name],
+                MAX_BUFFER_MB * 1024 * 1024,
+            )
+            print(f"> Patched {name} dataset")
 
 
 def main():
-    ## ---- STAGE 1: INITIALIZE OBJECT STORES AND LIST OF PARSED JSON FILES
+    ## ---- STAGE 1: OPEN THE PARSED PROGRAM STORE
+    ## -------------------------------------------
+
+    store = ParsedProgramStore(PARSED_STORE_DIR)
+    import_legacy_json(store)
+    manifest = RunManifest(MANIFEST_PATH)
+    quarantine = QuarantineStore(QUARANTINE_PATH)
+
+    print(f"> Processing {len(store)} programs from '{PARSED_STORE_DIR}'")
+
+    ## ---- STAGE 2: VALIDATE PROGRAMS NOT STAMPED WITH THE CURRENT SCHEMA
+    ## -------------------------------------------------------------------
+
+    ## -- the flattening plans read columns as-is, so anything that wasn't validated
+    ## -- under the current schema (or everything, with VALIDATE_PARSED) is validated first
+    if VALIDATE_PARSED:
+        unvalidated_ids = store.program_ids()
+    else:
+        unvalidated_ids = (
+            store.scan()
+            .filter(pl.col(SCHEMA_FINGERPRINT_KEY).ne_missing(SCHEMA_FINGERPRINT))
+            .select("id")
+            .collect()["id"]
+            .to_list()
+        )
+    if unvalidated_ids:
+        validate_stored_programs(store, unvalidated_ids, manifest, quarantine)
+        quarantine.save()
+        if quarantine.added:
+            print(quarantine.summary())
+
+    ## -- programs stored without going through scripts/parse_programs.py (e.g. imported)
+    program_ids = store.program_ids()
+    for program_id in program_ids:
+        if "parsed_digest" not in manifest[program_id]:
+            manifest.record_parsed(program_id, store.get(program_id))
+
+    ## ---- STAGE 3: FLATTEN THE CHANGED PROGRAMS INTO THE PARQUET DATASETS
     ## --------------------------------------------------------------------
 
-    ## -- !! NOTE: absolute path is necessary since ray tasks run elsewhere on machine...
-    stores = load_local_stores(os.path.abspath(PARSED_DIR), NUM_STORES)
-
-    ## -- list contents of parsed directory
-    parsed_program_files = os.listdir(PARSED_DIR)
-
-    print(f"> Processing {len(parsed_program_files)} files from '{PARSED_DIR}'")
+    settings = output_settings()
+    changed_ids = manifest.unflattened(program_ids)
+    removed_ids = sorted(manifest.flattened_ids() - set(program_ids))
 
     if TEST_MODE:
-        parsed_program_files = parsed_program_files[:10]
+        num_programs = min(len(store), 10)
+        print(f"> !! Running in test mode. Processing first {num_programs} programs.")
+        write_datasets(store, num_programs)
+        ## -- partial outputs: the next run rebuilds everything
+        manifest.stages.pop("flatten", None)
+    elif (
+        INCREMENTAL
+        and OPTIMIZE_LAYOUT
+        and not manifest.stage_changed("flatten", settings)
+        and all(output_exists(name) for name in FLAT_DATASET_SCHEMAS)
+    ):
+        if not changed_ids and not removed_ids:
+            manifest.save()
+            print("> Nothing changed since the last run")
+            return
         print(
-            f"> !! Running in test mode. Processing first {len(parsed_program_files)} files."
+            f"> Patching {len(changed_ids)} changed and {len(removed_ids)} removed programs"
         )
-
-    ## ---- STAGE 2: PARSE PROGRAM JSON FILES IN PARALLEL
-    ## --------------------------------------------------
-
-    all_program_results = []
-    futures = [
-        flatten_program_from_file.remote(stores[i % NUM_STORES], filepath)
-        for i, filepath in enumerate(parsed_program_files)
-    ]
-
-    progress_bar = tqdm(
-        total=len(parsed_program_files), desc="Processing parsed programs..."
-    )
-
-    while futures:
-        ## -- wait for first task to complete
-        ready, futures = ray.wait(futures, num_returns=1)
-
-        # -- get results from completed tasks
-        for future in ready:
-            result = ray.get(future)
-            all_program_results.append(result)
-            progress_bar.update(1)
-            progress_bar.set_postfix(completed=len(all_program_results))
-
-    progress_bar.close()
-    ray.shutdown()
-
-    ## ---- STAGE 3: UNPACK RESULTS AND CONVERT TO DATAFRAMES
-    ## ------------------------------------------------------
-
-    program_rows: list[ProgramRow] = []
-    transcript_rows: list[TranscriptEntryRow] = []
-    related_item_rows: list[RelatedItemRow] = []
-
-    for program, transcript_entries, related_items in all_program_results:
-        program_rows.append(program)
-        transcript_rows.extend(transcript_entries)
-        related_item_rows.extend(related_items)
-
-    ## ---- DF-1. programs
-    programs_df = pl.DataFrame(program_rows).select(
-        "program_id", "guest", "title", "description", "air_date", "book_isbn", "url"
-    )
-    print(f"> Created programs dataset with {len(program_rows):,} rows")
-
-    ## ---- DF-2. transcripts
-    transcripts_df = pl.DataFrame(transcript_rows).select(
-        "program_id", "sequence", "speaker_role", "speaker_name", "text"
+        patch_datasets(store, changed_ids, removed_ids)
+        manifest.record_flattened("flatten", settings, changed_ids, removed_ids)
+    else:
+        write_datasets(store, len(store))
+        manifest.record_flattened("flatten", settings, program_ids, removed_ids)
+    manifest.save()
+
+    ## ---- STAGE 4: POINT THE HUGGINGFACE DATASET CONFIGS AT THE OUTPUT FILES
+    ## -----------------------------------------------------------------------
+
+    write_hf_repo_config(
+        HF_REPO_CONFIG,
+        dataset_data_files(list(FLAT_DATASET_SCHEMAS), publish_options()),
     )
-    print(f"> Created transcripts dataset with {len(transcript_rows):,} rows")
-
-    ## ---- DF-3. related items
-    related_items_df = pl.DataFrame(related_item_rows).select(
-        "program_id", "related_id", "guest", "title", "url"
-    )
-    print(f"> Created related items dataset with {len(related_item_rows):,} rows")
-
-    ## -- write parquet files
-    programs_df.write_parquet(os.path.join(PROCESSED_DIR, "programs.parquet"))
-    transcripts_df.write_parquet(os.path.join(PROCESSED_DIR, "transcripts.parquet"))
-    related_items_df.write_parquet(os.path.join(PROCESSED_DIR, "related_items.parquet"))
+    print(f"> Updated dataset configs in '{HF_REPO_CONFIG}'")
 
     return
 
@@ -0,0 +1,367 @@
+"""
+This script runs the whole dataset pipeline in one streaming pass:
+author index pages -> program pages -> parsed and validated programs ->
+flattened parquet datasets.
+
+Instead of `scripts/author_index.py`, `scripts/parse_programs.py` and
+`scripts/process_parsed.py` running one after the other (each finishing and
+writing to disk before the next starts), every stage runs concurrently with
+its own worker pool, connected by bounded queues. Fetching overlaps parsing
+and writing, so the wall time approaches that of the slowest stage. The
+html cache, parsed program store and author index file are optional side
+outputs.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Iterator, TypedDict
+from urllib.parse import urljoin
+
+import polars as pl
+import pyarrow as pa
+from tqdm import tqdm
+
+from cspan_booknotes.archive import HtmlArchive
+from cspan_booknotes.author_index import AUTHOR_INDEX_PAGE_URLS, parse_author_index_page
+from cspan_booknotes.constants import ROOT_URL
+from cspan_booknotes.fetch import BackgroundFetcher
+from cspan_booknotes.flatten import FLAT_DATASET_SCHEMAS, flatten_parsed_programs
+from cspan_booknotes.get import PageContent, ParserBackend, build_html
+from cspan_booknotes.manifest import RunManifest, parsed_digest
+from cspan_booknotes.models.schema import load_program_data, stamp_program
+from cspan_booknotes.parser import get_parser
+from cspan_booknotes.parser.program_id import get_program_id
+from cspan_booknotes.partition import PartitionScheme
+from cspan_booknotes.pipeline import Stage, StreamingPipeline
+from cspan_booknotes.publish import (
+    PublishOptions,
+    dataset_data_files,
+    publish_datasets,
+    write_hf_repo_config,
+)
+from cspan_booknotes.quarantine import (
+    QuarantineRecord,
+    QuarantineStore,
+    quarantine_record,
+)
+from cspan_booknotes.rate import AdaptiveRateController
+from cspan_booknotes.retry import call_with_retries
+from cspan_booknotes.sink import ParquetDatasetSink
+from cspan_booknotes.store import PARSED_PROGRAM_ARROW_SCHEMA, ParsedProgramStore
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+
+## -- AUTHOR INDEX (LIST OF PROGRAM PAGES); RE-CRAWLED WHEN MISSING OR WITH REFRESH_INDEX
+AUTHOR_INDEX_FILEPATH = PROJECT_ROOT / "data" / "author_index.parquet"
+REFRESH_INDEX: bool = False
+
+## -- SIDE OUTPUTS: RAW PAGES (READ AND WRITTEN), PARSED PROGRAMS AND THE RUN MANIFEST
+## -- (None TO SKIP); PROGRAMS WHOSE PAGE AND PARSER ARE UNCHANGED COME FROM THE STORE
+HTML_ARCHIVE_PATH: Path | None = PROJECT_ROOT / "data" / "html_cache.pack"
+PARSED_STORE_DIR: Path | None = PROJECT_ROOT / "data" / "parsed_programs"
+MANIFEST_PATH = PROJECT_ROOT / "data" / "manifest.json"
+
+## -- PROGRAMS THAT FAILED (AFTER RETRIES); SKIPPED UNTIL THEIR PAGE OR THE PARSER CHANGES
+QUARANTINE_PATH = PROJECT_ROOT / "data" / "quarantine.json"
+
+## -- FLATTENED DATASETS, LAID OUT OR SHARDED AS BY scripts/process_parsed.py (SEE ITS
+## -- SETTINGS), AND THE HUGGINGFACE REPO CONFIG POINTED AT THEM
+PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+OPTIMIZE_LAYOUT: bool = True
+PARTITION_BY: PartitionScheme | None = None
+NUM_BUCKETS: int = 16
+PARTITIONED_DATASETS: tuple[str, ...] = ("programs", "transcripts")
+HF_REPO_CONFIG = PROJECT_ROOT / "hf_repo.yaml"
+
+## -- WORKERS PER STAGE (FETCH WORKERS SHARE ONE CONNECTION POOL; PARSE WORKERS
+## -- ARE PROCESSES), PROGRAMS PER FLATTENED BATCH AND ITEMS QUEUED BETWEEN STAGES
+FETCH_CONCURRENCY: int = 8
+MAX_REQUESTS_PER_SECOND: float | None = 5.0
+PARSE_WORKERS: int = max((os.cpu_count() or 2) - 1, 1)
+FLATTEN_WORKERS: int = 2
+FLATTEN_BATCH_SIZE: int = 64
+QUEUE_SIZE: int = 64
+
+## -- TREE BUILDER USED FOR PARSING PAGES ("bs4" OR "lxml")
+PARSER_BACKEND: ParserBackend = "bs4"
+
+
+class ProgramItem(TypedDict):
+    url: str
+    program_id: str
+    html: bytes | None
+    html_digest: str | None
+    ## -- parsed record; already set for programs unchanged since the last parse
+    program: dict[str, Any] | None
+    parsed: bool  # parsed in this run (written to the store and manifest)
+    ## -- set when fetching or parsing failed (after retries); quarantined by `store`
+    failure: QuarantineRecord | None
+
+
+## ------------------------------ ##
+## ---- SOURCE: PROGRAM URLS ---- ##
+## ------------------------------ ##
+
+
+def program_urls(fetcher: BackgroundFetcher) -> Iterator[str]:
+    """Program page urls, from the author index file or streamed from a crawl
+    of the index pages (saving the index file as a side output)."""
+    if AUTHOR_INDEX_FILEPATH.exists() and not REFRESH_INDEX:
+        for path in pl.read_parquet(AUTHOR_INDEX_FILEPATH)["program_path"]:
+            yield urljoin(ROOT_URL, path)
+        return
+
+    index_pipeline = StreamingPipeline(
+        [
+            Stage("fetch_index", lambda url: fetcher.fetch(url)["content"], workers=4),
+            Stage("parse_index", parse_author_index_page),
+        ]
+    )
+    index_entries = []
+    for entries in index_pipeline.run(AUTHOR_INDEX_PAGE_URLS):
+        index_entries.extend(entries)
+        for entry in entries:
+            yield urljoin(ROOT_URL, entry["program_path"])
+    pl.DataFrame(index_entries).write_parquet(AUTHOR_INDEX_FILEPATH)
+
+
+def program_items(
+    urls: Iterator[str],
+    reader: ParsedProgramStore | None,
+    manifest: RunManifest,
+    html_cache: HtmlArchive | None,
+    cache_lock: threading.Lock,
+    quarantine: QuarantineStore,
+) -> Iterator[ProgramItem]:
+    for url in urls:
+        program_id = get_program_id(url)
+        ## -- digest of the cached page (None when it will be fetched)
+        html_digest = None
+        if html_cache is not None:
+            with cache_lock:
+                metadata = html_cache.get_metadata(program_id)
+            html_digest = None if metadata is None else metadata["digest"]
+
+        ## -- quarantined programs that would fail the same way again
+        if html_cache is not None and quarantine.should_skip(program_id, html_digest):
+            continue
+        item = ProgramItem(
+            url=url,
+            program_id=program_id,
+            html=None,
+            html_digest=None,
+            program=None,
+            parsed=False,
+            failure=None,
+        )
+        if reader is not None and program_id in reader:
+            ## -- without a cache the page isn't known until fetched: reuse the
+            ## -- parsed program unless the parser changed
+            if html_cache is None:
+                html_digest = manifest.programs.get(program_id, {}).get("html_digest")
+            if not manifest.needs_parse(program_id, html_digest):
+                item["program"] = reader.get(program_id)
+        yield item
+
+
+## ---------------- ##
+## ---- STAGES ---- ##
+## ---------------- ##
+
+
+def fetch_program(
+    item: ProgramItem,
+    fetcher: BackgroundFetcher,
+    html_cache: HtmlArchive | None,
+    cache_lock: threading.Lock,
+) -> ProgramItem:
+    if item["program"] is not None:
+        return item
+
+    if html_cache is not None:
+        with cache_lock:
+            item["html"] = html_cache.get_content(item["program_id"])
+            metadata = html_cache.get_metadata(item["program_id"])
+        if item["html"] is not None:
+            item["html_digest"] = metadata["digest"]
+            return item
+
+    fetched = call_with_retries(fetcher.fetch, item["url"])
+    if fetched.error is not None:
+        item["failure"] = quarantine_record(
+            item["program_id"], item["url"], "fetch", fetched.error, fetched.attempts
+        )
+        return item
+    result = fetched.result
+    item["html"] = result["content"]
+    if html_cache is not None:
+        with cache_lock:
+            item["html_digest"] = html_cache.put(item["program_id"], result)["digest"]
+    return item
+
+
+def parse_page(url: str, content: bytes) -> dict[str, Any]:
+    html = build_html(content, backend=PARSER_BACKEND)
+    return stamp_program(
+        get_parser(PARSER_BACKEND).parse(PageContent(url=url, html=html))
+    )
+
+
+def parse_program(item: ProgramItem) -> ProgramItem:
+    """Parse (and validate) a page; stored programs are only re-validated when
+    they were stored under an older schema. Runs in a worker process."""
+    if item["failure"] is not None:
+        return item
+    if item["program"] is not None:
+        item["program"] = load_program_data(item["program"])
+        return item
+
+    parsed = call_with_retries(parse_page, item["url"], item["html"])
+    if parsed.error is not None:
+        item["failure"] = quarantine_record(
+            item["program_id"],
+            item["url"],
+            "parse",
+            parsed.error,
+            parsed.attempts,
+            html=item["html"],
+            html_digest=item["html_digest"],
+        )
+    else:
+        item["program"] = parsed.result
+        item["parsed"] = True
+    ## -- the page isn't needed downstream; don't ship it between processes
+    item["html"] = None
+    return item
+
+
+def store_program(
+    item: ProgramItem,
+    store: ParsedProgramStore | None,
+    manifest: RunManifest,
+    quarantine: QuarantineStore,
+) -> ProgramItem | None:
+    ## -- single worker: the store, manifest and quarantine have a single writer
+    if item["failure"] is not None:
+        quarantine.add(item["failure"])
+        return None
+    quarantine.release(item["program_id"])
+    if store is not None and item["parsed"]:
+        store.put(item["program"])
+        manifest.record_parse(
+            item["program_id"], item["html_digest"], parsed_digest(item["program"])
+        )
+    return item
+
+
+def flatten_programs(items: list[ProgramItem]) -> dict[str, pa.Table]:
+    batch = pa.RecordBatch.from_pylist(
+        [item["program"] for item in items], schema=PARSED_PROGRAM_ARROW_SCHEMA
+    )
+    datasets = flatten_parsed_programs(pl.from_arrow(batch).lazy())
+    return {
+        name: df.to_arrow()
+        for name, df in zip(datasets, pl.collect_all(list(datasets.values())))
+    }
+
+
+def main():
+    html_cache = None if HTML_ARCHIVE_PATH is None else HtmlArchive(HTML_ARCHIVE_PATH)
+    store = None if PARSED_STORE_DIR is None else ParsedProgramStore(PARSED_STORE_DIR)
+    ## -- separate reader: it sees the store as of the start of the run
+    reader = None if PARSED_STORE_DIR is None else ParsedProgramStore(PARSED_STORE_DIR)
+    manifest = RunManifest(MANIFEST_PATH)
+    quarantine = QuarantineStore(QUARANTINE_PATH)
+    cache_lock = threading.Lock()
+
+    output_paths = {
+        name: PROCESSED_DIR / f"{name}.parquet" for name in FLAT_DATASET_SCHEMAS
+    }
+    arrow_schemas = {
+        name: pl.DataFrame(schema=schema).to_arrow().schema
+        for name, schema in FLAT_DATASET_SCHEMAS.items()
+    }
+
+    controller = AdaptiveRateController(
+        max_window=FETCH_CONCURRENCY, rate_limit=MAX_REQUESTS_PER_SECOND
+    )
+    with (
+        BackgroundFetcher(
+            max_concurrency=FETCH_CONCURRENCY, controller=controller
+        ) as fetcher,
+        ParquetDatasetSink(output_paths, schemas=arrow_schemas) as sink,
+    ):
+        pipeline = StreamingPipeline(
+            [
+                Stage(
+                    "fetch",
+                    lambda item: fetch_program(item, fetcher, html_cache, cache_lock),
+                    workers=FETCH_CONCURRENCY,
+                ),
+                Stage(
+                    "parse", parse_program, workers=PARSE_WORKERS, executor="process"
+                ),
+                Stage(
+                    "store",
+                    lambda item: store_program(item, store, manifest, quarantine),
+                ),
+                Stage(
+                    "flatten",
+                    flatten_programs,
+                    workers=FLATTEN_WORKERS,
+                    batch_size=FLATTEN_BATCH_SIZE,
+                ),
+            ],
+            queue_size=QUEUE_SIZE,
+        )
+        items = program_items(
+            program_urls(fetcher), reader, manifest, html_cache, cache_lock, quarantine
+        )
+
+        progress_bar = tqdm(desc="Running pipeline...", unit=" programs")
+        for tables in pipeline.run(items):
+            for name, table in tables.items():
+                sink.write(name, table)
+            progress_bar.update(tables["programs"].num_rows)
+        progress_bar.close()
+
+    ## -- write side outputs
+    if store is not None:
+        store.close()
+    if html_cache is not None:
+        html_cache.flush_index()
+    ## -- the outputs were rebuilt outside scripts/process_parsed.py, which
+    ## -- rebuilds them in full on its next run
+    manifest.stages.pop("flatten", None)
+    manifest.save()
+    quarantine.save()
+
+    for name, stats in pipeline.stats.items():
+        print(
+            f"> Stage '{name}': {int(stats['items_in']):,} items in,"
+            f" {int(stats['items_out']):,} out, {stats['busy_seconds']:.1f}s busy"
+        )
+    print(f"> Crawl rate metrics: {controller.metrics()}")
+    print(f"> {quarantine.summary()}")
+
+    for name in output_paths:
+        print(f"> Created {name} dataset with {sink.rows_written[name]:,} rows")
+
+    ## -- lay out (or shard) the outputs and point the dataset configs at them
+    options = PublishOptions(
+        optimize_layout=OPTIMIZE_LAYOUT,
+        partition_by=PARTITION_BY,
+        num_buckets=NUM_BUCKETS,
+        partitioned_datasets=PARTITIONED_DATASETS,
+    )
+    for summary in publish_datasets(output_paths, options):
+        print(f"> {summary}")
+    write_hf_repo_config(
+        HF_REPO_CONFIG, dataset_data_files(list(output_paths), options)
+    )
+    print(f"> Updated dataset configs in '{HF_REPO_CONFIG}'")
+
+
+if __name__ == "__main__":
+    main()
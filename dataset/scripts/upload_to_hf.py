@@ -51,10 +51,13 @@ def main():
         repo_type=REPO_TYPE,
     )
 
+    ## -- unchanged files (e.g. untouched shards) are skipped by content hash, and
+    ## -- parquet files no longer in the output (e.g. stale shards) are deleted
     api.upload_folder(
         folder_path=PROCESSED_DIR,
         repo_id=REPO_ID,
         repo_type=REPO_TYPE,
+        delete_patterns=["*.parquet"],
     )
 
     return
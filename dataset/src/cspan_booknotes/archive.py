@@ -0,0 +1,275 @@
+"""
+Single-file HTML archive.
+
+A drop-in alternative to `HtmlCache` that keeps every cached response in one
+append-only pack file instead of thousands of small files. The pack is a
+log of records:
+
+    header:  magic (4s) | kind (B) | key length (H) | payload length (I)
+    key:     content digest (body records) or program id (metadata records)
+    payload: zstd-compressed response bytes, or `CachedResponse` JSON
+
+Bodies are content-addressed (written once per digest) and the latest
+metadata record for a program id wins. An in-memory offset index gives O(1)
+random access, reads go through `mmap`, and the index is persisted next to
+the pack (`<pack>.idx`) so opening does not require a full scan; records
+appended after the index was written are picked up by scanning the tail.
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+import zstandard
+
+from cspan_booknotes.cache import (
+    DEFAULT_COMPRESSION_LEVEL,
+    CachedResponse,
+    HtmlCache,
+    conditional_headers,
+    content_digest,
+    response_metadata,
+    revalidated_metadata,
+)
+from cspan_booknotes.fetch import FetchResult
+
+RECORD_MAGIC = b"BNA1"
+RECORD_HEADER = struct.Struct("<4sBHI")
+
+BODY_RECORD: int = 1
+METADATA_RECORD: int = 2
+
+
+class HtmlArchive:
+    def __init__(
+        self, path: str | Path, compression_level: int = DEFAULT_COMPRESSION_LEVEL
+    ):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(f"{self.path.name}.idx")
+        self.compression_level = compression_level
+        self._reset()
+
+    def _reset(self) -> None:
+        ## -- digest -> (payload offset, payload length)
+        self._bodies: dict[str, tuple[int, int]] = {}
+        self._metadata: dict[str, CachedResponse] = {}
+        self._indexed_size = 0
+        self._mmap: mmap.mmap | None = None
+        self._opened = False
+
+    ## -- archives are shipped to worker processes by path and reopened lazily
+    def __getstate__(self) -> dict:
+        return {"path": self.path, "compression_level": self.compression_level}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"], state["compression_level"])
+
+    ## ------------------ ##
+    ## ---- INDEXING ---- ##
+    ## ------------------ ##
+
+    def _open(self) -> None:
+        """Load the persisted index, then index anything appended after it."""
+        if self._opened:
+            return
+        self._opened = True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+
+        if self.index_path.exists():
+            with open(self.index_path, "rb") as f:
+                index = json.load(f)
+            if index["pack_size"] <= self.path.stat().st_size:
+                self._bodies = {
+                    digest: tuple(location)
+                    for digest, location in index["bodies"].items()
+                }
+                self._metadata = index["metadata"]
+                self._indexed_size = index["pack_size"]
+        self._scan_tail()
+
+    def _scan_tail(self) -> None:
+        """Index records appended (e.g. by another process) since the last scan."""
+        if self.path.stat().st_size <= self._indexed_size:
+            return
+
+        ## -- shared lock: no writer is in the middle of a record while we scan
+        with open(self.path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                self._scan_records(f)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _scan_records(self, f: BinaryIO) -> None:
+        """Index the complete records after `_indexed_size` (the caller holds
+        a lock on the pack); stops at a record truncated by a crashed writer."""
+        size = os.fstat(f.fileno()).st_size
+        offset = self._indexed_size
+        f.seek(offset)
+        while offset + RECORD_HEADER.size <= size:
+            magic, kind, key_length, payload_length = RECORD_HEADER.unpack(
+                f.read(RECORD_HEADER.size)
+            )
+            if magic != RECORD_MAGIC:
+                raise ValueError(f"Corrupt archive record at offset {offset}")
+            payload_offset = offset + RECORD_HEADER.size + key_length
+            if payload_offset + payload_length > size:
+                break
+            key = f.read(key_length).decode()
+            if kind == BODY_RECORD:
+                self._bodies[key] = (payload_offset, payload_length)
+                f.seek(payload_length, os.SEEK_CUR)
+            else:
+                self._metadata[key] = json.loads(f.read(payload_length))
+            offset = payload_offset + payload_length
+
+        self._indexed_size = offset
+
+    def flush_index(self) -> None:
+        """Persist the offset index so the next open skips the scan."""
+        self._open()
+        index = {
+            "pack_size": self._indexed_size,
+            "bodies": self._bodies,
+            "metadata": self._metadata,
+        }
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    ## ----------------- ##
+    ## ---- READING ---- ##
+    ## ----------------- ##
+
+    def _read(self, offset: int, length: int) -> bytes:
+        ## -- remap once the pack has grown past the current mapping
+        if self._mmap is None or offset + length > len(self._mmap):
+            if self._mmap is not None:
+                self._mmap.close()
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[offset : offset + length]
+
+    def _refresh(self) -> None:
+        ## -- other processes may have appended (or re-pointed) programs since we indexed
+        self._open()
+        self._scan_tail()
+
+    def __contains__(self, program_id: str) -> bool:
+        self._refresh()
+        return program_id in self._metadata
+
+    def program_ids(self) -> list[str]:
+        self._refresh()
+        return sorted(self._metadata)
+
+    def get_metadata(self, program_id: str) -> CachedResponse | None:
+        self._refresh()
+        metadata = self._metadata.get(program_id)
+        return dict(metadata) if metadata is not None else None
+
+    def get_content(self, program_id: str) -> bytes | None:
+        """Raw response bytes for a program, or `None` when not archived."""
+        self._refresh()
+        if program_id not in self._metadata:
+            return None
+        offset, length = self._bodies[self._metadata[program_id]["digest"]]
+        return zstandard.ZstdDecompressor().decompress(self._read(offset, length))
+
+    def iter_contents(self) -> Iterator[tuple[str, bytes]]:
+        """Yield `(program_id, content)` in pack order (sequential reads)."""
+        self._open()
+        by_offset = sorted(
+            self._metadata.items(),
+            key=lambda item: self._bodies[item[1]["digest"]][0],
+        )
+        decompressor = zstandard.ZstdDecompressor()
+        for program_id, metadata in by_offset:
+            offset, length = self._bodies[metadata["digest"]]
+            yield program_id, decompressor.decompress(self._read(offset, length))
+
+    def conditional_headers(self, program_id: str) -> dict[str, str]:
+        """Request headers that revalidate the archived response for a program."""
+        return conditional_headers(self.get_metadata(program_id))
+
+    ## ----------------- ##
+    ## ---- WRITING ---- ##
+    ## ----------------- ##
+
+    def _append(self, records: list[tuple[int, str, bytes]]) -> None:
+        ## -- exclusive lock so concurrent writers never interleave records
+        with open(self.path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                with open(self.path, "rb") as reader:
+                    self._scan_records(reader)
+                ## -- drop a partial record left by a crashed writer before appending
+                if os.fstat(f.fileno()).st_size > self._indexed_size:
+                    f.truncate(self._indexed_size)
+                for kind, key, payload in records:
+                    key_bytes = key.encode()
+                    f.write(
+                        RECORD_HEADER.pack(
+                            RECORD_MAGIC, kind, len(key_bytes), len(payload)
+                        )
+                    )
+                    f.write(key_bytes)
+                    f.write(payload)
+                f.flush()
+                with open(self.path, "rb") as reader:
+                    self._scan_records(reader)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _put(
+        self, program_id: str, metadata: CachedResponse, content: bytes | None = None
+    ) -> None:
+        """Append the metadata record, preceded by the body if not yet packed."""
+        self._open()
+        records = []
+        if content is not None and metadata["digest"] not in self._bodies:
+            compressor = zstandard.ZstdCompressor(level=self.compression_level)
+            records.append(
+                (BODY_RECORD, metadata["digest"], compressor.compress(content))
+            )
+        records.append((METADATA_RECORD, program_id, json.dumps(metadata).encode()))
+        self._append(records)
+
+    def put(self, program_id: str, result: FetchResult) -> CachedResponse:
+        """Append a full (200) response and point the program id at it."""
+        metadata = response_metadata(result, content_digest(result["content"]))
+        self._put(program_id, metadata, result["content"])
+        return metadata
+
+    def touch(self, program_id: str, result: FetchResult) -> CachedResponse:
+        """Record a 304 revalidation: keep the archived body, refresh the metadata."""
+        metadata = self.get_metadata(program_id)
+        if metadata is None:
+            raise KeyError(f"Program '{program_id}' is not in the HTML archive")
+
+        metadata = revalidated_metadata(metadata, result)
+        self._put(program_id, metadata)
+        return metadata
+
+    def copy_from(self, cache: HtmlCache) -> int:
+        """Pack every response from a directory cache; returns the number copied."""
+        program_ids = cache.program_ids()
+        for program_id in program_ids:
+            self._put(
+                program_id,
+                cache.get_metadata(program_id),
+                cache.get_content(program_id),
+            )
+        self.flush_index()
+        return len(program_ids)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        self._reset()
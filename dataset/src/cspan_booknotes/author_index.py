@@ -0,0 +1,95 @@
+"""
+Author index parsing.
+
+The Booknotes author index (one page per letter) lists every program with
+its guest and title; it is the list of program pages to crawl.
+"""
+
+import string
+from typing import Literal
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from pydantic import BaseModel
+
+from cspan_booknotes.models import ProgramId
+from cspan_booknotes.models.fields import ProgramTitle
+
+AUTHOR_INDEX_URL = "https://booknotes.c-span.org/AuthorIndex/"
+
+AUTHOR_INDEX_PAGE_URLS = [
+    urljoin(AUTHOR_INDEX_URL, letter) for letter in string.ascii_uppercase
+]
+
+
+AlphaIndexSchema = Literal[
+    "A",
+    "B",
+    "C",
+    "D",
+    "E",
+    "F",
+    "G",
+    "H",
+    "I",
+    "J",
+    "K",
+    "L",
+    "M",
+    "N",
+    "O",
+    "P",
+    "Q",
+    "R",
+    "S",
+    "T",
+    "U",
+    "V",
+    "W",
+    "X",
+    "Y",
+    "Z",
+]
+
+
+class AuthorIndexEntry(BaseModel):
+    program_id: ProgramId
+    program_path: str
+    author_name: str
+    program_title: ProgramTitle
+
+
+def process_index_entry(index_entry) -> dict:
+    ## -- get path
+    program_path = (
+        index_entry.find("td", class_="aLinkItem")
+        .find("a", class_="aLinkItem")
+        .get("href")
+    )
+
+    ## -- extract id from path
+    program_id = program_path.split("/")[-1]
+
+    ## -- get author name
+    author_name = index_entry.find("td", class_="aLinkItem").get_text(
+        strip=True, separator=" "
+    )
+
+    ## -- get program title
+    program_title = index_entry.find("a", class_="pLinkItem").get_text()
+
+    return AuthorIndexEntry(
+        program_id=program_id,
+        program_path=program_path,
+        author_name=author_name,
+        program_title=program_title,
+    ).model_dump()
+
+
+def parse_author_index_page(content: bytes) -> list[dict]:
+    soup = BeautifulSoup(content, features="lxml")
+
+    ## -- get all entry tags
+    entry_tags = soup.find_all("tr", {"class": "rowStyl"})
+
+    return [process_index_entry(entry) for entry in entry_tags]
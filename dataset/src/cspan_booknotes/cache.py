@@ -0,0 +1,152 @@
+"""
+HTML response cache.
+
+Raw response bytes are stored zstd-compressed and content-addressed by their
+sha256 digest (`objects/<ab>/<digest>.zst`), so identical responses are
+stored once. Each program id maps to a small metadata record
+(`meta/<program_id>.json`) with the response status, headers, validators
+(ETag/Last-Modified), fetch time and content digest. The validators are used
+to issue conditional GETs when refreshing the cache.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TypedDict
+
+import zstandard
+
+from cspan_booknotes.fetch import FetchResult
+
+DEFAULT_COMPRESSION_LEVEL: int = 10
+
+
+class CachedResponse(TypedDict):
+    url: str
+    status: int
+    headers: dict[str, str]
+    etag: str | None
+    last_modified: str | None
+    fetched_at: str  # ISO-8601, UTC
+    digest: str  # sha256 of the raw response bytes
+    size: int  # uncompressed size in bytes
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def response_metadata(result: FetchResult, digest: str) -> CachedResponse:
+    """Metadata record for a full (200) response with the given body digest."""
+    return CachedResponse(
+        url=result["url"],
+        status=result["status"],
+        headers=result["headers"],
+        etag=result["headers"].get("etag"),
+        last_modified=result["headers"].get("last-modified"),
+        fetched_at=datetime.now(timezone.utc).isoformat(),
+        digest=digest,
+        size=len(result["content"]),
+    )
+
+
+def revalidated_metadata(
+    metadata: CachedResponse, result: FetchResult
+) -> CachedResponse:
+    """Metadata record updated from a 304 revalidation response."""
+    return CachedResponse(
+        metadata,
+        fetched_at=datetime.now(timezone.utc).isoformat(),
+        etag=result["headers"].get("etag", metadata["etag"]),
+        last_modified=result["headers"].get("last-modified", metadata["last_modified"]),
+    )
+
+
+def conditional_headers(metadata: CachedResponse | None) -> dict[str, str]:
+    """Request headers that revalidate a cached response."""
+    if metadata is None:
+        return {}
+
+    headers = {}
+    if metadata["etag"]:
+        headers["If-None-Match"] = metadata["etag"]
+    if metadata["last_modified"]:
+        headers["If-Modified-Since"] = metadata["last_modified"]
+    return headers
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class HtmlCache:
+    def __init__(
+        self, root: str | Path, compression_level: int = DEFAULT_COMPRESSION_LEVEL
+    ):
+        self.root = Path(root)
+        self.compression_level = compression_level
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.zst"
+
+    def _meta_path(self, program_id: str) -> Path:
+        return self.root / "meta" / f"{program_id}.json"
+
+    def __contains__(self, program_id: str) -> bool:
+        return self._meta_path(program_id).exists()
+
+    def program_ids(self) -> list[str]:
+        meta_dir = self.root / "meta"
+        if not meta_dir.exists():
+            return []
+        return sorted(path.stem for path in meta_dir.glob("*.json"))
+
+    def get_metadata(self, program_id: str) -> CachedResponse | None:
+        try:
+            with open(self._meta_path(program_id), "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def get_content(self, program_id: str) -> bytes | None:
+        """Raw response bytes for a program, or `None` when not cached."""
+        metadata = self.get_metadata(program_id)
+        if metadata is None:
+            return None
+        with open(self._object_path(metadata["digest"]), "rb") as f:
+            return zstandard.ZstdDecompressor().decompress(f.read())
+
+    def put(self, program_id: str, result: FetchResult) -> CachedResponse:
+        """Store a full (200) response and point the program id at it."""
+        digest = content_digest(result["content"])
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            compressor = zstandard.ZstdCompressor(level=self.compression_level)
+            _write_atomic(object_path, compressor.compress(result["content"]))
+
+        metadata = response_metadata(result, digest)
+        self._write_metadata(program_id, metadata)
+        return metadata
+
+    def touch(self, program_id: str, result: FetchResult) -> CachedResponse:
+        """Record a 304 revalidation: keep the cached body, refresh the metadata."""
+        metadata = self.get_metadata(program_id)
+        if metadata is None:
+            raise KeyError(f"Program '{program_id}' is not in the HTML cache")
+
+        metadata = revalidated_metadata(metadata, result)
+        self._write_metadata(program_id, metadata)
+        return metadata
+
+    def conditional_headers(self, program_id: str) -> dict[str, str]:
+        """Request headers that revalidate the cached response for a program."""
+        return conditional_headers(self.get_metadata(program_id))
+
+    def _write_metadata(self, program_id: str, metadata: CachedResponse) -> None:
+        _write_atomic(self._meta_path(program_id), json.dumps(metadata).encode())
@@ -1,59 +1,60 @@
 class FieldNotFoundError(Exception):
     """Base exception for when any field is not found during parsing"""
 
-    pass
+    ## -- name of the `Program` field that could not be parsed (if known)
+    field: str | None = None
 
 
 # Field-specific exceptions
 class ProgramIdNotFoundError(FieldNotFoundError):
     """Raised when program ID cannot be found or extracted"""
 
-    pass
+    field = "id"
 
 
 class DescriptionNotFoundError(FieldNotFoundError):
     """Raised when program description cannot be found or extracted"""
 
-    pass
+    field = "description"
 
 
 class GuestAuthorNotFoundError(FieldNotFoundError):
     """Raised when author name cannot be found or extracted"""
 
-    pass
+    field = "guest"
 
 
 class BookISBNNotFoundError(FieldNotFoundError):
     """Raised when book ISBN cannot be found or extracted"""
 
-    pass
+    field = "book_isbn"
 
 
 class DurationNotFoundError(FieldNotFoundError):
     """Raised when episode duration cannot be found or extracted"""
 
-    pass
+    field = "duration"
 
 
 class AirDateNotFoundError(FieldNotFoundError):
     """Raised when air date cannot be found or extracted"""
 
-    pass
+    field = "air_date"
 
 
 class TranscriptNotFoundError(FieldNotFoundError):
     """Raised when transcript cannot be found or extracted"""
 
-    pass
+    field = "transcript"
 
 
 class TitleNotFoundError(FieldNotFoundError):
     """Raised when episode title cannot be found or extracted"""
 
-    pass
+    field = "title"
 
 
 class RelatedProgramsNotFoundError(FieldNotFoundError):
     """Raised when related programs cannot be found or extracted"""
 
-    pass
+    field = "related"
@@ -0,0 +1,300 @@
+"""
+Pluggable task executors: serial, thread pool, process pool or Ray.
+
+The scripts run the same plain task functions on whichever backend fits the
+job. Small jobs run serially or on a local pool and start in milliseconds;
+Ray is only imported (and `ray.init` only called) when the Ray backend is
+chosen, e.g. to scale out on a cluster.
+
+    with get_executor("auto", num_tasks=len(urls)) as executor:
+        for results in executor.map_batches(parse_pages, urls):
+            ...
+
+Items are submitted in batches (one task per batch) whose size adapts so
+that a task takes about `target_seconds`, with a cap on the number of tasks
+in flight; completed tasks are collected together. Scheduling overhead and
+driver memory therefore stay proportional to the number of workers, not to
+the number of items.
+
+Task functions (and what they reference) must be picklable for the process
+and Ray backends, so they should be module-level functions.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import partial
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Literal
+
+ExecutorBackend = Literal["serial", "thread", "process", "ray"]
+
+EXECUTOR_BACKENDS: tuple[str, ...] = ("auto", "serial", "thread", "process", "ray")
+
+## -- jobs this small aren't worth starting a pool for
+SERIAL_MAX_TASKS: int = 16
+
+## -- with a Ray cluster to connect to (RAY_ADDRESS), jobs this large use Ray
+RAY_MIN_TASKS: int = 1000
+
+## -- adaptive batches aim for tasks of about this long (long enough to amortize
+## -- per-task overhead, short enough to balance load and report progress)
+DEFAULT_TARGET_SECONDS: float = 1.0
+MAX_BATCH_SIZE: int = 256
+
+## -- floor on the measured time per item (timer resolution can report 0.0)
+MIN_SECONDS_PER_ITEM: float = 1e-6
+
+## -- tasks in flight per worker (keeps workers busy while results are handled)
+TASKS_IN_FLIGHT_PER_WORKER: int = 2
+
+
+def choose_backend(num_tasks: int, io_bound: bool = False) -> ExecutorBackend:
+    """Pick a backend from the size of a job (`auto`)."""
+    if num_tasks <= SERIAL_MAX_TASKS:
+        return "serial"
+    if os.environ.get("RAY_ADDRESS") and num_tasks >= RAY_MIN_TASKS:
+        return "ray"
+    return "thread" if io_bound else "process"
+
+
+class BatchSizer:
+    """Adaptive batch size: grows (or shrinks) so that a task takes about
+    `target_seconds`, from a moving average of the time per item."""
+
+    def __init__(
+        self,
+        target_seconds: float = DEFAULT_TARGET_SECONDS,
+        max_size: int = MAX_BATCH_SIZE,
+    ):
+        self.target_seconds = target_seconds
+        self.max_size = max_size
+        self.seconds_per_item: float | None = None
+
+    def next_size(self) -> int:
+        ## -- start with single items to measure quickly
+        if self.seconds_per_item is None:
+            return 1
+        size = int(self.target_seconds / self.seconds_per_item)
+        return max(1, min(size, self.max_size))
+
+    def record(self, num_items: int, seconds: float) -> None:
+        per_item = max(seconds / num_items, MIN_SECONDS_PER_ITEM)
+        if self.seconds_per_item is None:
+            self.seconds_per_item = per_item
+        else:
+            self.seconds_per_item = 0.7 * self.seconds_per_item + 0.3 * per_item
+
+
+def _timed(fn: Callable[[list[Any]], Any], batch: list[Any]) -> tuple[Any, float]:
+    """Run a batch task, also returning how long it took (on the worker)."""
+    started = time.perf_counter()
+    result = fn(batch)
+    return result, time.perf_counter() - started
+
+
+def _apply_each(fn: Callable[[Any], Any], batch: list[Any]) -> list[Any]:
+    return [fn(item) for item in batch]
+
+
+class TaskExecutor:
+    """Run task functions over items; use as a context manager.
+
+    Backends implement `_submit` (start a task) and `_wait` (block until at
+    least one task is done, returning all the done ones with their results).
+    """
+
+    backend: ExecutorBackend
+
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def __enter__(self) -> "TaskExecutor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    @property
+    def max_in_flight(self) -> int:
+        return TASKS_IN_FLIGHT_PER_WORKER * self.max_workers
+
+    def map_batches(
+        self,
+        fn: Callable[[list[Any]], Any],
+        items: Iterable[Any],
+        batch_size: int | None = None,
+        target_seconds: float = DEFAULT_TARGET_SECONDS,
+        ordered: bool = False,
+    ) -> Iterator[Any]:
+        """Yield `fn(batch)` for batches of items, in completion order (or in
+        input order with `ordered`).
+
+        Batches have `batch_size` items, or an adaptive size when `None`.
+        Items are consumed lazily, as tasks complete.
+        """
+        sizer = BatchSizer(target_seconds)
+        task_fn = partial(_timed, fn)
+        items = iter(items)
+        ## -- task -> (batch number, batch size)
+        in_flight: dict[Any, tuple[int, int]] = {}
+        ## -- results held back until the batches before them are done (`ordered`);
+        ## -- they count towards the in-flight cap, so a slow batch can't pile them up
+        done: dict[int, Any] = {}
+        num_submitted = num_yielded = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) + len(done) < self.max_in_flight:
+                batch = list(islice(items, batch_size or sizer.next_size()))
+                if not batch:
+                    exhausted = True
+                    break
+                in_flight[self._submit(task_fn, batch)] = (num_submitted, len(batch))
+                num_submitted += 1
+            if not in_flight:
+                return
+
+            for task, (result, seconds) in self._wait(list(in_flight)):
+                number, size = in_flight.pop(task)
+                sizer.record(size, seconds)
+                if not ordered:
+                    yield result
+                    continue
+                done[number] = result
+                while num_yielded in done:
+                    yield done.pop(num_yielded)
+                    num_yielded += 1
+
+    def map(
+        self, fn: Callable[[Any], Any], items: Iterable[Any], ordered: bool = False
+    ) -> Iterator[Any]:
+        """Yield `fn(item)` for every item, in completion order (or in input
+        order with `ordered`)."""
+        for results in self.map_batches(
+            partial(_apply_each, fn), items, ordered=ordered
+        ):
+            yield from results
+
+    def _submit(self, fn: Callable[[list[Any]], Any], batch: list[Any]) -> Any:
+        raise NotImplementedError
+
+    def _wait(self, tasks: list[Any]) -> list[tuple[Any, Any]]:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class _CompletedTask:
+    __slots__ = ("result",)
+
+    def __init__(self, result: Any):
+        self.result = result
+
+
+class SerialExecutor(TaskExecutor):
+    backend = "serial"
+
+    def __init__(self):
+        super().__init__(max_workers=1)
+
+    @property
+    def max_in_flight(self) -> int:
+        return 1
+
+    def _submit(
+        self, fn: Callable[[list[Any]], Any], batch: list[Any]
+    ) -> _CompletedTask:
+        ## -- run right away
+        return _CompletedTask(fn(batch))
+
+    def _wait(self, tasks: list[_CompletedTask]) -> list[tuple[_CompletedTask, Any]]:
+        return [(task, task.result) for task in tasks]
+
+
+class PoolExecutor(TaskExecutor):
+    """Thread or process pool."""
+
+    def __init__(self, backend: ExecutorBackend, max_workers: int | None = None):
+        super().__init__(max_workers)
+        self.backend = backend
+        pool_class = ThreadPoolExecutor if backend == "thread" else ProcessPoolExecutor
+        self._pool: Executor = pool_class(self.max_workers)
+
+    def _submit(self, fn: Callable[[list[Any]], Any], batch: list[Any]) -> Future:
+        return self._pool.submit(fn, batch)
+
+    def _wait(self, tasks: list[Future]) -> list[tuple[Future, Any]]:
+        done, _ = wait(tasks, return_when=FIRST_COMPLETED)
+        return [(future, future.result()) for future in done]
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+
+
+class RayExecutor(TaskExecutor):
+    """Ray tasks; connects to (or starts) Ray on first use.
+
+    Without `max_workers`, the in-flight cap follows the cluster's CPUs.
+    Arrow results (e.g. record batches) come back through Ray's object store
+    without being pickled row by row.
+    """
+
+    backend = "ray"
+
+    def __init__(self, max_workers: int | None = None):
+        ## -- imported here so the other backends never pay for importing Ray
+        import ray
+
+        self._ray = ray
+        ## -- only shut down a Ray session this executor started
+        self._owns_session = not ray.is_initialized()
+        if self._owns_session:
+            ray.init(log_to_driver=False, logging_level=logging.CRITICAL)
+        super().__init__(max_workers or int(ray.cluster_resources().get("CPU", 1)))
+        self._remote = ray.remote(lambda fn, batch: fn(batch))
+        ## -- the task function is put in the object store once per `map_batches`
+        self._fn = self._fn_ref = None
+
+    def _submit(self, fn: Callable[[list[Any]], Any], batch: list[Any]) -> Any:
+        if fn is not self._fn:
+            self._fn, self._fn_ref = fn, self._ray.put(fn)
+        return self._remote.remote(self._fn_ref, batch)
+
+    def _wait(self, tasks: list[Any]) -> list[tuple[Any, Any]]:
+        ## -- block for one task, then collect every other finished one with it
+        self._ray.wait(tasks, num_returns=1)
+        ready, _ = self._ray.wait(tasks, num_returns=len(tasks), timeout=0)
+        return list(zip(ready, self._ray.get(ready)))
+
+    def shutdown(self) -> None:
+        if self._owns_session:
+            self._ray.shutdown()
+
+
+def get_executor(
+    backend: ExecutorBackend | Literal["auto"] = "auto",
+    num_tasks: int = 0,
+    max_workers: int | None = None,
+    io_bound: bool = False,
+) -> TaskExecutor:
+    """Executor for a job of `num_tasks` items (`auto` picks the backend)."""
+    if backend == "auto":
+        backend = choose_backend(num_tasks, io_bound=io_bound)
+    if backend == "serial":
+        return SerialExecutor()
+    if backend in ("thread", "process"):
+        return PoolExecutor(backend, max_workers)
+    if backend == "ray":
+        return RayExecutor(max_workers)
+    raise ValueError(
+        f"Unknown executor backend '{backend}' (expected one of {EXECUTOR_BACKENDS})"
+    )
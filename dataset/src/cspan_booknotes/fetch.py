@@ -0,0 +1,250 @@
+"""
+Async fetch engine for crawling booknotes.c-span.org.
+
+All requests share one pooled keep-alive `httpx.AsyncClient`, so the TCP and
+TLS handshakes are paid once per connection instead of once per page.
+Concurrency is bounded, every request has a timeout, and transient failures
+(connection errors, timeouts, 429 and 5xx responses) are retried with
+jittered exponential backoff. An optional `AdaptiveRateController` adapts
+concurrency and request rate to how the origin responds.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, TypedDict
+
+import httpx
+
+from cspan_booknotes.rate import AdaptiveRateController
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
+}
+
+NOT_MODIFIED: int = 304
+
+## -- responses worth retrying (rate limited or server-side trouble)
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+DEFAULT_MAX_CONCURRENCY: int = 8
+DEFAULT_TIMEOUT: float = 30.0
+DEFAULT_MAX_RETRIES: int = 3
+DEFAULT_BACKOFF_BASE: float = 0.5
+DEFAULT_BACKOFF_MAX: float = 30.0
+
+
+class FetchResult(TypedDict):
+    url: str
+    status: int
+    content: bytes
+    headers: dict[str, str]
+    elapsed: float  # seconds, for the successful attempt
+    attempts: int
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for the given (0-based) attempt."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def retry_after_delay(response: httpx.Response) -> float | None:
+    """Seconds requested by a `Retry-After` header (when given in seconds)."""
+    value = response.headers.get("Retry-After")
+    if value is None or not value.strip().isdigit():
+        return None
+    return float(value)
+
+
+class Fetcher:
+    """Fetch pages concurrently over a shared connection pool.
+
+    Use as an async context manager so the pool is opened and closed once:
+
+        async with Fetcher(max_concurrency=8) as fetcher:
+            result = await fetcher.fetch(url)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        headers: dict[str, str] = DEFAULT_HEADERS,
+        transport: httpx.AsyncBaseTransport | None = None,
+        controller: AdaptiveRateController | None = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.headers = headers
+        self.transport = transport
+        self.controller = controller
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self) -> "Fetcher":
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+            follow_redirects=True,
+            transport=self.transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        ## -- `max_concurrency` is a hard cap; the controller adapts below it
+        async with self._semaphore:
+            if self.controller is None:
+                yield
+            else:
+                async with self.controller.slot():
+                    yield
+
+    async def _record(
+        self, latency: float, status: int | None = None, error: bool = False
+    ) -> None:
+        if self.controller is not None:
+            await self.controller.record(latency, status=status, error=error)
+
+    async def fetch(
+        self, url: str, headers: dict[str, str] | None = None
+    ) -> FetchResult:
+        """Fetch a single url, retrying transient failures.
+
+        `headers` are sent in addition to the client defaults (e.g. the
+        conditional `If-None-Match`/`If-Modified-Since` validators); a
+        `304 Not Modified` response is returned with empty content.
+
+        Raises the last `httpx.HTTPError` once retries are exhausted, or
+        immediately for non-retryable error responses (e.g. 404).
+        """
+        if self._client is None:
+            raise RuntimeError("Fetcher must be used as an async context manager")
+
+        attempt = 0
+        while True:
+            delay = None
+            async with self._slot():
+                started = time.perf_counter()
+                try:
+                    response = await self._client.get(url, headers=headers)
+                except httpx.TransportError:
+                    ## -- connection errors and timeouts
+                    await self._record(time.perf_counter() - started, error=True)
+                    if attempt >= self.max_retries:
+                        raise
+                else:
+                    elapsed = time.perf_counter() - started
+                    await self._record(elapsed, status=response.status_code)
+                    if (
+                        response.status_code in RETRY_STATUS_CODES
+                        and attempt < self.max_retries
+                    ):
+                        delay = retry_after_delay(response)
+                    else:
+                        if response.status_code != NOT_MODIFIED:
+                            response.raise_for_status()
+                        return FetchResult(
+                            url=url,
+                            status=response.status_code,
+                            content=response.content,
+                            headers=dict(response.headers),
+                            elapsed=elapsed,
+                            attempts=attempt + 1,
+                        )
+
+            ## -- back off outside the request slot so other requests can proceed
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def fetch_many(
+        self,
+        urls: list[str],
+        return_exceptions: bool = False,
+        request_headers: dict[str, dict[str, str]] | None = None,
+    ) -> list[FetchResult | BaseException]:
+        """Fetch all urls concurrently; results are returned in input order.
+
+        Mirrors `asyncio.gather`: with `return_exceptions=True` failed urls
+        yield their exception instead of aborting the whole batch.
+        `request_headers` maps urls to extra headers for that request.
+        """
+        request_headers = request_headers or {}
+        return await asyncio.gather(
+            *(self.fetch(url, headers=request_headers.get(url)) for url in urls),
+            return_exceptions=return_exceptions,
+        )
+
+
+class BackgroundFetcher:
+    """Blocking facade over a `Fetcher` running on its own event loop thread.
+
+    Lets any number of worker threads share one connection pool (and rate
+    controller):
+
+        with BackgroundFetcher(max_concurrency=8) as fetcher:
+            result = fetcher.fetch(url)  # callable from any thread
+    """
+
+    def __init__(self, **fetcher_options):
+        self.fetcher = Fetcher(**fetcher_options)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="fetcher", daemon=True
+        )
+
+    def __enter__(self) -> "BackgroundFetcher":
+        self._thread.start()
+        self._call(self.fetcher.__aenter__())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._call(self.fetcher.__aexit__(*exc_info))
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def fetch(self, url: str, headers: dict[str, str] | None = None) -> FetchResult:
+        """Fetch a url on the fetcher's loop (see `Fetcher.fetch`)."""
+        return self._call(self.fetcher.fetch(url, headers=headers))
+
+
+def fetch_pages(
+    urls: list[str],
+    return_exceptions: bool = False,
+    request_headers: dict[str, dict[str, str]] | None = None,
+    **fetcher_options,
+) -> list[FetchResult | BaseException]:
+    """Synchronous entry point: fetch `urls` with a single shared `Fetcher`."""
+
+    async def _fetch_pages():
+        async with Fetcher(**fetcher_options) as fetcher:
+            return await fetcher.fetch_many(
+                urls,
+                return_exceptions=return_exceptions,
+                request_headers=request_headers,
+            )
+
+    return asyncio.run(_fetch_pages())
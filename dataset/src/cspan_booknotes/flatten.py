@@ -0,0 +1,118 @@
+"""
+Vectorized flattening of parsed programs into the flat datasets.
+
+Parsed programs are scanned (e.g. from the `ParsedProgramStore`) as nested
+columns, and the `programs`, `transcripts` and `related_items` tables are
+produced with lazy Polars `explode`/`unnest`/`str.strptime` expressions.
+Nothing is materialized per program in Python, so the plans can run on the
+streaming engine.
+"""
+
+import polars as pl
+
+AIR_DATE_FORMAT = "%B %d, %Y"
+
+## ------------------------------ ##
+## ---- FLAT DATASET SCHEMAS ---- ##
+## ------------------------------ ##
+
+PROGRAMS_SCHEMA = pl.Schema(
+    {
+        "program_id": pl.String,
+        "guest": pl.String,
+        "title": pl.String,
+        "description": pl.String,
+        "air_date": pl.Datetime("us"),
+        "book_isbn": pl.String,
+        "url": pl.String,
+    }
+)
+
+TRANSCRIPTS_SCHEMA = pl.Schema(
+    {
+        "program_id": pl.String,
+        "sequence": pl.Int64,
+        "speaker_role": pl.String,
+        "speaker_name": pl.String,
+        "text": pl.String,
+    }
+)
+
+RELATED_ITEMS_SCHEMA = pl.Schema(
+    {
+        "program_id": pl.String,
+        "related_id": pl.String,
+        "guest": pl.String,
+        "title": pl.String,
+        "url": pl.String,
+    }
+)
+
+
+FLAT_DATASET_SCHEMAS: dict[str, pl.Schema] = {
+    "programs": PROGRAMS_SCHEMA,
+    "transcripts": TRANSCRIPTS_SCHEMA,
+    "related_items": RELATED_ITEMS_SCHEMA,
+}
+
+
+## -------------------------- ##
+## ---- FLATTENING PLANS ---- ##
+## -------------------------- ##
+
+
+def flatten_programs(programs: pl.LazyFrame) -> pl.LazyFrame:
+    return programs.select(
+        pl.col("id").alias("program_id"),
+        "guest",
+        "title",
+        "description",
+        pl.col("air_date").str.strptime(pl.Datetime("us"), AIR_DATE_FORMAT),
+        "book_isbn",
+        "url",
+    ).cast(PROGRAMS_SCHEMA)
+
+
+def flatten_transcripts(programs: pl.LazyFrame) -> pl.LazyFrame:
+    """One row per transcript entry; `sequence` counts from 0 within a program."""
+    return (
+        programs.select(pl.col("id").alias("program_id"), "transcript")
+        ## -- exploding an empty list would leave a null row behind
+        .filter(pl.col("transcript").struct.field("index").list.len() > 0)
+        .unnest("transcript")
+        .explode(["index", "speaker_role", "speaker_name", "text"])
+        .select(
+            "program_id",
+            pl.int_range(pl.len()).over("program_id").alias("sequence"),
+            "speaker_role",
+            "speaker_name",
+            "text",
+        )
+        .cast(TRANSCRIPTS_SCHEMA)
+    )
+
+
+def flatten_related_items(programs: pl.LazyFrame) -> pl.LazyFrame:
+    return (
+        programs.select(pl.col("id").alias("program_id"), "related")
+        .filter(pl.col("related").list.len() > 0)
+        .explode("related")
+        .unnest("related")
+        .select(
+            "program_id",
+            pl.col("id").alias("related_id"),
+            pl.col("author").alias("guest"),
+            "title",
+            "url",
+        )
+        .cast(RELATED_ITEMS_SCHEMA)
+    )
+
+
+def flatten_parsed_programs(programs: pl.LazyFrame) -> dict[str, pl.LazyFrame]:
+    """Lazy plans for the `programs`, `transcripts` and `related_items` datasets."""
+    return {
+        "programs": flatten_programs(programs),
+        "transcripts": flatten_transcripts(programs),
+        "related_items": flatten_related_items(programs),
+    }
@@ -0,0 +1,130 @@
+"""
+Fragment cache: keep only the page regions the parsers read.
+
+Most of a Booknotes page is navigation, player and script markup. In
+fragment mode each response is reduced to a small HTML document holding just
+the regions in `PROGRAM_PAGE_REGION_IDS`, which parses to the same `Program`
+as the full page. Fragments are stored under `<program_id>@<SELECTOR_VERSION>`,
+a hash of the region ids and field selectors, so changing a selector makes
+every fragment cached under the old one a miss. A deterministic sample of
+programs can also keep their full page, for debugging selector changes.
+"""
+
+import hashlib
+import json
+
+import lxml.html
+from lxml import etree
+
+from cspan_booknotes.archive import HtmlArchive
+from cspan_booknotes.cache import CachedResponse, HtmlCache
+from cspan_booknotes.fetch import FetchResult
+from cspan_booknotes.parser.extract import PAGE_TARGETS, PROGRAM_PAGE_REGION_IDS
+
+REGIONS_XPATH = etree.XPath(
+    "//*["
+    + " or ".join(f"@id='{region_id}'" for region_id in PROGRAM_PAGE_REGION_IDS)
+    + "]"
+)
+
+
+def selector_version() -> str:
+    """Short hash of everything that decides which markup the parsers read."""
+    selectors = {
+        "regions": list(PROGRAM_PAGE_REGION_IDS),
+        "fields": {field: list(target) for field, target in PAGE_TARGETS.items()},
+    }
+    encoded = json.dumps(selectors, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+SELECTOR_VERSION = selector_version()
+
+
+def extract_fragments(content: bytes | str) -> bytes:
+    """Reduce a program page to a minimal UTF-8 document of its parsed regions."""
+    document = lxml.html.document_fromstring(content)
+
+    fragments = []
+    seen_ids = set()
+    for element in REGIONS_XPATH(document):
+        region_id = element.get("id")
+        ## -- first match per id wins (same as the parsers), nested copies are
+        ## -- already part of their enclosing region
+        if region_id in seen_ids or any(
+            ancestor.get("id") in PROGRAM_PAGE_REGION_IDS
+            for ancestor in element.iterancestors()
+        ):
+            continue
+        seen_ids.add(region_id)
+        fragments.append(
+            lxml.html.tostring(element, encoding="unicode", with_tail=False)
+        )
+
+    return (
+        '<html><head><meta charset="utf-8"></head><body>'
+        + "".join(fragments)
+        + "</body></html>"
+    ).encode()
+
+
+def in_full_page_sample(program_id: str, sample_rate: float) -> bool:
+    """Deterministically select ~`sample_rate` of programs by id."""
+    bucket = int(hashlib.sha256(program_id.encode()).hexdigest()[:8], 16)
+    return bucket / 0xFFFFFFFF < sample_rate
+
+
+class FragmentCache:
+    """Store page fragments (and a sample of full pages) in an HTML cache/archive."""
+
+    def __init__(
+        self,
+        store: HtmlCache | HtmlArchive,
+        full_page_sample_rate: float = 0.0,
+        selector_version: str = SELECTOR_VERSION,
+    ):
+        self.store = store
+        self.full_page_sample_rate = full_page_sample_rate
+        self.selector_version = selector_version
+
+    def key(self, program_id: str) -> str:
+        return f"{program_id}@{self.selector_version}"
+
+    def __contains__(self, program_id: str) -> bool:
+        return self.key(program_id) in self.store
+
+    def program_ids(self) -> list[str]:
+        suffix = f"@{self.selector_version}"
+        return [
+            key.removesuffix(suffix)
+            for key in self.store.program_ids()
+            if key.endswith(suffix)
+        ]
+
+    def get_metadata(self, program_id: str) -> CachedResponse | None:
+        return self.store.get_metadata(self.key(program_id))
+
+    def get_content(self, program_id: str) -> bytes | None:
+        """Fragment document for a program, or `None` when not cached."""
+        return self.store.get_content(self.key(program_id))
+
+    def get_full_page(self, program_id: str) -> bytes | None:
+        """Full page for sampled programs, `None` otherwise."""
+        return self.store.get_content(program_id)
+
+    def put(self, program_id: str, result: FetchResult) -> CachedResponse:
+        if in_full_page_sample(program_id, self.full_page_sample_rate):
+            self.store.put(program_id, result)
+
+        ## -- the stored digest is the fragment's, so refreshes only report a
+        ## -- change when a region the parsers read has changed
+        fragment_result = FetchResult(
+            result, content=extract_fragments(result["content"])
+        )
+        return self.store.put(self.key(program_id), fragment_result)
+
+    def touch(self, program_id: str, result: FetchResult) -> CachedResponse:
+        return self.store.touch(self.key(program_id), result)
+
+    def conditional_headers(self, program_id: str) -> dict[str, str]:
+        return self.store.conditional_headers(self.key(program_id))
@@ -1,18 +1,63 @@
-from typing import TypedDict
+from functools import cache
+from typing import Literal, TypedDict
 
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml.html import HtmlElement
+
+from cspan_booknotes.fetch import DEFAULT_HEADERS, DEFAULT_TIMEOUT
+
+## -- tree builders available to the program parsers
+ParserBackend = Literal["bs4", "lxml"]
+
+PARSER_BACKENDS: tuple[ParserBackend, ...] = ("bs4", "lxml")
+
+
+@cache
+def program_page_strainer() -> SoupStrainer:
+    """Only keeps the page regions read by the parsers (and their subtrees)."""
+    ## -- imported here: the parsers import this module
+    from cspan_booknotes.parser.extract import PROGRAM_PAGE_REGION_IDS
+
+    return SoupStrainer(id=list(PROGRAM_PAGE_REGION_IDS))
 
 
 ## ---- COLLECT HTML PAGE CONTENT ---- ##
 class PageContent(TypedDict):
     url: str
-    html: BeautifulSoup
+    html: BeautifulSoup | HtmlElement
 
 
-def get_program_page(url: str) -> PageContent:
+def build_html(
+    content: bytes | str, backend: ParserBackend = "bs4", partial: bool = False
+) -> BeautifulSoup | HtmlElement:
+    """Build the document tree used by the parser for `backend`.
+
+    With `partial=True` only the regions listed in `PROGRAM_PAGE_REGION_IDS`
+    are materialized. This is supported by the BeautifulSoup backend only:
+    lxml builds its full tree in C faster than it can filter parse events
+    through a Python parser target.
+    """
+    if backend == "bs4":
+        parse_only = program_page_strainer() if partial else None
+        return BeautifulSoup(content, features="lxml", parse_only=parse_only)
+    if backend == "lxml":
+        if partial:
+            raise ValueError("Partial parsing is only supported by the 'bs4' backend")
+        return lxml.html.document_fromstring(content)
+    raise ValueError(f"Unknown parser backend: '{backend}'")
+
+
+def get_program_html(url: str) -> bytes:
     assert isinstance(url, str)
-    resp = requests.get(url)
+    resp = requests.get(url, headers=DEFAULT_HEADERS, timeout=DEFAULT_TIMEOUT)
     resp.raise_for_status()
-    html = BeautifulSoup(resp.content, features="lxml")
+    return resp.content
+
+
+def get_program_page(
+    url: str, backend: ParserBackend = "bs4", partial: bool = False
+) -> PageContent:
+    html = build_html(get_program_html(url), backend=backend, partial=partial)
     return PageContent(url=url, html=html)
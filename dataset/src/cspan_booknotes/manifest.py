@@ -0,0 +1,173 @@
+"""
+Run manifest for incremental pipeline stages.
+
+`manifest.json` records, per program id, what each stage last produced it
+from:
+
+- `html_digest`: digest of the cached page (or fragment) it was parsed from;
+- `parser_version`: hash of the parser code and schema it was parsed with;
+- `parsed_digest`: digest of the parsed program record;
+- `flattened_digest`: the `parsed_digest` whose flat rows are currently in
+  the Parquet outputs.
+
+plus, per stage, the code version and settings its outputs were built with
+(`stages`). A stage only recomputes programs whose inputs or code version
+changed: a selector fix re-parses everything, an unchanged nightly refresh
+re-parses and re-flattens nothing.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pkgutil
+from importlib import import_module
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterable, TypedDict
+
+from cspan_booknotes import flatten, get, layout, models, parser, partition, publish
+from cspan_booknotes.models.schema import SCHEMA_FINGERPRINT_KEY
+
+## ----------------------- ##
+## ---- CODE VERSIONS ---- ##
+## ----------------------- ##
+
+
+def code_version(*modules: ModuleType) -> str:
+    """Short hash of the source code of modules (packages include their
+    submodules)."""
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(inspect.getsource(module).encode())
+        if hasattr(module, "__path__"):
+            for submodule in sorted(pkgutil.iter_modules(module.__path__)):
+                digest.update(
+                    code_version(
+                        import_module(f"{module.__name__}.{submodule.name}")
+                    ).encode()
+                )
+    return digest.hexdigest()[:16]
+
+
+## -- parsed records change when the parsers, page building or models change
+PARSER_VERSION = code_version(parser, get, models)
+
+## -- flat rows (and their file layout) change with the flattening plans and writers
+FLATTEN_VERSION = code_version(flatten, layout, partition, publish)
+
+
+def parsed_digest(program_data: dict[str, Any]) -> str:
+    """Digest of a parsed program record (ignoring its schema stamp)."""
+    content = {
+        key: value
+        for key, value in program_data.items()
+        if key != SCHEMA_FINGERPRINT_KEY
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+## ------------------ ##
+## ---- MANIFEST ---- ##
+## ------------------ ##
+
+
+class ManifestEntry(TypedDict, total=False):
+    html_digest: str
+    parser_version: str
+    parsed_digest: str
+    flattened_digest: str
+
+
+class RunManifest:
+    """Per-program record of what each pipeline stage last built, saved as JSON.
+
+    Programs without an entry (e.g. parsed before the manifest existed) are
+    treated as changed, so the first run after adding the manifest rebuilds
+    everything once.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        try:
+            with open(self.path, "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        self.stages: dict[str, dict[str, Any]] = manifest.get("stages", {})
+        self.programs: dict[str, ManifestEntry] = manifest.get("programs", {})
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"stages": self.stages, "programs": self.programs}, f)
+        os.replace(tmp_path, self.path)
+
+    def __getitem__(self, program_id: str) -> ManifestEntry:
+        return self.programs.setdefault(program_id, ManifestEntry())
+
+    ## --------------- ##
+    ## ---- PARSE ---- ##
+    ## --------------- ##
+
+    def needs_parse(self, program_id: str, html_digest: str | None) -> bool:
+        """Whether a program's page or the parser changed since it was parsed
+        (`html_digest=None` when the page is not cached: it will be fetched)."""
+        entry = self.programs.get(program_id, {})
+        return (
+            entry.get("parser_version") != PARSER_VERSION
+            or html_digest is None
+            or entry.get("html_digest") != html_digest
+        )
+
+    def record_parse(self, program_id: str, html_digest: str, digest: str) -> None:
+        """Record a program parsed by the current parser (`digest` is its
+        `parsed_digest`)."""
+        entry = self[program_id]
+        entry["html_digest"] = html_digest
+        entry["parser_version"] = PARSER_VERSION
+        entry["parsed_digest"] = digest
+
+    def record_parsed(self, program_id: str, program_data: dict[str, Any]) -> None:
+        """Record the digest of a program's current parsed record."""
+        self[program_id]["parsed_digest"] = parsed_digest(program_data)
+
+    ## ----------------- ##
+    ## ---- FLATTEN ---- ##
+    ## ----------------- ##
+
+    def stage_changed(self, stage: str, settings: dict[str, Any]) -> bool:
+        """Whether a stage's outputs were built with other code or settings."""
+        return self.stages.get(stage) != settings
+
+    def unflattened(self, program_ids: Iterable[str]) -> list[str]:
+        """Programs whose current parsed record isn't the one in the flat outputs."""
+        return [
+            program_id
+            for program_id in program_ids
+            if "parsed_digest" not in self.programs.get(program_id, {})
+            or self.programs[program_id].get("flattened_digest")
+            != self.programs[program_id]["parsed_digest"]
+        ]
+
+    def flattened_ids(self) -> set[str]:
+        return {
+            program_id
+            for program_id, entry in self.programs.items()
+            if "flattened_digest" in entry
+        }
+
+    def record_flattened(
+        self,
+        stage: str,
+        settings: dict[str, Any],
+        program_ids: Iterable[str],
+        removed_ids: Iterable[str] = (),
+    ) -> None:
+        self.stages[stage] = settings
+        for program_id in program_ids:
+            entry = self[program_id]
+            entry["flattened_digest"] = entry["parsed_digest"]
+        for program_id in removed_ids:
+            self[program_id].pop("flattened_digest", None)
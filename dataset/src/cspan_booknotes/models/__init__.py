@@ -5,6 +5,7 @@ from .fields import (
     ProgramId,
     RelatedProgram,
     Transcript,
+    TranscriptColumns,
     TranscriptEntry,
 )
 from .program import Program as Program
@@ -13,6 +14,7 @@ __all__ = [
     "Program",
     "TranscriptEntry",
     "Transcript",
+    "TranscriptColumns",
     "ProgramId",
     "GuestAuthor",
     "BookISBN",
@@ -1,6 +1,15 @@
-from typing import Annotated, Literal
-
-from pydantic import AfterValidator, BaseModel, Field
+from typing import Annotated, Any, Iterator, Literal
+
+import pyarrow as pa
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    Field,
+    GetCoreSchemaHandler,
+    GetJsonSchemaHandler,
+)
+from pydantic.json_schema import JsonSchemaValue
+from pydantic_core import CoreSchema, core_schema
 
 from cspan_booknotes.models.validators import (
     validate_air_date,
@@ -109,8 +118,184 @@ class TranscriptEntry(BaseModel):
     text: str = Field(description="Full text content of the speaker's statement")
 
 
+SPEAKER_ROLES = frozenset({"host", "guest"})
+
+TRANSCRIPT_ARROW_SCHEMA = pa.schema(
+    [
+        ("index", pa.int32()),
+        ("speaker_role", pa.string()),
+        ("speaker_name", pa.string()),
+        ("text", pa.string()),
+    ]
+)
+
+
+class TranscriptColumns:
+    """Struct-of-arrays transcript: one list per `TranscriptEntry` field.
+
+    Avoids a pydantic object per conversational turn. Validation runs once
+    over whole columns, serialization (`model_dump`/JSON) emits the columns
+    as-is and `to_arrow` builds an Arrow table without per-row dicts.
+    Iterating still yields `TranscriptEntry` objects for row-wise callers.
+    Validation also accepts the row format (a list of entries).
+    """
+
+    __slots__ = ("index", "speaker_role", "speaker_name", "text")
+
+    def __init__(
+        self,
+        index: list[int] | None = None,
+        speaker_role: list[str] | None = None,
+        speaker_name: list[str] | None = None,
+        text: list[str] | None = None,
+    ):
+        self.index = index if index is not None else []
+        self.speaker_role = speaker_role if speaker_role is not None else []
+        self.speaker_name = speaker_name if speaker_name is not None else []
+        self.text = text if text is not None else []
+
+    @classmethod
+    def from_entries(
+        cls, entries: list[TranscriptEntry | dict[str, Any]]
+    ) -> "TranscriptColumns":
+        columns = cls()
+        for position, entry in enumerate(entries):
+            if isinstance(entry, TranscriptEntry):
+                entry = entry.model_dump()
+            elif not isinstance(entry, dict):
+                raise ValueError(
+                    f"Transcript entry {position} must be an object, got {type(entry).__name__}"
+                )
+            try:
+                columns.append(
+                    entry["index"],
+                    entry["speaker_role"],
+                    entry["speaker_name"],
+                    entry["text"],
+                )
+            except KeyError as error:
+                raise ValueError(
+                    f"Transcript entry {position} is missing {error.args[0]!r}"
+                ) from None
+        return columns
+
+    def append(
+        self, index: int, speaker_role: str, speaker_name: str, text: str
+    ) -> None:
+        self.index.append(index)
+        self.speaker_role.append(speaker_role)
+        self.speaker_name.append(speaker_name)
+        self.text.append(text)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, position: int) -> TranscriptEntry:
+        return TranscriptEntry.model_construct(
+            index=self.index[position],
+            speaker_role=self.speaker_role[position],
+            speaker_name=self.speaker_name[position],
+            text=self.text[position],
+        )
+
+    def __iter__(self) -> Iterator[TranscriptEntry]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TranscriptColumns):
+            return NotImplemented
+        return self.to_columns() == other.to_columns()
+
+    def __repr__(self) -> str:
+        return f"TranscriptColumns(entries={len(self)})"
+
+    ## -- bulk validation (one pass per column)
+
+    def check(self) -> None:
+        """Validate whole columns at once (raises `ValueError`)."""
+        num_entries = len(self.index)
+        if any(
+            len(column) != num_entries
+            for column in (self.speaker_role, self.speaker_name, self.text)
+        ):
+            raise ValueError("Transcript columns must all have the same length")
+        if not all(type(value) is int for value in self.index):
+            raise ValueError("Transcript index values must be integers")
+        invalid_roles = set(self.speaker_role) - SPEAKER_ROLES
+        if invalid_roles:
+            raise ValueError(
+                f"Invalid transcript speaker roles: {sorted(invalid_roles)}"
+            )
+        for name, column in (("speaker_name", self.speaker_name), ("text", self.text)):
+            if not all(type(value) is str for value in column):
+                raise ValueError(f"Transcript {name} values must be strings")
+
+    @classmethod
+    def validate(cls, value: Any) -> "TranscriptColumns":
+        if isinstance(value, TranscriptColumns):
+            columns = value
+        elif isinstance(value, dict):
+            unknown = set(value) - set(cls.__slots__)
+            if unknown:
+                raise ValueError(f"Unknown transcript columns: {sorted(unknown)}")
+            for name, column in value.items():
+                if not isinstance(column, list):
+                    raise ValueError(
+                        f"Transcript column {name!r} must be a list, got {type(column).__name__}"
+                    )
+            columns = cls(**{name: list(value.get(name, [])) for name in cls.__slots__})
+        elif isinstance(value, list):
+            columns = cls.from_entries(value)
+        else:
+            raise ValueError(
+                f"Transcript must be columns or a list of entries, got {type(value).__name__}"
+            )
+        columns.check()
+        return columns
+
+    ## -- serialization (columns are emitted as-is)
+
+    def to_columns(self) -> dict[str, list]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_arrow(self) -> pa.Table:
+        return pa.table(self.to_columns(), schema=TRANSCRIPT_ARROW_SCHEMA)
+
+    ## -- pydantic hooks (validation, serialization and JSON schema)
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls.validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                cls.to_columns
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(
+        cls, schema: CoreSchema, handler: GetJsonSchemaHandler
+    ) -> JsonSchemaValue:
+        return {
+            "type": "object",
+            "properties": {
+                "index": {"type": "array", "items": {"type": "integer"}},
+                "speaker_role": {
+                    "type": "array",
+                    "items": {"enum": sorted(SPEAKER_ROLES), "type": "string"},
+                },
+                "speaker_name": {"type": "array", "items": {"type": "string"}},
+                "text": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": list(cls.__slots__),
+        }
+
+
 Transcript = Annotated[
-    list[TranscriptEntry],
+    TranscriptColumns,
     Field(
         description="Complete conversation transcript between host and guest",
     ),
@@ -0,0 +1,69 @@
+import hashlib
+import importlib
+import inspect
+import json
+import pkgutil
+from typing import Any
+
+from cspan_booknotes import models
+from cspan_booknotes.models.program import Program
+
+## ---------------------------- ##
+## ---- SCHEMA FINGERPRINT ---- ##
+## ---------------------------- ##
+
+## -- key under which parsed program JSON records the schema it was validated with
+SCHEMA_FINGERPRINT_KEY = "schema_fingerprint"
+
+
+def schema_fingerprint() -> str:
+    """Short hash of the `Program` JSON schema and the `models` source code.
+
+    Any change to a field, constraint or validator produces a new fingerprint,
+    so records validated under an older schema are no longer trusted. The
+    source covers validation code the JSON schema can't see (validators,
+    `TranscriptColumns.check`, ...).
+    """
+    schema = json.dumps(Program.model_json_schema(), sort_keys=True)
+    digest = hashlib.sha256(schema.encode())
+    digest.update(inspect.getsource(models).encode())
+    for module in sorted(pkgutil.iter_modules(models.__path__), key=lambda m: m.name):
+        name = f"{models.__name__}.{module.name}"
+        ## -- this module only stamps and loads records, it doesn't validate them
+        if name == __name__:
+            continue
+        digest.update(inspect.getsource(importlib.import_module(name)).encode())
+    return digest.hexdigest()[:16]
+
+
+SCHEMA_FINGERPRINT = schema_fingerprint()
+
+
+def stamp_program(program: Program) -> dict[str, Any]:
+    """Dump a validated program along with the current schema fingerprint."""
+    return {**program.model_dump(), SCHEMA_FINGERPRINT_KEY: SCHEMA_FINGERPRINT}
+
+
+def is_trusted(data: dict[str, Any]) -> bool:
+    """Whether a record was validated under the current schema."""
+    return data.get(SCHEMA_FINGERPRINT_KEY) == SCHEMA_FINGERPRINT
+
+
+## --------------------------------- ##
+## ---- LOADING PARSED PROGRAMS ---- ##
+## --------------------------------- ##
+
+
+def load_program_data(data: dict[str, Any], validate: bool = False) -> dict[str, Any]:
+    """Validated program record as a plain dict.
+
+    Records stamped with the current schema fingerprint were validated when
+    they were parsed and are returned as-is, skipping model construction
+    entirely (pydantic's compiled validation is faster than `model_construct`
+    for nested models, so the trusted path avoids models altogether).
+    Unstamped or stale records, or any record when `validate=True`, go
+    through full `Program` validation.
+    """
+    if not validate and is_trusted(data):
+        return data
+    return stamp_program(Program.model_validate(data))
@@ -1,15 +1,16 @@
-from bs4 import BeautifulSoup
-
 from cspan_booknotes import PageContent
-from cspan_booknotes.models import Program, RelatedProgram, TranscriptEntry
-from cspan_booknotes.parser.air_date import get_original_air_date
-from cspan_booknotes.parser.description import get_program_description
-from cspan_booknotes.parser.guest import get_guest_author
-from cspan_booknotes.parser.isbn import get_book_isbn
+from cspan_booknotes.get import ParserBackend
+from cspan_booknotes.models import Program
+from cspan_booknotes.parser.air_date import parse_original_air_date
+from cspan_booknotes.parser.description import parse_program_description
+from cspan_booknotes.parser.extract import extract_page_elements
+from cspan_booknotes.parser.guest import parse_guest_author
+from cspan_booknotes.parser.isbn import parse_book_isbn
+from cspan_booknotes.parser.lxml_parser import LxmlProgramParser
 from cspan_booknotes.parser.program_id import get_program_id
-from cspan_booknotes.parser.related import get_related_programs
-from cspan_booknotes.parser.title import get_program_title
-from cspan_booknotes.parser.transcript import get_transcript
+from cspan_booknotes.parser.related import parse_related_programs
+from cspan_booknotes.parser.title import parse_program_title
+from cspan_booknotes.parser.transcript import parse_transcript
 
 ## ---------------------------------- ##
 ## ---- PARSE HTML PAGE CONTENT  ---- ##
@@ -18,16 +19,19 @@ from cspan_booknotes.parser.transcript import get_transcript
 
 class ProgramParser:
     def parse(self, page: PageContent) -> Program:
+        ## -- locate every field element in a single walk over the page
+        elements = extract_page_elements(page["html"])
+
         return Program(
             id=self.get_program_id(page["url"]),
             url=page["url"],
-            title=self._get_program_title(page["html"]),
-            guest=self._get_guest_author(page["html"]),
-            description=self._get_program_description(page["html"]),
-            book_isbn=self._get_book_isbn(page["html"]),
-            air_date=self._get_air_date(page["html"]),
-            transcript=self._get_transcript(page["html"]),
-            related=self._get_related_programs(page["html"]),
+            title=parse_program_title(elements["title"]),
+            guest=parse_guest_author(elements["guest"]),
+            description=parse_program_description(elements["description"]),
+            book_isbn=parse_book_isbn(elements["book_isbn"]),
+            air_date=parse_original_air_date(elements["air_date"]),
+            transcript=parse_transcript(elements["transcript"]),
+            related=parse_related_programs(elements["related"]),
         )
 
     def get_program_id(self, url: str) -> str:
@@ -35,23 +39,11 @@ class ProgramParser:
         URLs look like this: 'https://booknotes.c-span.org/Watch/57267-1'."""
         return get_program_id(url)
 
-    def _get_program_title(self, html: BeautifulSoup) -> str:
-        return get_program_title(html)
-
-    def _get_program_description(self, html: BeautifulSoup) -> str | None:
-        return get_program_description(html)
-
-    def _get_air_date(self, html: BeautifulSoup) -> str:
-        return get_original_air_date(html)
-
-    def _get_guest_author(self, html: BeautifulSoup) -> str:
-        return get_guest_author(html)
-
-    def _get_book_isbn(self, html: BeautifulSoup) -> str | None:
-        return get_book_isbn(html)
-
-    def _get_transcript(self, html: BeautifulSoup) -> list[TranscriptEntry]:
-        return get_transcript(html)
 
-    def _get_related_programs(self, html: BeautifulSoup) -> list[RelatedProgram]:
-        return get_related_programs(html)
+def get_parser(backend: ParserBackend = "bs4") -> ProgramParser | LxmlProgramParser:
+    """Return the program parser for the given tree-builder backend."""
+    if backend == "bs4":
+        return ProgramParser()
+    if backend == "lxml":
+        return LxmlProgramParser()
+    raise ValueError(f"Unknown parser backend: '{backend}'")
@@ -1,12 +1,18 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from cspan_booknotes.exceptions import AirDateNotFoundError
 
+FIELD_TAG_TYPE = "span"
+FIELD_TAG_ID = "lblAirDate"
 
-def get_original_air_date(html: BeautifulSoup) -> str:
-    field_element = html.find("span", id="lblAirDate")
+
+def parse_original_air_date(field_element: Tag | None) -> str:
     if field_element is None:
         raise AirDateNotFoundError
 
     field_text = field_element.get_text(strip=True, separator=" ")
     return field_text
+
+
+def get_original_air_date(html: BeautifulSoup) -> str:
+    return parse_original_air_date(html.find(FIELD_TAG_TYPE, id=FIELD_TAG_ID))
@@ -1,6 +1,6 @@
 import re
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from cspan_booknotes.exceptions import DescriptionNotFoundError
 
@@ -8,8 +8,7 @@ DESCRIPTION_TAG_TYPE = "div"
 DESCRIPTION_TAG_ID = "progContent"
 
 
-def get_program_description(html: BeautifulSoup) -> str | None:
-    description_tag = html.find("div", id="progContent")
+def parse_program_description(description_tag: Tag | None) -> str | None:
     if description_tag is None:
         raise DescriptionNotFoundError
 
@@ -18,3 +17,9 @@ def get_program_description(html: BeautifulSoup) -> str | None:
     description_text = re.sub(r"\s+", " ", description_text)
 
     return description_text if description_text != "" else None
+
+
+def get_program_description(html: BeautifulSoup) -> str | None:
+    return parse_program_description(
+        html.find(DESCRIPTION_TAG_TYPE, id=DESCRIPTION_TAG_ID)
+    )
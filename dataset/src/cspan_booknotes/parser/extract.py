@@ -0,0 +1,114 @@
+from typing import NamedTuple
+
+from bs4 import BeautifulSoup, Tag
+
+from cspan_booknotes.parser import (
+    air_date,
+    description,
+    guest,
+    isbn,
+    related,
+    title,
+    transcript,
+)
+
+## ------------------------------------ ##
+## ---- SINGLE-PASS PAGE EXTRACTOR ---- ##
+## ------------------------------------ ##
+
+
+class FieldTarget(NamedTuple):
+    """Location of a field's element on a program page."""
+
+    tag_type: str
+    tag_id: str
+    ## -- enclosing element the target must be nested in (if any)
+    within: "FieldTarget | None" = None
+
+
+PAGE_TARGETS: dict[str, FieldTarget] = {
+    "title": FieldTarget(title.FIELD_TAG_TYPE, title.FIELD_TAG_ID),
+    "guest": FieldTarget(guest.FIELD_TAG_TYPE, guest.FIELD_TAG_ID),
+    "book_isbn": FieldTarget(isbn.FIELD_TAG_TYPE, isbn.FIELD_TAG_ID),
+    "air_date": FieldTarget(air_date.FIELD_TAG_TYPE, air_date.FIELD_TAG_ID),
+    "description": FieldTarget(
+        description.DESCRIPTION_TAG_TYPE, description.DESCRIPTION_TAG_ID
+    ),
+    "transcript": FieldTarget(
+        transcript.FIELD_TAG_TYPE,
+        transcript.FIELD_TAG_ID,
+        within=FieldTarget(transcript.SECTION_TAG_TYPE, transcript.SECTION_TAG_ID),
+    ),
+    "related": FieldTarget(related.FIELD_TAG_TYPE, related.FIELD_TAG_ID),
+}
+
+
+def _region(target: FieldTarget) -> FieldTarget:
+    """Outermost element a field is read from (the target or its scope)."""
+    return target if target.within is None else _region(target.within)
+
+
+## -- ids of the page regions read by the program parsers (everything else on a
+## -- program page is navigation, player and script markup)
+PROGRAM_PAGE_REGION_IDS: tuple[str, ...] = tuple(
+    dict.fromkeys(_region(target).tag_id for target in PAGE_TARGETS.values())
+)
+
+
+def _matches(element: Tag, target: FieldTarget) -> bool:
+    return element.name == target.tag_type and element.get("id") == target.tag_id
+
+
+def extract_page_elements(
+    html: BeautifulSoup, targets: dict[str, FieldTarget] = PAGE_TARGETS
+) -> dict[str, Tag | None]:
+    """Walk the document once and collect the element for every target field.
+
+    Every field gets the element its own lookup would find: the first match
+    in document order, like `html.find(tag_type, id=tag_id)` (matches nested
+    in another field's element included), and for a field `within` a scope,
+    the first match inside the first element matching the scope, like
+    `html.find(scope).find(target)`. The walk stops as soon as every field
+    has been found. Fields without a match are returned as `None`.
+    """
+    targets_by_id: dict[str, list[tuple[str, FieldTarget]]] = {}
+    scopes_by_id: dict[str, list[FieldTarget]] = {}
+    for field, target in targets.items():
+        targets_by_id.setdefault(target.tag_id, []).append((field, target))
+        if target.within is not None:
+            scopes_by_id.setdefault(target.within.tag_id, []).append(target.within)
+
+    found: dict[str, Tag | None] = dict.fromkeys(targets)
+    remaining = len(targets)
+    entered_scopes: set[FieldTarget] = set()
+
+    ## -- depth-first walk; each stack item carries the scopes it is nested in
+    ## -- (only the first element matching a scope counts, as with `find`)
+    stack: list[tuple[Tag, frozenset[FieldTarget]]] = [(html, frozenset())]
+    while stack and remaining:
+        element, scopes = stack.pop()
+
+        tag_id = element.get("id")
+        if tag_id is not None:
+            for field, target in targets_by_id.get(tag_id, ()):
+                if (
+                    found[field] is None
+                    and _matches(element, target)
+                    and (target.within is None or target.within in scopes)
+                ):
+                    found[field] = element
+                    remaining -= 1
+
+            for scope in scopes_by_id.get(tag_id, ()):
+                if scope not in entered_scopes and _matches(element, scope):
+                    entered_scopes.add(scope)
+                    scopes = scopes | {scope}
+
+        ## -- push children in reverse so they are popped in document order
+        stack.extend(
+            (child, scopes)
+            for child in reversed(element.contents)
+            if isinstance(child, Tag)
+        )
+
+    return found
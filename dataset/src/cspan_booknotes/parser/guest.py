@@ -1,12 +1,19 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from cspan_booknotes.exceptions import GuestAuthorNotFoundError
 
+FIELD_TAG_TYPE = "div"
+FIELD_TAG_ID = "AuthorName"
 
-def get_guest_author(html: BeautifulSoup) -> str:
-    """Extract guest author name from HTML."""
-    guest_author_tag = html.find("div", id="AuthorName")
+
+def parse_guest_author(guest_author_tag: Tag | None) -> str:
+    """Extract guest author name from the author name element."""
     if guest_author_tag is None:
         raise GuestAuthorNotFoundError
 
     return guest_author_tag.get_text(strip=True, separator=" ")
+
+
+def get_guest_author(html: BeautifulSoup) -> str:
+    """Extract guest author name from HTML."""
+    return parse_guest_author(html.find(FIELD_TAG_TYPE, id=FIELD_TAG_ID))
@@ -1,12 +1,18 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from cspan_booknotes.exceptions import BookISBNNotFoundError
 
+FIELD_TAG_TYPE = "span"
+FIELD_TAG_ID = "lblISBN"
 
-def get_book_isbn(html: BeautifulSoup) -> str | None:
-    book_isbn_element = html.find("span", id="lblISBN")
+
+def parse_book_isbn(book_isbn_element: Tag | None) -> str | None:
     if book_isbn_element is None:
         raise BookISBNNotFoundError
 
     isbn_text = book_isbn_element.get_text(strip=True, separator=" ")
     return isbn_text if isbn_text != "" else None
+
+
+def get_book_isbn(html: BeautifulSoup) -> str | None:
+    return parse_book_isbn(html.find(FIELD_TAG_TYPE, id=FIELD_TAG_ID))
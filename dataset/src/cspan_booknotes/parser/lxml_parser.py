@@ -0,0 +1,192 @@
+"""
+Program page parser built directly on `lxml.html` trees.
+
+Mirrors `ProgramParser` field-for-field, but locates each field with a
+pre-compiled XPath expression instead of going through BeautifulSoup.
+"""
+
+import re
+from urllib.parse import urljoin
+
+from lxml import etree
+from lxml.html import HtmlElement
+
+from cspan_booknotes.constants import ROOT_URL
+from cspan_booknotes.exceptions import (
+    AirDateNotFoundError,
+    BookISBNNotFoundError,
+    DescriptionNotFoundError,
+    FieldNotFoundError,
+    GuestAuthorNotFoundError,
+    RelatedProgramsNotFoundError,
+    TitleNotFoundError,
+    TranscriptNotFoundError,
+)
+from cspan_booknotes.get import PageContent
+from cspan_booknotes.models import Program, RelatedProgram, TranscriptColumns
+from cspan_booknotes.parser import (
+    air_date,
+    description,
+    guest,
+    isbn,
+    related,
+    title,
+    transcript,
+)
+from cspan_booknotes.parser.program_id import get_program_id
+
+## ---------------------------------- ##
+## ---- COMPILED XPATH SELECTORS ---- ##
+## ---------------------------------- ##
+
+
+def _by_id(tag_type: str, tag_id: str) -> str:
+    return f"//{tag_type}[@id='{tag_id}']"
+
+
+def _has_class(class_name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+TITLE_XPATH = etree.XPath(_by_id(title.FIELD_TAG_TYPE, title.FIELD_TAG_ID))
+GUEST_XPATH = etree.XPath(_by_id(guest.FIELD_TAG_TYPE, guest.FIELD_TAG_ID))
+ISBN_XPATH = etree.XPath(_by_id(isbn.FIELD_TAG_TYPE, isbn.FIELD_TAG_ID))
+AIR_DATE_XPATH = etree.XPath(_by_id(air_date.FIELD_TAG_TYPE, air_date.FIELD_TAG_ID))
+DESCRIPTION_XPATH = etree.XPath(
+    _by_id(description.DESCRIPTION_TAG_TYPE, description.DESCRIPTION_TAG_ID)
+)
+TRANSCRIPT_XPATH = etree.XPath(
+    _by_id(transcript.SECTION_TAG_TYPE, transcript.SECTION_TAG_ID)
+    + _by_id(transcript.FIELD_TAG_TYPE, transcript.FIELD_TAG_ID)
+)
+RELATED_XPATH = etree.XPath(_by_id(related.FIELD_TAG_TYPE, related.FIELD_TAG_ID))
+
+## -- transcript turns (only take tags marked as 'guest' or 'host')
+TRANSCRIPT_ENTRY_XPATH = etree.XPath(
+    f".//div[{_has_class('guest')} or {_has_class('host')}]"
+)
+SPEAKER_NAME_XPATH = etree.XPath(".//span")
+DIRECT_TEXT_XPATH = etree.XPath("text()")
+
+## -- related program items
+RELATED_ITEM_XPATH = etree.XPath(f".//div[{_has_class('RPItem')}]")
+RELATED_AUTHOR_XPATH = etree.XPath(f".//div[{_has_class('AuthorNameSmall')}]")
+RELATED_TITLE_XPATH = etree.XPath(f".//div[{_has_class('BookTitleSmall')}]")
+LINK_XPATH = etree.XPath(".//a")
+
+## -- text nodes as BeautifulSoup's `get_text` sees them (no script/style content)
+TEXT_NODES_XPATH = etree.XPath(
+    ".//text()[not(parent::script or parent::style or parent::template)]"
+)
+
+
+## ----------------- ##
+## ---- HELPERS ---- ##
+## ----------------- ##
+
+
+def _first(
+    selector: etree.XPath, element: HtmlElement, error: type[FieldNotFoundError]
+) -> HtmlElement:
+    matches = selector(element)
+    if not matches:
+        raise error
+    return matches[0]
+
+
+def get_text(element: HtmlElement) -> str:
+    """Equivalent of BeautifulSoup's `get_text(strip=True, separator=" ")`."""
+    return " ".join(
+        text.strip() for text in TEXT_NODES_XPATH(element) if text.strip() != ""
+    )
+
+
+## ----------------------- ##
+## ---- FIELD PARSERS ---- ##
+## ----------------------- ##
+
+
+def process_transcript_entry(entry: HtmlElement) -> tuple[str, str, str]:
+    """Return the `(speaker_role, speaker_name, text)` of a transcript turn."""
+    ## -- speaker role (take from div class attribute)
+    speaker_role = entry.get("class").split()[0]
+
+    ## -- speaker name
+    speaker_name = get_text(SPEAKER_NAME_XPATH(entry)[0])
+
+    ## -- entry text
+    entry_text = " ".join(DIRECT_TEXT_XPATH(entry)).strip()
+
+    return speaker_role, speaker_name, entry_text
+
+
+def process_related_program_item(item: HtmlElement) -> RelatedProgram:
+    author_element = RELATED_AUTHOR_XPATH(item)[0]
+
+    ## -- program id
+    path = LINK_XPATH(author_element)[0].get("href")
+    program_id = path.split("/")[-1]
+
+    return RelatedProgram(
+        id=program_id,
+        url=urljoin(ROOT_URL, path),
+        author=get_text(author_element),
+        title=get_text(RELATED_TITLE_XPATH(item)[0]),
+    )
+
+
+def get_program_description(html: HtmlElement) -> str | None:
+    description_text = get_text(
+        _first(DESCRIPTION_XPATH, html, DescriptionNotFoundError)
+    )
+    description_text = re.sub(r"\n+", " ", description_text)
+    description_text = re.sub(r"\s+", " ", description_text)
+
+    return description_text if description_text != "" else None
+
+
+def get_book_isbn(html: HtmlElement) -> str | None:
+    isbn_text = get_text(_first(ISBN_XPATH, html, BookISBNNotFoundError))
+    return isbn_text if isbn_text != "" else None
+
+
+def get_transcript(html: HtmlElement) -> TranscriptColumns:
+    transcript_section = _first(TRANSCRIPT_XPATH, html, TranscriptNotFoundError)
+    transcript = TranscriptColumns()
+    for idx, entry in enumerate(TRANSCRIPT_ENTRY_XPATH(transcript_section), start=1):
+        transcript.append(idx, *process_transcript_entry(entry))
+    return transcript
+
+
+def get_related_programs(html: HtmlElement) -> list[RelatedProgram]:
+    related_program_section = _first(RELATED_XPATH, html, RelatedProgramsNotFoundError)
+    return [
+        process_related_program_item(item)
+        for item in RELATED_ITEM_XPATH(related_program_section)
+    ]
+
+
+## ---------------------------------- ##
+## ---- PARSE HTML PAGE CONTENT  ---- ##
+## ---------------------------------- ##
+
+
+class LxmlProgramParser:
+    def parse(self, page: PageContent) -> Program:
+        html = page["html"]
+        return Program(
+            id=self.get_program_id(page["url"]),
+            url=page["url"],
+            title=get_text(_first(TITLE_XPATH, html, TitleNotFoundError)),
+            guest=get_text(_first(GUEST_XPATH, html, GuestAuthorNotFoundError)),
+            description=get_program_description(html),
+            book_isbn=get_book_isbn(html),
+            air_date=get_text(_first(AIR_DATE_XPATH, html, AirDateNotFoundError)),
+            transcript=get_transcript(html),
+            related=get_related_programs(html),
+        )
+
+    def get_program_id(self, url: str) -> str:
+        """Extract episode ID from URL.
+        URLs look like this: 'https://booknotes.c-span.org/Watch/57267-1'."""
+        return get_program_id(url)
@@ -0,0 +1,40 @@
+"""
+Parity checks between parser backends.
+
+Parses the same page content with every backend and reports the
+`Program` fields on which they disagree.
+"""
+
+from typing import Any
+
+from cspan_booknotes.get import PARSER_BACKENDS, PageContent, build_html
+from cspan_booknotes.models import Program
+from cspan_booknotes.parser import get_parser
+
+
+def diff_programs(left: Program, right: Program) -> dict[str, tuple[Any, Any]]:
+    """Return `{field: (left_value, right_value)}` for every differing field."""
+    left_data = left.model_dump()
+    right_data = right.model_dump()
+    return {
+        field: (left_data[field], right_data[field])
+        for field in left_data
+        if left_data[field] != right_data[field]
+    }
+
+
+def parse_with_parity(
+    url: str, content: bytes | str
+) -> tuple[Program, dict[str, tuple[Any, Any]]]:
+    """Parse `content` with all backends.
+
+    Returns the program from the reference (BeautifulSoup) backend along with
+    the field differences against the lxml backend (empty when they agree).
+    """
+    programs = {
+        backend: get_parser(backend).parse(
+            PageContent(url=url, html=build_html(content, backend=backend))
+        )
+        for backend in PARSER_BACKENDS
+    }
+    return programs["bs4"], diff_programs(programs["bs4"], programs["lxml"])
@@ -1,11 +1,14 @@
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from cspan_booknotes.constants import ROOT_URL
 from cspan_booknotes.exceptions import RelatedProgramsNotFoundError
 from cspan_booknotes.models.fields import RelatedProgram
 
+FIELD_TAG_TYPE = "div"
+FIELD_TAG_ID = "RelateProgram"
+
 
 def process_related_program_item(item) -> RelatedProgram:
     ## -- program id
@@ -27,10 +30,7 @@ def process_related_program_item(item) -> RelatedProgram:
     return RelatedProgram(id=program_id, url=program_url, author=author, title=title)
 
 
-def get_related_programs(html: BeautifulSoup) -> list[RelatedProgram]:
-    ## -- get related programs section
-    related_program_section = html.find("div", id="RelateProgram")
-
+def parse_related_programs(related_program_section: Tag | None) -> list[RelatedProgram]:
     if related_program_section is None:
         raise RelatedProgramsNotFoundError
 
@@ -41,3 +41,8 @@ def get_related_programs(html: BeautifulSoup) -> list[RelatedProgram]:
         process_related_program_item(item) for item in related_program_items
     ]
     return processed_items
+
+
+def get_related_programs(html: BeautifulSoup) -> list[RelatedProgram]:
+    ## -- get related programs section
+    return parse_related_programs(html.find(FIELD_TAG_TYPE, id=FIELD_TAG_ID))
@@ -1,12 +1,17 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from cspan_booknotes.exceptions import TitleNotFoundError
 
+FIELD_TAG_TYPE = "div"
+FIELD_TAG_ID = "pnlProgramTitle"
 
-def get_program_title(html: BeautifulSoup) -> str:
-    title_div = html.find("div", {"id": "pnlProgramTitle"})
-    if title_div:
-        title_text = title_div.get_text(separator=" ", strip=True)
-        return title_text
 
-    raise TitleNotFoundError
+def parse_program_title(title_div: Tag | None) -> str:
+    if title_div is None:
+        raise TitleNotFoundError
+
+    return title_div.get_text(separator=" ", strip=True)
+
+
+def get_program_title(html: BeautifulSoup) -> str:
+    return parse_program_title(html.find(FIELD_TAG_TYPE, id=FIELD_TAG_ID))
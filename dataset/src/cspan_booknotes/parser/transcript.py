@@ -1,10 +1,18 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from cspan_booknotes.exceptions import TranscriptNotFoundError
-from cspan_booknotes.models.fields import TranscriptEntry
+from cspan_booknotes.models.fields import TranscriptColumns
 
+FIELD_TAG_TYPE = "div"
+FIELD_TAG_ID = "ransContPadding"
 
-def process_transcript_entry(entry_tag, index: int = 0) -> TranscriptEntry:
+## -- the transcript section is nested inside this container
+SECTION_TAG_TYPE = "div"
+SECTION_TAG_ID = "transContent"
+
+
+def process_transcript_entry(entry_tag) -> tuple[str, str, str]:
+    """Return the `(speaker_role, speaker_name, text)` of a transcript turn."""
     ## -- speaker role (take from div class attribute)
     speaker_role = entry_tag.get("class")[0]
 
@@ -14,29 +22,28 @@ def process_transcript_entry(entry_tag, index: int = 0) -> TranscriptEntry:
     ## -- entry text
     entry_text = " ".join(entry_tag.find_all(string=True, recursive=False)).strip()
 
-    return TranscriptEntry(
-        index=index,
-        speaker_role=speaker_role,
-        speaker_name=speaker_name,
-        text=entry_text,
-    )
+    return speaker_role, speaker_name, entry_text
 
 
-def get_transcript(html: BeautifulSoup) -> list[TranscriptEntry]:
-    ## -- get conversation transcript section
-    transcript_section = html.find("div", id="transContent").find(
-        "div", id="ransContPadding"
-    )
+def parse_transcript(transcript_section: Tag | None) -> TranscriptColumns:
     if transcript_section is None:
         raise TranscriptNotFoundError()
 
     ## -- get conversation turns from the transcript (only take tags marked as 'guest' or 'host')
     transcript_entries = transcript_section.find_all("div", class_=["guest", "host"])
 
-    ## -- process transcript entries
-    transcript_entries = [
-        process_transcript_entry(entry, index=idx)
-        for idx, entry in enumerate(transcript_entries, start=1)
-    ]
+    ## -- process transcript entries into columns
+    transcript = TranscriptColumns()
+    for idx, entry in enumerate(transcript_entries, start=1):
+        transcript.append(idx, *process_transcript_entry(entry))
+
+    return transcript
+
+
+def get_transcript(html: BeautifulSoup) -> TranscriptColumns:
+    ## -- get conversation transcript section
+    section = html.find(SECTION_TAG_TYPE, id=SECTION_TAG_ID)
+    if section is None:
+        raise TranscriptNotFoundError()
 
-    return transcript_entries
+    return parse_transcript(section.find(FIELD_TAG_TYPE, id=FIELD_TAG_ID))
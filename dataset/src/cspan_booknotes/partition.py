@@ -0,0 +1,198 @@
+"""
+Hive-partitioned (sharded) output for the flat datasets.
+
+Instead of one Parquet file per dataset, a partitioned dataset is a directory
+of shards, one per partition value:
+
+    transcripts/air_year=1989/part-0.parquet
+    transcripts/air_year=1990/part-0.parquet
+    ...
+
+Programs are assigned to partitions either by the year they aired
+(`air_year`) or by a stable hash of their id (`program_bucket`, `N` buckets),
+and every dataset row follows its program. The partition value lives only in
+the directory name, so each shard has exactly the dataset's schema; readers
+with Hive partitioning enabled get it back as an extra column.
+
+Shards are written with the dataset's `ParquetLayout`, in bounded memory (a
+dataset is split in one streaming pass, then each shard is laid out on its
+own), and are deterministic (same rows in, same bytes out), so after a
+partial update only the shards whose programs changed differ from the
+published ones.
+"""
+
+import shutil
+import zlib
+from pathlib import Path
+from typing import Literal
+
+import polars as pl
+import pyarrow.parquet as pq
+
+from cspan_booknotes.layout import (
+    DEFAULT_MAX_BUFFER_BYTES,
+    ParquetLayout,
+    apply_layout,
+    patch_with_layout,
+    write_with_layout,
+)
+
+PartitionScheme = Literal["air_year", "program_bucket"]
+
+PARTITION_SCHEMES: tuple[PartitionScheme, ...] = ("air_year", "program_bucket")
+
+## -- shard directory for rows whose partition value is null (the Hive convention)
+HIVE_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+SHARD_FILE_NAME = "part-0.parquet"
+
+
+def program_bucket(program_id: str, num_buckets: int) -> int:
+    """Stable (process- and version-independent) hash bucket of a program id."""
+    return zlib.crc32(program_id.encode()) % num_buckets
+
+
+def partition_keys(
+    programs: pl.DataFrame, scheme: PartitionScheme, num_buckets: int = 16
+) -> pl.DataFrame:
+    """Partition value of every program, as a `program_id, <scheme>` frame
+    (built from the flat `programs` dataset)."""
+    if scheme == "air_year":
+        return programs.select(
+            "program_id", pl.col("air_date").dt.year().alias("air_year")
+        )
+    if scheme == "program_bucket":
+        program_ids = programs["program_id"].to_list()
+        return pl.DataFrame(
+            {
+                "program_id": program_ids,
+                "program_bucket": [
+                    program_bucket(program_id, num_buckets)
+                    for program_id in program_ids
+                ],
+            },
+            schema={"program_id": pl.String, "program_bucket": pl.Int64},
+        )
+    raise ValueError(
+        f"Unknown partition scheme '{scheme}' (expected one of {PARTITION_SCHEMES})"
+    )
+
+
+def write_partitioned(
+    path: str | Path,
+    root: str | Path,
+    keys: pl.DataFrame,
+    layout: ParquetLayout,
+    max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES,
+) -> list[Path]:
+    """Split the Parquet file at `path` into Hive-partitioned shards under
+    `root` (replacing any previous shards); returns the shard paths.
+
+    The file is read one row group at a time and every batch is appended to
+    the shards of its rows; each shard is then rewritten with the layout
+    (see `apply_layout`), so memory stays bounded by `max_buffer_bytes`.
+    """
+    root = Path(root)
+    schema = pq.read_schema(path)
+    column = keys.columns[1]
+
+    writers: dict[Path, pq.ParquetWriter] = {}
+    try:
+        for batch in pq.ParquetFile(path).iter_batches(
+            batch_size=layout.row_group_size
+        ):
+            rows = pl.from_arrow(batch).join(
+                keys, on="program_id", how="left", maintain_order="left"
+            )
+            for (value,), shard in rows.partition_by(column, as_dict=True).items():
+                shard_path = root / shard_dir_name(column, value) / SHARD_FILE_NAME
+                if shard_path not in writers:
+                    shard_path.parent.mkdir(parents=True, exist_ok=True)
+                    writers[shard_path] = pq.ParquetWriter(shard_path, schema)
+                writers[shard_path].write_table(
+                    shard.drop(column).to_arrow().cast(schema)
+                )
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    shard_paths = sorted(writers)
+    for shard_path in shard_paths:
+        apply_layout(shard_path, layout, max_buffer_bytes)
+
+    ## -- drop shards left over from an earlier run (e.g. another scheme)
+    for shard_dir in root.iterdir():
+        if shard_dir.is_dir() and shard_dir / SHARD_FILE_NAME not in writers:
+            shutil.rmtree(shard_dir)
+    return shard_paths
+
+
+def patch_partitioned(
+    root: str | Path,
+    rows: pl.DataFrame,
+    program_ids: list[str],
+    keys: pl.DataFrame,
+    layout: ParquetLayout,
+    max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES,
+) -> list[Path]:
+    """Replace the rows of `program_ids` in the shards under `root` with `rows`
+    (their new flat rows), rewriting only the shards that hold or receive
+    those programs; returns the rewritten shard paths."""
+    root = Path(root)
+    column = keys.columns[1]
+
+    rows = rows.join(keys, on="program_id", how="left", maintain_order="left")
+    new_shards = {
+        shard_dir_name(column, value): shard.drop(column)
+        for (value,), shard in rows.partition_by(column, as_dict=True).items()
+    }
+    shard_dirs = {shard_dir.name for shard_dir in root.glob(f"{column}=*")}
+
+    patched_paths = []
+    for name in sorted(new_shards.keys() | shard_dirs):
+        shard_path = root / name / SHARD_FILE_NAME
+        new_rows = new_shards.get(name)
+        if not shard_path.exists():
+            shard_path.parent.mkdir(parents=True, exist_ok=True)
+            write_with_layout(
+                new_rows.sort(layout.sort_by, maintain_order=True).to_arrow(),
+                shard_path,
+                layout,
+            )
+            patched_paths.append(shard_path)
+            continue
+
+        ## -- only rewrite a shard that holds or receives one of the programs
+        if (
+            new_rows is None
+            and not pl.scan_parquet(shard_path)
+            .filter(pl.col("program_id").is_in(program_ids))
+            .select(pl.len())
+            .collect()
+            .item()
+        ):
+            continue
+        patch_with_layout(
+            shard_path,
+            new_rows if new_rows is not None else rows.clear().drop(column),
+            program_ids,
+            layout,
+            max_buffer_bytes,
+        )
+        if pq.read_metadata(shard_path).num_rows == 0:
+            shutil.rmtree(shard_path.parent)
+            continue
+        patched_paths.append(shard_path)
+    return patched_paths
+
+
+def shard_dir_name(column: str, value: object) -> str:
+    """Hive directory name of a partition value."""
+    return f"{column}={HIVE_NULL_PARTITION if value is None else value}"
+
+
+def data_files_glob(name: str, scheme: PartitionScheme | None) -> str:
+    """`data_files` pattern (relative to the dataset repo) of a flat dataset."""
+    if scheme is None:
+        return f"{name}.parquet"
+    return f"{name}/{scheme}=*/*.parquet"
@@ -0,0 +1,199 @@
+"""
+Streaming stage pipeline with bounded queues.
+
+A `StreamingPipeline` runs items through a sequence of `Stage`s at the same
+time instead of one stage after the other: every stage has its own pool of
+workers (threads, or a process pool for CPU-bound stages) and hands results
+to the next stage through a bounded queue. A slow stage fills its input
+queue and blocks the stages before it (backpressure), so memory stays
+bounded and the end-to-end wall time approaches that of the slowest stage.
+
+    pipeline = StreamingPipeline(
+        [
+            Stage("fetch", fetch, workers=8),
+            Stage("parse", parse, workers=4, executor="process"),
+            Stage("flatten", flatten, batch_size=64),
+        ]
+    )
+    for tables in pipeline.run(urls):
+        ...
+
+Stage functions take one item (or, with `batch_size`, a list of up to
+`batch_size` items) and return the item passed on; returning `None` drops
+it. The first exception raised by a stage stops the pipeline and is
+re-raised by `run`.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Literal, NamedTuple
+
+DEFAULT_QUEUE_SIZE: int = 64
+
+## -- how often blocked workers check whether the pipeline was stopped
+POLL_INTERVAL: float = 0.1
+
+## -- end-of-stream marker, passed from stage to stage
+_DONE = object()
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    executor: Literal["thread", "process"] = "thread"
+    batch_size: int | None = None
+
+
+class StreamingPipeline:
+    """Run stages concurrently, connected by bounded queues.
+
+    After `run` finishes, `stats` holds per stage the number of items in and
+    out and the seconds spent in the stage function (summed over workers).
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats: dict[str, dict[str, float]] = {}
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Feed `items` through the stages, yielding the last stage's outputs
+        as they complete (not in input order)."""
+        queues = [
+            queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)
+        ]
+        self._stop = threading.Event()
+        self._errors: list[BaseException] = []
+        self._lock = threading.Lock()
+        self.stats = {
+            stage.name: {"items_in": 0, "items_out": 0, "busy_seconds": 0.0}
+            for stage in self.stages
+        }
+
+        executors: list[Executor | None] = []
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]))]
+        for stage, inbox, outbox in zip(self.stages, queues, queues[1:]):
+            executor = (
+                ProcessPoolExecutor(stage.workers)
+                if stage.executor == "process"
+                else None
+            )
+            executors.append(executor)
+            running = [stage.workers]
+            threads.extend(
+                threading.Thread(
+                    target=self._work,
+                    args=(stage, executor, inbox, outbox, running),
+                    name=f"{stage.name}-{worker}",
+                )
+                for worker in range(stage.workers)
+            )
+
+        for thread in threads:
+            thread.start()
+        try:
+            while (item := self._get(queues[-1])) is not _DONE:
+                yield item
+        finally:
+            ## -- also reached when the consumer stops early
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+        if self._errors:
+            raise self._errors[0]
+
+    ## ----------------- ##
+    ## ---- WORKERS ---- ##
+    ## ----------------- ##
+
+    def _put(self, outbox: queue.Queue, item: Any) -> bool:
+        """Block until there's room downstream; `False` once stopped."""
+        while not self._stop.is_set():
+            try:
+                outbox.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, inbox: queue.Queue) -> Any:
+        """Next item, or `_DONE` at the end of the stream (or once stopped)."""
+        while not self._stop.is_set():
+            try:
+                return inbox.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            self._errors.append(error)
+        self._stop.set()
+
+    def _feed(self, items: Iterable[Any], outbox: queue.Queue) -> None:
+        try:
+            for item in items:
+                if not self._put(outbox, item):
+                    return
+        except BaseException as e:
+            self._fail(e)
+            return
+        self._put(outbox, _DONE)
+
+    def _take(self, stage: Stage, inbox: queue.Queue) -> Any:
+        """Next item (or batch) for a stage worker, or `_DONE`."""
+        item = self._get(inbox)
+        if stage.batch_size is None or item is _DONE:
+            return item
+
+        batch = [item]
+        while len(batch) < stage.batch_size:
+            item = self._get(inbox)
+            if item is _DONE:
+                ## -- leave the marker for the next worker of this stage
+                self._put(inbox, _DONE)
+                break
+            batch.append(item)
+        return batch
+
+    def _work(
+        self,
+        stage: Stage,
+        executor: Executor | None,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        running: list[int],
+    ) -> None:
+        stats = self.stats[stage.name]
+        while (item := self._take(stage, inbox)) is not _DONE:
+            started = time.perf_counter()
+            try:
+                if executor is None:
+                    result = stage.fn(item)
+                else:
+                    result = executor.submit(stage.fn, item).result()
+            except BaseException as e:
+                self._fail(e)
+                return
+            with self._lock:
+                stats["busy_seconds"] += time.perf_counter() - started
+                stats["items_in"] += len(item) if stage.batch_size else 1
+                stats["items_out"] += result is not None
+
+            if result is not None and not self._put(outbox, result):
+                return
+
+        ## -- pass the marker on to the sibling workers; the last one to finish
+        ## -- ends the stream for the next stage
+        self._put(inbox, _DONE)
+        with self._lock:
+            running[0] -= 1
+            last = running[0] == 0
+        if last:
+            self._put(outbox, _DONE)
@@ -0,0 +1,115 @@
+"""
+Publishing the flat datasets: the last step of `scripts/process_parsed.py`
+and `scripts/run_pipeline.py`.
+
+Both scripts first write one Parquet file per flat dataset. Publishing then
+rewrites each file with its query-optimized layout (see `layout`) or splits
+it into Hive-partitioned shards (see `partition`), and points the
+HuggingFace repo's dataset configs at what was written, so the configs
+always match the files on disk whichever script ran last.
+"""
+
+import shutil
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import polars as pl
+import yaml
+
+from cspan_booknotes.layout import (
+    DATASET_LAYOUTS,
+    DEFAULT_MAX_BUFFER_BYTES,
+    apply_layout,
+)
+from cspan_booknotes.partition import (
+    PartitionScheme,
+    data_files_glob,
+    partition_keys,
+    write_partitioned,
+)
+
+
+class PublishOptions(NamedTuple):
+    optimize_layout: bool = True
+    ## -- shard `partitioned_datasets` by this scheme (None writes one file per dataset)
+    partition_by: PartitionScheme | None = None
+    num_buckets: int = 16
+    partitioned_datasets: tuple[str, ...] = ("programs", "transcripts")
+    max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES
+
+    def is_partitioned(self, name: str) -> bool:
+        return self.partition_by is not None and name in self.partitioned_datasets
+
+
+def publish_datasets(
+    output_paths: dict[str, Path], options: PublishOptions
+) -> Iterator[str]:
+    """Lay out or shard the flat dataset files (`name -> <dir>/<name>.parquet`),
+    yielding a summary line per dataset.
+
+    A sharded dataset's shards go to `<dir>/<name>/` and its file is removed;
+    shards left by an earlier partitioned run of an unsharded dataset are
+    removed too.
+    """
+    if options.partition_by is not None:
+        keys = partition_keys(
+            pl.read_parquet(
+                output_paths["programs"], columns=["program_id", "air_date"]
+            ),
+            options.partition_by,
+            options.num_buckets,
+        )
+
+    for name, path in output_paths.items():
+        path = Path(path)
+        shard_dir = path.with_suffix("")
+        layout = DATASET_LAYOUTS[name]
+        if options.is_partitioned(name):
+            shard_paths = write_partitioned(
+                path, shard_dir, keys, layout, options.max_buffer_bytes
+            )
+            path.unlink()
+            yield (
+                f"Sharded {name} dataset into {len(shard_paths)}"
+                f" {options.partition_by} partitions"
+            )
+            continue
+
+        if shard_dir.is_dir():
+            shutil.rmtree(shard_dir)
+        if options.optimize_layout:
+            size_before = path.stat().st_size
+            apply_layout(path, layout, options.max_buffer_bytes)
+            yield (
+                f"Rewrote {name} dataset sorted by {layout.sort_by}"
+                f" ({size_before:,} -> {path.stat().st_size:,} bytes)"
+            )
+
+
+def dataset_data_files(names: list[str], options: PublishOptions) -> dict[str, str]:
+    """`data_files` pattern of every published dataset."""
+    return {
+        name: data_files_glob(
+            name, options.partition_by if options.is_partitioned(name) else None
+        )
+        for name in names
+    }
+
+
+class _IndentedListDumper(yaml.SafeDumper):
+    ## -- indent list items under their key (the style of the hand-written config)
+    def increase_indent(self, flow=False, indentless=False):
+        return super().increase_indent(flow, False)
+
+
+def write_hf_repo_config(path: str | Path, data_files: dict[str, str]) -> None:
+    """Point the dataset configs of the HuggingFace repo config at `path`
+    to the published files."""
+    with open(path, "r") as f:
+        config = yaml.safe_load(f)
+    config["configs"] = [
+        {"config_name": name, "data_files": pattern}
+        for name, pattern in data_files.items()
+    ]
+    with open(path, "w") as f:
+        yaml.dump(config, f, Dumper=_IndentedListDumper, sort_keys=False)
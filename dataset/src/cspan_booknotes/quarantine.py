@@ -0,0 +1,170 @@
+"""
+Dead-letter quarantine for programs a stage gave up on.
+
+Instead of aborting a run, a program that still fails after its retries is
+recorded in `quarantine.json` with the exception, the field it was about,
+and a snippet of the page around that field, and the run moves on. The
+quarantine is reported at the end of the run and can be inspected to fix
+the parser for the new edge case.
+
+Programs whose cached page failed to parse for a deterministic reason are
+skipped by later runs until the page or the parser code changes; everything
+else (e.g. pages that could not be fetched) is tried again on the next run.
+A program that later succeeds is released.
+"""
+
+import json
+import os
+import traceback
+from collections import Counter
+from pathlib import Path
+from typing import TypedDict
+
+import lxml.html
+
+from cspan_booknotes.manifest import PARSER_VERSION
+from cspan_booknotes.parser.extract import PAGE_TARGETS
+from cspan_booknotes.retry import ErrorKind, classify_error, error_field
+
+## -- characters of page markup kept with a quarantined program
+HTML_SNIPPET_CHARS: int = 2000
+
+## -- innermost traceback lines kept with a quarantined program
+TRACEBACK_LINES: int = 12
+
+
+class QuarantineRecord(TypedDict):
+    program_id: str
+    url: str
+    stage: str  # e.g. "fetch", "parse", "validate"
+    error_kind: ErrorKind
+    error_type: str
+    message: str
+    field: str | None
+    attempts: int
+    html_digest: str | None
+    parser_version: str
+    html_snippet: str | None
+    traceback: str
+
+
+def html_snippet(html: bytes | str, field: str | None = None) -> str:
+    """Markup around a field: its element (or the region it should be in)
+    when present, otherwise the start of the page body."""
+    document = lxml.html.document_fromstring(html)
+    target = PAGE_TARGETS.get(field) if field else None
+    if target is not None:
+        for tag_id in (target.tag_id, target.within and target.within.tag_id):
+            elements = document.xpath(f"//*[@id='{tag_id}']") if tag_id else []
+            if elements:
+                snippet = lxml.html.tostring(
+                    elements[0], encoding="unicode", with_tail=False
+                )
+                return snippet[:HTML_SNIPPET_CHARS]
+    body = document.find("body")
+    snippet = lxml.html.tostring(
+        document if body is None else body, encoding="unicode", with_tail=False
+    )
+    return snippet[:HTML_SNIPPET_CHARS]
+
+
+def quarantine_record(
+    program_id: str,
+    url: str,
+    stage: str,
+    error: BaseException,
+    attempts: int = 1,
+    html: bytes | str | None = None,
+    html_digest: str | None = None,
+) -> QuarantineRecord:
+    """Quarantine record for a failed program (built where it failed, so it
+    carries the traceback even from a worker process)."""
+    field = error_field(error)
+    try:
+        snippet = None if not html else html_snippet(html, field)
+    except Exception as e:
+        snippet = f"<unparseable page: {e!r}>"
+    return QuarantineRecord(
+        program_id=program_id,
+        url=url,
+        stage=stage,
+        error_kind=classify_error(error),
+        error_type=type(error).__name__,
+        ## -- field errors are raised without a message; fall back to their docstring
+        message=str(error) or (type(error).__doc__ or "").strip(),
+        field=field,
+        attempts=attempts,
+        html_digest=html_digest,
+        parser_version=PARSER_VERSION,
+        html_snippet=snippet,
+        traceback="".join(traceback.format_exception(error)[-TRACEBACK_LINES:]),
+    )
+
+
+class QuarantineStore:
+    """Quarantined programs by id, saved as JSON."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        try:
+            with open(self.path, "r") as f:
+                self.records: dict[str, QuarantineRecord] = json.load(f)
+        except FileNotFoundError:
+            self.records = {}
+        ## -- programs quarantined during this run
+        self.added: list[str] = []
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.records, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def __contains__(self, program_id: str) -> bool:
+        return program_id in self.records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, record: QuarantineRecord) -> None:
+        self.records[record["program_id"]] = record
+        self.added.append(record["program_id"])
+
+    def release(self, program_id: str) -> None:
+        """Forget a program that has since been processed successfully."""
+        self.records.pop(program_id, None)
+
+    def should_skip(self, program_id: str, html_digest: str | None) -> bool:
+        """Whether a quarantined program would fail the same way again: a
+        deterministic failure on the same page with the same parser."""
+        record = self.records.get(program_id)
+        return (
+            record is not None
+            and record["error_kind"] == "deterministic"
+            and record["parser_version"] == PARSER_VERSION
+            and html_digest is not None
+            and record["html_digest"] == html_digest
+        )
+
+    def summary(self) -> str:
+        """Report of the quarantine (and what this run added to it)."""
+        if not self.records:
+            return "Quarantine: empty"
+        num_added = len(set(self.added))
+        lines = [
+            f"Quarantine: {len(self.records)} programs ({num_added} added this run)"
+        ]
+        counts = Counter(
+            (record["stage"], record["error_type"], record["field"] or "-")
+            for record in self.records.values()
+        )
+        for (stage, error_type, field), count in counts.most_common():
+            lines.append(f"  {count:>5} x {stage}: {error_type} (field: {field})")
+        added = [program_id for program_id in self.added if program_id in self]
+        for program_id in added[:5]:
+            record = self.records[program_id]
+            message = " ".join(record["message"].split())
+            lines.append(f"  e.g. {record['url']}: {message[:160]}")
+        lines.append(f"  details in '{self.path}'")
+        return "\n".join(lines)
@@ -0,0 +1,212 @@
+"""
+Adaptive rate control for crawling booknotes.c-span.org.
+
+`AdaptiveRateController` combines two limits:
+
+1. an AIMD concurrency window: grows by `additive_increase / window` per
+   successful response (roughly +1 per round trip) and is multiplied by
+   `multiplicative_decrease` when the origin pushes back (429/5xx responses,
+   connection errors) or latency rises well above the best latency observed
+   recently;
+2. an optional token-bucket cap on requests per second.
+
+This lets a crawl run as fast as the site tolerates without hand-tuning.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, TypedDict
+
+DEFAULT_INITIAL_WINDOW: float = 4.0
+DEFAULT_MIN_WINDOW: float = 1.0
+DEFAULT_MAX_WINDOW: float = 32.0
+
+## -- weight of the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA: float = 0.2
+
+## -- seconds of history used for the throughput metric
+THROUGHPUT_WINDOW: float = 10.0
+
+## -- the best observed latency is the minimum over this many seconds, so one
+## -- fast early response doesn't hold the latency check to it forever
+DEFAULT_BASE_LATENCY_WINDOW: float = 60.0
+
+
+class RateMetrics(TypedDict):
+    window: float
+    in_flight: int
+    requests: int
+    throttled: int
+    latency_ewma: float | None
+    base_latency: float | None
+    throughput: float  # completed requests per second (recent)
+    rate_limit: float | None
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        ## -- waiters queue on the lock, so tokens are handed out in order
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class AdaptiveRateController:
+    """AIMD concurrency window plus an optional token-bucket rate limit.
+
+    Wrap each request in `slot()` and report its outcome with `record()`:
+
+        async with controller.slot():
+            response = await client.get(url)
+            await controller.record(latency, status=response.status_code)
+    """
+
+    def __init__(
+        self,
+        initial_window: float = DEFAULT_INITIAL_WINDOW,
+        min_window: float = DEFAULT_MIN_WINDOW,
+        max_window: float = DEFAULT_MAX_WINDOW,
+        additive_increase: float = 1.0,
+        multiplicative_decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        decrease_cooldown: float = 1.0,
+        base_latency_window: float = DEFAULT_BASE_LATENCY_WINDOW,
+        rate_limit: float | None = None,
+        burst: float | None = None,
+    ):
+        self.window = min(max(initial_window, min_window), max_window)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        ## -- back off once latency exceeds this multiple of the best seen
+        self.latency_tolerance = latency_tolerance
+        ## -- at most one decrease per cooldown, so a burst of failures from
+        ## -- requests that were already in flight only counts once
+        self.decrease_cooldown = decrease_cooldown
+        self.base_latency_window = base_latency_window
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.latency_ewma: float | None = None
+        self.base_latency: float | None = None
+        self._last_decrease = float("-inf")
+        self._completed_at: deque[float] = deque()
+        ## -- (time, latency) candidates for the windowed minimum, latencies increasing
+        self._latency_minima: deque[tuple[float, float]] = deque()
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for room in the concurrency window (and a token), then hold it."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.window))
+            self.in_flight += 1
+        try:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    async def record(
+        self, latency: float, status: int | None = None, error: bool = False
+    ) -> None:
+        """Report a finished request and adapt the window.
+
+        `error=True` marks a request that failed without a response
+        (connection error or timeout).
+        """
+        now = time.monotonic()
+        self.requests += 1
+        self._completed_at.append(now)
+        self._trim_completed(now)
+
+        if error or status == 429 or (status is not None and status >= 500):
+            self.throttled += 1
+            self._decrease(now)
+        else:
+            self._observe_latency(latency, now)
+            if self.latency_ewma > self.latency_tolerance * self.base_latency:
+                self._decrease(now)
+            else:
+                self.window = min(
+                    self.max_window, self.window + self.additive_increase / self.window
+                )
+
+        async with self._condition:
+            self._condition.notify_all()
+
+    def _observe_latency(self, latency: float, now: float) -> None:
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = (
+                LATENCY_EWMA_ALPHA * latency
+                + (1 - LATENCY_EWMA_ALPHA) * self.latency_ewma
+            )
+
+        ## -- monotonic queue: a sample is dropped once a newer one is as low
+        minima = self._latency_minima
+        while minima and minima[-1][1] >= self.latency_ewma:
+            minima.pop()
+        minima.append((now, self.latency_ewma))
+        while now - minima[0][0] > self.base_latency_window:
+            minima.popleft()
+        self.base_latency = minima[0][1]
+
+    def _decrease(self, now: float) -> None:
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.window = max(self.min_window, self.window * self.multiplicative_decrease)
+
+    def _trim_completed(self, now: float) -> None:
+        while self._completed_at and now - self._completed_at[0] > THROUGHPUT_WINDOW:
+            self._completed_at.popleft()
+
+    def throughput(self) -> float:
+        """Completed requests per second over the last `THROUGHPUT_WINDOW` seconds."""
+        now = time.monotonic()
+        self._trim_completed(now)
+        if not self._completed_at:
+            return 0.0
+        elapsed = max(now - self._completed_at[0], 1e-6)
+        return len(self._completed_at) / min(elapsed, THROUGHPUT_WINDOW)
+
+    def metrics(self) -> RateMetrics:
+        return RateMetrics(
+            window=self.window,
+            in_flight=self.in_flight,
+            requests=self.requests,
+            throttled=self.throttled,
+            latency_ewma=self.latency_ewma,
+            base_latency=self.base_latency,
+            throughput=self.throughput(),
+            rate_limit=self.bucket.rate if self.bucket is not None else None,
+        )
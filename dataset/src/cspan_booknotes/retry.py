@@ -0,0 +1,91 @@
+"""
+Per-item retry policies for pipeline stages.
+
+Failures are classified before deciding whether to try an item again:
+
+- `transient`: network trouble that may go away (connection errors,
+  timeouts, 429 and 5xx responses once the fetcher's own retries are
+  exhausted); retried with backoff;
+- `deterministic`: the page itself is the problem (a `FieldNotFoundError`
+  from a parser, a failed validation, a 404); trying again gives the same
+  result, so the item is quarantined right away;
+- `unknown`: anything else; retried once in case it was a fluke.
+
+    attempt = call_with_retries(parse_page, url)
+    if attempt.error is not None:
+        quarantine.add(quarantine_record(..., attempt.error, attempt.attempts))
+"""
+
+import time
+from typing import Any, Callable, Literal, NamedTuple
+
+import httpx
+from pydantic import ValidationError
+
+from cspan_booknotes.exceptions import FieldNotFoundError
+from cspan_booknotes.fetch import RETRY_STATUS_CODES, backoff_delay
+
+ErrorKind = Literal["transient", "deterministic", "unknown"]
+
+
+class RetryPolicy(NamedTuple):
+    max_attempts: int
+    backoff_base: float = 1.0
+    backoff_max: float = 30.0
+
+
+## -- attempts per item (including the first) by kind of failure
+RETRY_POLICIES: dict[ErrorKind, RetryPolicy] = {
+    "transient": RetryPolicy(max_attempts=3, backoff_base=2.0),
+    "deterministic": RetryPolicy(max_attempts=1),
+    "unknown": RetryPolicy(max_attempts=2),
+}
+
+
+def classify_error(error: BaseException) -> ErrorKind:
+    if isinstance(error, httpx.HTTPStatusError):
+        if error.response.status_code in RETRY_STATUS_CODES:
+            return "transient"
+        return "deterministic"
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return "transient"
+    if isinstance(error, (FieldNotFoundError, ValidationError, ValueError)):
+        return "deterministic"
+    return "unknown"
+
+
+def error_field(error: BaseException) -> str | None:
+    """`Program` field a parse or validation error is about (if known)."""
+    if isinstance(error, FieldNotFoundError):
+        return error.field
+    if isinstance(error, ValidationError) and error.errors():
+        location = error.errors()[0]["loc"]
+        return str(location[0]) if location else None
+    return None
+
+
+class Attempt(NamedTuple):
+    result: Any
+    error: Exception | None  # last error, when every attempt failed
+    attempts: int
+
+
+def call_with_retries(
+    fn: Callable[..., Any],
+    *args: Any,
+    policies: dict[ErrorKind, RetryPolicy] = RETRY_POLICIES,
+) -> Attempt:
+    """Call `fn(*args)`, retrying failures as their policy allows; errors
+    are returned (not raised) once the item is given up on."""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return Attempt(fn(*args), None, attempt)
+        except Exception as e:
+            policy = policies[classify_error(e)]
+            if attempt >= policy.max_attempts:
+                return Attempt(None, e, attempt)
+            time.sleep(
+                backoff_delay(attempt - 1, policy.backoff_base, policy.backoff_max)
+            )
@@ -0,0 +1,150 @@
+"""
+Streaming Parquet sink with bounded memory.
+
+`ParquetDatasetSink` writes several Parquet datasets (one file each) from
+Arrow tables handed to it as work finishes. Rows are buffered per dataset
+and written out as row groups of `row_group_size` rows; when the buffers of
+all datasets together exceed `max_buffer_bytes`, the largest buffer is
+written early as a smaller row group. Memory use is therefore bounded by
+the ceiling (plus one incoming table), not by the size of the datasets.
+
+Files are written to a temporary path and moved into place on `close`, so a
+failed run never leaves a truncated file behind.
+"""
+
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_ROW_GROUP_SIZE: int = 64 * 1024  # rows
+DEFAULT_MAX_BUFFER_BYTES: int = 256 * 1024 * 1024
+DEFAULT_COMPRESSION: str = "zstd"
+
+
+class ParquetDatasetSink:
+    """Incrementally write named datasets to Parquet files.
+
+        with ParquetDatasetSink({"programs": "programs.parquet"}) as sink:
+            for table in tables:
+                sink.write("programs", table)
+
+    Tables are cast to the dataset's schema from `schemas` (datasets without
+    one take the schema of the first table written to them). Datasets with a
+    schema are written even when they receive no rows.
+    """
+
+    def __init__(
+        self,
+        paths: dict[str, str | Path],
+        schemas: dict[str, pa.Schema] | None = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES,
+        compression: str = DEFAULT_COMPRESSION,
+    ):
+        self.paths = {name: Path(path) for name, path in paths.items()}
+        self.schemas = dict(schemas or {})
+        self.row_group_size = row_group_size
+        self.max_buffer_bytes = max_buffer_bytes
+        self.compression = compression
+
+        self._writers: dict[str, pq.ParquetWriter] = {}
+        self._buffers: dict[str, list[pa.Table]] = {name: [] for name in paths}
+        self._buffered_rows: dict[str, int] = dict.fromkeys(paths, 0)
+        self._buffered_bytes: dict[str, int] = dict.fromkeys(paths, 0)
+        self.rows_written: dict[str, int] = dict.fromkeys(paths, 0)
+        self.row_groups_written: dict[str, int] = dict.fromkeys(paths, 0)
+
+    def __enter__(self) -> "ParquetDatasetSink":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _tmp_path(self, name: str) -> Path:
+        path = self.paths[name]
+        return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+    def _writer(self, name: str) -> pq.ParquetWriter:
+        if name not in self._writers:
+            self.paths[name].parent.mkdir(parents=True, exist_ok=True)
+            self._writers[name] = pq.ParquetWriter(
+                self._tmp_path(name), self.schemas[name], compression=self.compression
+            )
+        return self._writers[name]
+
+    ## ----------------- ##
+    ## ---- WRITING ---- ##
+    ## ----------------- ##
+
+    def write(self, name: str, table: pa.Table | pa.RecordBatch) -> None:
+        """Buffer rows for a dataset, writing full row groups as they fill up."""
+        if isinstance(table, pa.RecordBatch):
+            table = pa.Table.from_batches([table])
+        if table.num_rows == 0:
+            return
+        schema = self.schemas.setdefault(name, table.schema)
+        table = table.cast(schema)
+
+        self._buffers[name].append(table)
+        self._buffered_rows[name] += table.num_rows
+        self._buffered_bytes[name] += table.nbytes
+
+        if self._buffered_rows[name] >= self.row_group_size:
+            self._write_row_groups(name, final=False)
+        while sum(self._buffered_bytes.values()) > self.max_buffer_bytes:
+            ## -- over the ceiling: write out the largest buffer early
+            self._write_row_groups(
+                max(self._buffered_bytes, key=self._buffered_bytes.get), final=True
+            )
+
+    def _write_row_groups(self, name: str, final: bool) -> None:
+        """Write buffered rows as full row groups (and, if `final`, the remainder)."""
+        if not self._buffers[name]:
+            return
+        table = pa.concat_tables(self._buffers[name])
+        writer = self._writer(name)
+
+        offset = 0
+        while table.num_rows - offset >= self.row_group_size or (
+            final and offset < table.num_rows
+        ):
+            row_group = table.slice(offset, self.row_group_size)
+            writer.write_table(row_group, row_group_size=row_group.num_rows)
+            self.rows_written[name] += row_group.num_rows
+            self.row_groups_written[name] += 1
+            offset += row_group.num_rows
+
+        ## -- copy the leftover rows so the written rows' buffers can be freed
+        remainder = table.slice(offset)
+        if remainder.num_rows:
+            remainder = remainder.take(pa.array(range(remainder.num_rows)))
+        self._buffers[name] = [remainder] if remainder.num_rows else []
+        self._buffered_rows[name] = remainder.num_rows
+        self._buffered_bytes[name] = remainder.nbytes if remainder.num_rows else 0
+
+    def flush(self) -> None:
+        """Write out everything buffered (possibly as partial row groups)."""
+        for name in self.paths:
+            self._write_row_groups(name, final=True)
+
+    def close(self) -> None:
+        """Flush, finish every file and move it into place."""
+        self.flush()
+        for name in self.schemas.keys() - self._writers.keys():
+            self._writer(name)
+        for name, writer in self._writers.items():
+            writer.close()
+            os.replace(self._tmp_path(name), self.paths[name])
+        self._writers.clear()
+
+    def abort(self) -> None:
+        """Discard partially written files."""
+        for name, writer in self._writers.items():
+            writer.close()
+            self._tmp_path(name).unlink(missing_ok=True)
+        self._writers.clear()
@@ -0,0 +1,348 @@
+"""
+Parsed program store.
+
+Parsed programs are appended to a chunked Arrow IPC dataset
+(`chunk-<n>.arrow` files, each holding record batches of programs with nested
+`transcript` and `related` columns) instead of one JSON file per program.
+`index.json` maps every program id to the (chunk file, record batch, row)
+holding its latest version:
+
+- single-program lookups read one batch from a memory-mapped chunk file;
+- re-parsed programs are appended to a new chunk and the index repointed, so
+  nothing is rewritten in place (superseded rows are skipped by `scan` and
+  dropped by `compact`);
+- scans are zero-copy (`pl.scan_ipc` memory-maps the chunks).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple
+
+import polars as pl
+import pyarrow as pa
+
+from cspan_booknotes.models.schema import SCHEMA_FINGERPRINT_KEY, load_program_data
+
+PARSED_PROGRAM_ARROW_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("guest", pa.string()),
+        ("description", pa.string()),
+        ("book_isbn", pa.string()),
+        ("air_date", pa.string()),
+        (
+            "transcript",
+            pa.struct(
+                [
+                    ("index", pa.list_(pa.int32())),
+                    ("speaker_role", pa.list_(pa.string())),
+                    ("speaker_name", pa.list_(pa.string())),
+                    ("text", pa.list_(pa.string())),
+                ]
+            ),
+        ),
+        (
+            "related",
+            pa.list_(
+                pa.struct(
+                    [
+                        ("id", pa.string()),
+                        ("url", pa.string()),
+                        ("author", pa.string()),
+                        ("title", pa.string()),
+                    ]
+                )
+            ),
+        ),
+        (SCHEMA_FINGERPRINT_KEY, pa.string()),
+    ]
+)
+
+PARSED_PROGRAM_SCHEMA = pl.from_arrow(PARSED_PROGRAM_ARROW_SCHEMA.empty_table()).schema
+
+## -- programs per chunk file, and per record batch within a chunk
+DEFAULT_CHUNK_SIZE: int = 512
+DEFAULT_BATCH_SIZE: int = 64
+
+CHUNK_FILE_PREFIX = "chunk-"
+CHUNK_FILE_SUFFIX = ".arrow"
+
+
+class ProgramLocation(NamedTuple):
+    file: str  # chunk file name, relative to the store root
+    batch: int
+    row: int
+
+
+class ParsedProgramStore:
+    """Chunked Arrow IPC store of parsed programs, indexed by program id.
+
+    Programs passed to `put` (or `put_batch`) are buffered and written as a
+    new chunk every `chunk_size` programs (and on `flush`/`close`); buffered
+    programs are visible to `get` and `in` but not to `scan` until flushed. A
+    store has a single writer; readers in other processes see flushed chunks.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self._index: dict[str, ProgramLocation] | None = None
+        self._buffer: dict[str, dict[str, Any]] = {}
+        ## -- record batches passed to `put_batch`, and the (batch, row) of each
+        ## -- program's latest version in them
+        self._batches: list[pa.RecordBatch] = []
+        self._batched: dict[str, tuple[int, int]] = {}
+        ## -- open (memory-mapped) readers, by chunk file name
+        self._readers: dict[str, pa.ipc.RecordBatchFileReader] = {}
+
+    def __enter__(self) -> "ParsedProgramStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    ## -- stores are shipped to worker processes by path (without the write buffer)
+    def __getstate__(self) -> dict:
+        return {
+            "root": self.root,
+            "chunk_size": self.chunk_size,
+            "batch_size": self.batch_size,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["root"], state["chunk_size"], state["batch_size"])
+
+    ## --------------- ##
+    ## ---- INDEX ---- ##
+    ## --------------- ##
+
+    @property
+    def index(self) -> dict[str, ProgramLocation]:
+        if self._index is None:
+            try:
+                with open(self.index_path, "r") as f:
+                    self._index = {
+                        program_id: ProgramLocation(*location)
+                        for program_id, location in json.load(f).items()
+                    }
+            except FileNotFoundError:
+                self._index = {}
+        return self._index
+
+    def _write_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def __contains__(self, program_id: str) -> bool:
+        return (
+            program_id in self._buffer
+            or program_id in self._batched
+            or program_id in self.index
+        )
+
+    def __len__(self) -> int:
+        return len(self.index.keys() | self._buffer.keys() | self._batched.keys())
+
+    def program_ids(self) -> list[str]:
+        return sorted(self.index.keys() | self._buffer.keys() | self._batched.keys())
+
+    def chunk_paths(self) -> list[Path]:
+        return sorted(self.root.glob(f"{CHUNK_FILE_PREFIX}*{CHUNK_FILE_SUFFIX}"))
+
+    ## ----------------- ##
+    ## ---- READING ---- ##
+    ## ----------------- ##
+
+    def get(self, program_id: str) -> dict[str, Any] | None:
+        """Parsed program data for a program id, or `None` when not stored."""
+        if program_id in self._buffer:
+            return self._buffer[program_id]
+        if program_id in self._batched:
+            batch, row = self._batched[program_id]
+            return self._batches[batch].slice(row, 1).to_pylist()[0]
+
+        location = self.index.get(program_id)
+        if location is None:
+            return None
+        batch = self._reader(location.file).get_batch(location.batch)
+        return batch.slice(location.row, 1).to_pylist()[0]
+
+    def _reader(self, chunk_file: str) -> pa.ipc.RecordBatchFileReader:
+        if chunk_file not in self._readers:
+            source = pa.memory_map(str(self.root / chunk_file))
+            self._readers[chunk_file] = pa.ipc.open_file(source)
+        return self._readers[chunk_file]
+
+    def iter_batches(self) -> Iterator[pa.RecordBatch]:
+        """Yield the latest version of every flushed program, one record batch
+        at a time (memory-mapped, so memory use is bounded by the batch size)."""
+        for chunk_path in self.chunk_paths():
+            reader = self._reader(chunk_path.name)
+            for batch_number in range(reader.num_record_batches):
+                batch = reader.get_batch(batch_number)
+                live = [
+                    self.index.get(program_id)
+                    == ProgramLocation(chunk_path.name, batch_number, row)
+                    for row, program_id in enumerate(batch.column("id").to_pylist())
+                ]
+                if all(live):
+                    yield batch
+                elif any(live):
+                    yield batch.filter(pa.array(live))
+
+    def scan(self) -> pl.LazyFrame:
+        """Lazily scan the latest version of every flushed program."""
+        chunk_paths = self.chunk_paths()
+        if not chunk_paths:
+            return pl.LazyFrame(schema=PARSED_PROGRAM_SCHEMA)
+
+        ## -- a program's latest row is the one in the chunk the index points at
+        live_rows = pl.LazyFrame(
+            {
+                "id": list(self.index),
+                "chunk": [
+                    str(self.root / location.file) for location in self.index.values()
+                ],
+            },
+            schema={"id": pl.String, "chunk": pl.String},
+        )
+        return (
+            pl.scan_ipc(
+                [str(path) for path in chunk_paths],
+                include_file_paths="chunk",
+            )
+            .join(live_rows, on=["id", "chunk"], how="semi")
+            .drop("chunk")
+        )
+
+    ## ----------------- ##
+    ## ---- WRITING ---- ##
+    ## ----------------- ##
+
+    def _num_buffered(self) -> int:
+        return len(self._buffer) + len(self._batched)
+
+    def put(self, program_data: dict[str, Any]) -> None:
+        """Add (or replace) a parsed program, as produced by `stamp_program`."""
+        self._batched.pop(program_data["id"], None)
+        self._buffer[program_data["id"]] = program_data
+        if self._num_buffered() >= self.chunk_size:
+            self.flush()
+
+    def put_batch(self, batch: pa.RecordBatch) -> None:
+        """Add (or replace) parsed programs given as a record batch with the
+        `PARSED_PROGRAM_ARROW_SCHEMA` columns (written to a chunk as-is)."""
+        batch = batch.select(PARSED_PROGRAM_ARROW_SCHEMA.names).cast(
+            PARSED_PROGRAM_ARROW_SCHEMA
+        )
+        self._batches.append(batch)
+        for row, program_id in enumerate(batch.column("id").to_pylist()):
+            self._buffer.pop(program_id, None)
+            self._batched[program_id] = (len(self._batches) - 1, row)
+        if self._num_buffered() >= self.chunk_size:
+            self.flush()
+
+    def discard(self, program_id: str) -> None:
+        """Forget a program (e.g. so it is parsed again)."""
+        self._buffer.pop(program_id, None)
+        self._batched.pop(program_id, None)
+        if self.index.pop(program_id, None) is not None:
+            self._write_index()
+
+    def _next_chunk_file(self) -> str:
+        chunk_paths = self.chunk_paths()
+        number = (
+            int(chunk_paths[-1].name[len(CHUNK_FILE_PREFIX) : -len(CHUNK_FILE_SUFFIX)])
+            + 1
+            if chunk_paths
+            else 0
+        )
+        return f"{CHUNK_FILE_PREFIX}{number:06d}{CHUNK_FILE_SUFFIX}"
+
+    def _write_chunk(self, batches: list[pa.RecordBatch]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        chunk_file = self._next_chunk_file()
+        tmp_path = self.root / f".{chunk_file}.tmp"
+        with (
+            pa.OSFile(str(tmp_path), "wb") as sink,
+            pa.ipc.new_file(sink, PARSED_PROGRAM_ARROW_SCHEMA) as writer,
+        ):
+            for batch_number, batch in enumerate(batches):
+                writer.write_batch(batch)
+                for row, program_id in enumerate(batch.column("id").to_pylist()):
+                    self.index[program_id] = ProgramLocation(
+                        chunk_file, batch_number, row
+                    )
+        os.replace(tmp_path, self.root / chunk_file)
+
+    def _to_batches(self, programs: list[dict[str, Any]]) -> list[pa.RecordBatch]:
+        return [
+            pa.RecordBatch.from_pylist(
+                programs[start : start + self.batch_size],
+                schema=PARSED_PROGRAM_ARROW_SCHEMA,
+            )
+            for start in range(0, len(programs), self.batch_size)
+        ]
+
+    def flush(self) -> None:
+        """Write buffered programs as a new chunk and persist the index."""
+        if not self._buffer and not self._batched:
+            return
+
+        batches = self._to_batches(list(self._buffer.values()))
+        for batch_number, batch in enumerate(self._batches):
+            ## -- skip rows superseded by a later `put`/`put_batch` (or discarded)
+            live = [
+                self._batched.get(program_id) == (batch_number, row)
+                for row, program_id in enumerate(batch.column("id").to_pylist())
+            ]
+            if all(live):
+                batches.append(batch)
+            elif any(live):
+                batches.append(batch.filter(pa.array(live)))
+
+        self._write_chunk(batches)
+        self._buffer.clear()
+        self._batches.clear()
+        self._batched.clear()
+        self._write_index()
+
+    def close(self) -> None:
+        self.flush()
+        self._readers.clear()
+
+    def compact(self) -> None:
+        """Rewrite the live programs into fresh chunks, dropping superseded rows."""
+        self.flush()
+        old_chunk_paths = self.chunk_paths()
+        live_programs = self.scan().collect().to_dicts()
+        for start in range(0, len(live_programs), self.chunk_size):
+            self._write_chunk(
+                self._to_batches(live_programs[start : start + self.chunk_size])
+            )
+        self._write_index()
+        self._readers.clear()
+        for path in old_chunk_paths:
+            path.unlink()
+
+    def import_json(self, paths: list[str | Path], validate: bool = False) -> int:
+        """Add parsed program JSON files (validated unless stamped with the
+        current schema); returns the number imported."""
+        for path in paths:
+            with open(path, "r") as f:
+                self.put(load_program_data(json.load(f), validate=validate))
+        self.flush()
+        return len(paths)
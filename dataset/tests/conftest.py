@@ -0,0 +1,111 @@
+"""
+Shared fixtures: a local stand-in for booknotes.c-span.org.
+
+    def test_page(local_server):
+        url = local_server.route("/page", (503, {}, b""), (200, {}, b"ok"))
+        ...
+
+Each route replays its responses in order (the last one repeats); every
+request is recorded with the client port it came from, so tests can check
+retries and connection reuse.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, NamedTuple
+
+import pytest
+
+Response = tuple[int, dict[str, str], bytes]
+
+
+class RecordedRequest(NamedTuple):
+    path: str
+    headers: dict[str, str]
+    client_port: int
+
+
+## -- a response, or a function of the request returning one (e.g. for 304s)
+RouteResponse = Response | Callable[[RecordedRequest], Response]
+
+
+class LocalServer:
+    def __init__(self):
+        self.routes: dict[str, list[RouteResponse]] = {}
+        self.delays: dict[str, float] = {}
+        self.requests: list[RecordedRequest] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            ## -- keep-alive, like the real origin
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                request = RecordedRequest(
+                    path=self.path,
+                    headers={key.lower(): value for key, value in self.headers.items()},
+                    client_port=self.client_address[1],
+                )
+                status, headers, body = server._respond(request)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def _respond(self, request: RecordedRequest) -> Response:
+        with self._lock:
+            self.requests.append(request)
+            responses = self.routes.get(request.path)
+            if not responses:
+                return 404, {}, b"not found"
+            response = responses.pop(0) if len(responses) > 1 else responses[0]
+            delay = self.delays.get(request.path, 0.0)
+        if delay:
+            time.sleep(delay)
+        return response(request) if callable(response) else response
+
+    def route(self, path: str, *responses: RouteResponse, delay: float = 0.0) -> str:
+        """Serve `responses` at `path` (after `delay` seconds); returns its url."""
+        with self._lock:
+            self.routes[path] = list(responses)
+            self.delays[path] = delay
+        return self.url(path)
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def requests_to(self, path: str) -> list[RecordedRequest]:
+        with self._lock:
+            return [request for request in self.requests if request.path == path]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def local_server():
+    server = LocalServer()
+    server.start()
+    yield server
+    server.stop()
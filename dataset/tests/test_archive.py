@@ -0,0 +1,51 @@
+from cspan_booknotes.archive import HtmlArchive
+from cspan_booknotes.fetch import FetchResult
+
+
+def page(program_id: str, content: bytes, etag: str | None = None) -> FetchResult:
+    return FetchResult(
+        url=f"https://booknotes.c-span.org/Watch/{program_id}",
+        status=200,
+        content=content,
+        headers={"etag": etag} if etag else {},
+        elapsed=0.0,
+        attempts=1,
+    )
+
+
+def test_reads_see_records_appended_by_another_writer(tmp_path):
+    reader = HtmlArchive(tmp_path / "html.pack")
+    writer = HtmlArchive(tmp_path / "html.pack")
+    writer.put("1-1", page("1-1", b"v1", etag='"v1"'))
+    assert reader.get_metadata("1-1")["etag"] == '"v1"'
+
+    writer.put("2-1", page("2-1", b"other"))
+    writer.put("1-1", page("1-1", b"v2", etag='"v2"'))
+
+    assert "2-1" in reader
+    assert reader.get_metadata("1-1")["etag"] == '"v2"'
+    assert reader.get_content("1-1") == b"v2"
+
+
+def test_truncated_record_is_not_indexed(tmp_path):
+    path = tmp_path / "html.pack"
+    writer = HtmlArchive(path)
+    writer.put("1-1", page("1-1", b"complete"))
+    complete_size = path.stat().st_size
+    writer.put("2-1", page("2-1", b"cut short by a crash"))
+    writer.close()
+
+    ## -- a writer crashed in the middle of its last record
+    with open(path, "r+b") as f:
+        f.truncate(path.stat().st_size - 5)
+
+    archive = HtmlArchive(path)
+    assert archive.get_content("1-1") == b"complete"
+    assert "2-1" not in archive
+    ## -- indexing stopped before the partial record
+    assert complete_size <= archive._indexed_size < path.stat().st_size
+
+    ## -- the next write replaces the partial record
+    archive.put("3-1", page("3-1", b"after the crash"))
+    assert HtmlArchive(path).get_content("3-1") == b"after the crash"
+    assert HtmlArchive(path).get_content("1-1") == b"complete"
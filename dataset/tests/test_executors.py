@@ -0,0 +1,49 @@
+import time
+
+from cspan_booknotes.executors import BatchSizer, get_executor
+
+
+def test_batch_size_grows_towards_the_target():
+    sizer = BatchSizer(target_seconds=1.0, max_size=256)
+    assert sizer.next_size() == 1
+
+    sizer.record(1, 0.1)
+    assert sizer.next_size() == 10
+
+
+def test_instant_tasks_reach_the_max_batch_size():
+    sizer = BatchSizer(max_size=256)
+
+    ## -- too fast for the timer: not "unmeasured", just very cheap
+    sizer.record(4, 0.0)
+
+    assert sizer.seconds_per_item > 0
+    assert sizer.next_size() == 256
+
+
+def _double_all(batch: list[int]) -> list[int]:
+    return [item * 2 for item in batch]
+
+
+def test_map_batches_covers_every_item():
+    with get_executor("thread", max_workers=2) as executor:
+        results = [
+            item
+            for batch in executor.map_batches(_double_all, range(1000))
+            for item in batch
+        ]
+
+    assert sorted(results) == [item * 2 for item in range(1000)]
+
+
+def _sleep_then_return(item: float) -> float:
+    time.sleep(item)
+    return item
+
+
+def test_ordered_map_keeps_input_order():
+    ## -- early items finish last
+    items = [0.05, 0.04, 0.03, 0.0, 0.0, 0.0, 0.01, 0.0]
+
+    with get_executor("thread", max_workers=4) as executor:
+        assert list(executor.map(_sleep_then_return, items, ordered=True)) == items
@@ -0,0 +1,115 @@
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from cspan_booknotes.fragments import extract_fragments
+from cspan_booknotes.get import PageContent, build_html
+from cspan_booknotes.models import Program
+from cspan_booknotes.parser import get_parser
+from cspan_booknotes.parser.air_date import get_original_air_date
+from cspan_booknotes.parser.description import get_program_description
+from cspan_booknotes.parser.extract import (
+    PAGE_TARGETS,
+    PROGRAM_PAGE_REGION_IDS,
+    FieldTarget,
+    extract_page_elements,
+)
+from cspan_booknotes.parser.guest import get_guest_author
+from cspan_booknotes.parser.isbn import get_book_isbn
+from cspan_booknotes.parser.related import get_related_programs
+from cspan_booknotes.parser.title import get_program_title
+from cspan_booknotes.parser.transcript import get_transcript
+
+PAGE = (Path(__file__).parent / "fixtures" / "program_page.html").read_bytes()
+URL = "https://booknotes.c-span.org/Watch/51559-1"
+
+
+def find(html: BeautifulSoup, target: FieldTarget):
+    """A field's element looked up on its own with `find`."""
+    if target.within is not None:
+        html = find(html, target.within)
+        if html is None:
+            return None
+    return html.find(target.tag_type, id=target.tag_id)
+
+
+def assert_same_elements_as_find(html: BeautifulSoup) -> None:
+    elements = extract_page_elements(html)
+    for field, target in PAGE_TARGETS.items():
+        assert elements[field] is find(html, target), field
+
+
+def test_fixture_page_matches_find():
+    html = build_html(PAGE)
+
+    assert_same_elements_as_find(html)
+    assert all(element is not None for element in extract_page_elements(html).values())
+
+
+def test_fixture_page_parses_like_the_per_field_getters():
+    html = build_html(PAGE)
+
+    program = get_parser("bs4").parse(PageContent(url=URL, html=html))
+
+    assert program == Program(
+        id="51559-1",
+        url=URL,
+        title=get_program_title(html),
+        guest=get_guest_author(html),
+        description=get_program_description(html),
+        book_isbn=get_book_isbn(html),
+        air_date=get_original_air_date(html),
+        transcript=get_transcript(html),
+        related=get_related_programs(html),
+    )
+
+
+def test_partial_and_fragment_pages_parse_like_the_full_page():
+    parser = get_parser("bs4")
+    program = parser.parse(PageContent(url=URL, html=build_html(PAGE)))
+
+    partial = build_html(PAGE, partial=True)
+    assert parser.parse(PageContent(url=URL, html=partial)) == program
+    fragment = build_html(extract_fragments(PAGE))
+    assert parser.parse(PageContent(url=URL, html=fragment)) == program
+
+
+def test_regions_cover_every_target():
+    html = build_html(PAGE)
+
+    for field, element in extract_page_elements(html).items():
+        region_ids = {element.get("id")} | {
+            parent.get("id") for parent in element.parents
+        }
+        assert region_ids & set(PROGRAM_PAGE_REGION_IDS), field
+
+
+@pytest.mark.parametrize(
+    "markup",
+    [
+        ## -- a target nested inside another target's element
+        '<div id="progContent"><span id="lblAirDate">June 5, 1994</span></div>',
+        ## -- an element with a target's id but another tag type comes first
+        '<span id="progContent">no</span><div id="progContent">yes</div>',
+        ## -- the transcript's scope id on another tag type, holding a transcript
+        (
+            '<span id="transContent"><div id="ransContPadding">no</div></span>'
+            '<div id="transContent"><div id="ransContPadding">yes</div></div>'
+        ),
+        ## -- only the first scope element counts
+        (
+            '<div id="transContent"></div>'
+            '<div id="transContent"><div id="ransContPadding">no</div></div>'
+        ),
+        ## -- a transcript outside of its scope
+        '<div id="ransContPadding">no</div><div id="transContent"></div>',
+        ## -- the scope nested inside another target's element
+        (
+            '<div id="RelateProgram"><div id="transContent">'
+            '<div id="ransContPadding">yes</div></div></div>'
+        ),
+    ],
+)
+def test_edge_cases_match_find(markup):
+    assert_same_elements_as_find(BeautifulSoup(markup, features="lxml"))
@@ -0,0 +1,118 @@
+import threading
+
+import httpx
+import pytest
+
+from cspan_booknotes.archive import HtmlArchive
+from cspan_booknotes.fetch import BackgroundFetcher, fetch_pages
+
+## -- no real waiting between retries
+FAST_RETRIES = {"backoff_base": 0.0, "backoff_max": 0.0}
+
+
+def test_retries_503_then_200(local_server):
+    url = local_server.route(
+        "/Watch/1-1",
+        (503, {"Retry-After": "0"}, b"busy"),
+        (503, {}, b"busy"),
+        (200, {}, b"<html>page</html>"),
+    )
+
+    [result] = fetch_pages([url], **FAST_RETRIES)
+
+    assert result["status"] == 200
+    assert result["content"] == b"<html>page</html>"
+    assert result["attempts"] == 3
+    assert len(local_server.requests_to("/Watch/1-1")) == 3
+
+
+def test_gives_up_after_max_retries(local_server):
+    url = local_server.route("/Watch/1-1", (503, {}, b"busy"))
+
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        fetch_pages([url], max_retries=2, **FAST_RETRIES)
+
+    assert error.value.response.status_code == 503
+    assert len(local_server.requests_to("/Watch/1-1")) == 3
+
+
+def test_404_raises_without_retrying(local_server):
+    url = local_server.url("/Watch/missing")
+
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        fetch_pages([url], **FAST_RETRIES)
+
+    assert error.value.response.status_code == 404
+    assert len(local_server.requests_to("/Watch/missing")) == 1
+
+
+def test_failed_urls_are_returned_with_return_exceptions(local_server):
+    ok = local_server.route("/Watch/1-1", (200, {}, b"ok"))
+    missing = local_server.url("/Watch/missing")
+
+    results = fetch_pages([ok, missing], return_exceptions=True, **FAST_RETRIES)
+
+    assert results[0]["content"] == b"ok"
+    assert isinstance(results[1], httpx.HTTPStatusError)
+
+
+def test_304_revalidation_keeps_archived_body(local_server, tmp_path):
+    def page(request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"'}, b"<html>v1</html>"
+
+    url = local_server.route("/Watch/1-1", page)
+    archive = HtmlArchive(tmp_path / "html.pack")
+
+    [result] = fetch_pages([url], **FAST_RETRIES)
+    archive.put("1-1", result)
+    headers = archive.conditional_headers("1-1")
+    assert headers == {"If-None-Match": '"v1"'}
+
+    [revalidated] = fetch_pages([url], request_headers={url: headers})
+    assert revalidated["status"] == 304
+    assert revalidated["content"] == b""
+
+    archive.touch("1-1", revalidated)
+    assert archive.get_content("1-1") == b"<html>v1</html>"
+    assert local_server.requests_to("/Watch/1-1")[1].headers["if-none-match"] == '"v1"'
+    archive.close()
+
+
+def test_connections_are_reused(local_server):
+    urls = [
+        local_server.route(f"/Watch/{i}-1", (200, {}, b"ok"), delay=0.01)
+        for i in range(40)
+    ]
+
+    results = fetch_pages(urls, max_concurrency=4)
+
+    assert all(result["status"] == 200 for result in results)
+    ## -- 40 requests over at most 4 keep-alive connections
+    client_ports = {request.client_port for request in local_server.requests}
+    assert len(client_ports) <= 4
+
+
+def test_background_fetcher_shares_one_pool_across_threads(local_server):
+    urls = [local_server.route(f"/Watch/{i}-1", (200, {}, b"ok")) for i in range(32)]
+    results = []
+
+    with BackgroundFetcher(max_concurrency=2) as fetcher:
+        threads = [
+            threading.Thread(
+                target=lambda chunk: results.extend(
+                    fetcher.fetch(url) for url in chunk
+                ),
+                args=(urls[i::4],),
+            )
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(results) == 32
+    client_ports = {request.client_port for request in local_server.requests}
+    assert len(client_ports) <= 2
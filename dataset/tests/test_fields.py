@@ -0,0 +1,35 @@
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+from cspan_booknotes.models.fields import Transcript, TranscriptColumns
+
+transcript = TypeAdapter(Transcript)
+
+ENTRY = {"index": 0, "speaker_role": "host", "speaker_name": "LAMB", "text": "Hello."}
+
+
+def test_rows_and_columns_validate_to_the_same_transcript():
+    columns = {name: [ENTRY[name]] for name in TranscriptColumns.__slots__}
+
+    assert transcript.validate_python([ENTRY]) == transcript.validate_python(columns)
+
+
+def test_entry_missing_a_field_is_a_validation_error():
+    entry = {key: value for key, value in ENTRY.items() if key != "speaker_role"}
+
+    with pytest.raises(ValidationError, match="entry 1 is missing 'speaker_role'"):
+        transcript.validate_python([ENTRY, entry])
+
+
+def test_entry_that_is_not_an_object_is_a_validation_error():
+    with pytest.raises(ValidationError, match="entry 0 must be an object"):
+        transcript.validate_python(["LAMB: Hello."])
+
+
+def test_column_that_is_not_a_list_is_a_validation_error():
+    columns = {name: [ENTRY[name]] for name in TranscriptColumns.__slots__}
+    ## -- a string would otherwise be split into characters
+    columns["text"] = "Hello."
+
+    with pytest.raises(ValidationError, match="column 'text' must be a list"):
+        transcript.validate_python(columns)
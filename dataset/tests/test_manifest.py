@@ -0,0 +1,107 @@
+from cspan_booknotes import manifest as manifest_module
+from cspan_booknotes.manifest import FLATTEN_VERSION, RunManifest, parsed_digest
+
+SETTINGS = {"flatten_version": FLATTEN_VERSION, "optimize_layout": True}
+
+
+def program(program_id: str, title: str = "Booknotes") -> dict:
+    return {"id": program_id, "title": title, "schema_fingerprint": "0" * 16}
+
+
+def first_run(path, programs: dict[str, dict]) -> None:
+    """Parse and flatten every program, as a full run would."""
+    manifest = RunManifest(path)
+    for program_id, program_data in programs.items():
+        assert manifest.needs_parse(program_id, f"html {program_id}")
+        manifest.record_parse(
+            program_id, f"html {program_id}", parsed_digest(program_data)
+        )
+    assert manifest.stage_changed("flatten", SETTINGS)
+    manifest.record_flattened("flatten", SETTINGS, manifest.unflattened(programs))
+    manifest.save()
+
+
+def test_an_unchanged_rerun_does_no_work(tmp_path):
+    path = tmp_path / "manifest.json"
+    programs = {program_id: program(program_id) for program_id in ["1-1", "2-1"]}
+    first_run(path, programs)
+
+    manifest = RunManifest(path)
+    assert not any(
+        manifest.needs_parse(program_id, f"html {program_id}")
+        for program_id in programs
+    )
+    assert not manifest.stage_changed("flatten", SETTINGS)
+    assert manifest.unflattened(programs) == []
+    assert manifest.flattened_ids() == set(programs)
+
+
+def test_a_changed_page_is_reparsed_and_reflattened(tmp_path):
+    path = tmp_path / "manifest.json"
+    programs = {program_id: program(program_id) for program_id in ["1-1", "2-1"]}
+    first_run(path, programs)
+
+    manifest = RunManifest(path)
+    assert manifest.needs_parse("2-1", "html 2-1, edited")
+    assert not manifest.needs_parse("1-1", "html 1-1")
+    ## -- an uncached page is fetched and parsed again
+    assert manifest.needs_parse("1-1", None)
+
+    ## -- a re-parse to the same record needs no flattening, a different one does
+    manifest.record_parse("2-1", "html 2-1, edited", parsed_digest(programs["2-1"]))
+    assert manifest.unflattened(programs) == []
+    manifest.record_parse(
+        "2-1", "html 2-1, edited", parsed_digest(program("2-1", "Edited"))
+    )
+    assert manifest.unflattened(programs) == ["2-1"]
+
+
+def test_a_parser_change_reparses_everything(tmp_path, monkeypatch):
+    path = tmp_path / "manifest.json"
+    programs = {program_id: program(program_id) for program_id in ["1-1", "2-1"]}
+    first_run(path, programs)
+
+    monkeypatch.setattr(manifest_module, "PARSER_VERSION", "f" * 16)
+    manifest = RunManifest(path)
+    assert all(
+        manifest.needs_parse(program_id, f"html {program_id}")
+        for program_id in programs
+    )
+    manifest.record_parse("1-1", "html 1-1", parsed_digest(programs["1-1"]))
+    assert not manifest.needs_parse("1-1", "html 1-1")
+
+
+def test_changed_flatten_settings_invalidate_the_stage(tmp_path):
+    path = tmp_path / "manifest.json"
+    programs = {program_id: program(program_id) for program_id in ["1-1", "2-1"]}
+    first_run(path, programs)
+
+    manifest = RunManifest(path)
+    assert manifest.stage_changed("flatten", {**SETTINGS, "optimize_layout": False})
+    assert manifest.stage_changed("flatten", {**SETTINGS, "flatten_version": "f" * 16})
+    assert not manifest.stage_changed("flatten", dict(SETTINGS))
+
+
+def test_removed_and_unrecorded_programs(tmp_path):
+    path = tmp_path / "manifest.json"
+    programs = {program_id: program(program_id) for program_id in ["1-1", "2-1"]}
+    first_run(path, programs)
+
+    manifest = RunManifest(path)
+    ## -- programs parsed before the manifest existed are treated as changed
+    assert manifest.unflattened(["1-1", "3-1"]) == ["3-1"]
+    assert manifest.needs_parse("3-1", "html 3-1")
+
+    ## -- a program dropped from the outputs is no longer flattened
+    manifest.record_flattened("flatten", SETTINGS, [], removed_ids=["2-1"])
+    manifest.save()
+    assert RunManifest(path).flattened_ids() == {"1-1"}
+    assert RunManifest(path).unflattened(programs) == ["2-1"]
+
+
+def test_the_schema_stamp_is_not_part_of_the_parsed_digest():
+    stamped = program("1-1")
+    assert parsed_digest(stamped) == parsed_digest(
+        {**stamped, "schema_fingerprint": "f" * 16}
+    )
+    assert parsed_digest(stamped) != parsed_digest(program("1-1", "Edited"))
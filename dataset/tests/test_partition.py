@@ -0,0 +1,76 @@
+import polars as pl
+
+from cspan_booknotes.layout import ParquetLayout
+from cspan_booknotes.partition import (
+    partition_keys,
+    patch_partitioned,
+    write_partitioned,
+)
+
+LAYOUT = ParquetLayout(
+    sort_by=["program_id", "sequence"],
+    row_group_size=8,
+    max_rows_per_page=4,
+    bloom_filter_columns=["program_id"],
+    compression_level=1,
+)
+
+
+def turns(program_ids: list[str], text: str = "turn") -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "program_id": [program_id for program_id in program_ids for _ in range(5)],
+            "sequence": [sequence for _ in program_ids for sequence in range(5)],
+            "text": text,
+        }
+    )
+
+
+def read_shards(root) -> pl.DataFrame:
+    return pl.read_parquet(root / "**/*.parquet", hive_partitioning=True).sort(
+        "program_id", "sequence"
+    )
+
+
+def test_shards_are_split_in_row_groups_and_patched(tmp_path):
+    program_ids = [f"{i}-1" for i in range(20)]
+    programs = pl.DataFrame(
+        {
+            "program_id": program_ids,
+            "air_date": pl.date_range(
+                pl.date(1989, 1, 1), pl.date(2008, 1, 1), "1y", eager=True
+            ),
+        }
+    )
+    keys = partition_keys(programs, "air_year")
+    source = tmp_path / "transcripts.parquet"
+    ## -- shuffled, so every row group holds rows of several shards
+    turns(program_ids).sample(fraction=1.0, shuffle=True, seed=0).write_parquet(
+        source, row_group_size=8
+    )
+    root = tmp_path / "transcripts"
+
+    shard_paths = write_partitioned(source, root, keys, LAYOUT, max_buffer_bytes=1)
+
+    assert len(shard_paths) == 20
+    for shard_path in shard_paths:
+        shard = pl.read_parquet(shard_path)
+        assert shard.equals(shard.sort("program_id", "sequence"))
+    shards = read_shards(root)
+    assert shards.drop("air_year").equals(turns(sorted(program_ids)))
+    assert shards.join(keys, on="program_id")["air_year_right"].equals(
+        shards["air_year"], check_names=False
+    )
+
+    ## -- program 0 is edited and moves to another year, program 1 is removed
+    moved = keys.with_columns(air_year=pl.lit(2030, pl.Int32)).head(1)
+    patch_partitioned(root, turns(["0-1"], "edited"), ["0-1", "1-1"], moved, LAYOUT, 1)
+
+    assert not (root / "air_year=1989").exists()
+    assert not (root / "air_year=1990").exists()
+    shards = read_shards(root)
+    assert len(shards) == 19 * 5
+    assert "1-1" not in shards["program_id"]
+    edited = shards.filter(pl.col("text") == "edited")
+    assert edited["program_id"].unique().to_list() == ["0-1"]
+    assert edited["air_year"].unique().to_list() == [2030]
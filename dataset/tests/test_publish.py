@@ -0,0 +1,87 @@
+from datetime import date
+
+import polars as pl
+import yaml
+
+from cspan_booknotes.publish import (
+    PublishOptions,
+    dataset_data_files,
+    publish_datasets,
+    write_hf_repo_config,
+)
+
+
+def write_flat_datasets(root) -> dict:
+    program_ids = ["1-1", "2-1", "3-1"]
+    datasets = {
+        "programs": pl.DataFrame(
+            {
+                "program_id": program_ids,
+                "air_date": [date(1990, 1, 1), date(1991, 1, 1), None],
+            }
+        ),
+        "transcripts": pl.DataFrame(
+            {"program_id": program_ids * 2, "sequence": [1, 1, 1, 0, 0, 0]}
+        ),
+        "related_items": pl.DataFrame(
+            {"program_id": program_ids, "related_id": ["2-1", "3-1", "1-1"]}
+        ),
+    }
+    output_paths = {}
+    for name, df in datasets.items():
+        output_paths[name] = root / f"{name}.parquet"
+        df.write_parquet(output_paths[name])
+    return output_paths
+
+
+def test_partitioned_then_single_file_outputs(tmp_path):
+    partitioned = PublishOptions(partition_by="air_year")
+
+    summaries = list(publish_datasets(write_flat_datasets(tmp_path), partitioned))
+
+    assert summaries[0] == "Sharded programs dataset into 3 air_year partitions"
+    assert sorted(path.name for path in (tmp_path / "transcripts").iterdir()) == [
+        "air_year=1990",
+        "air_year=1991",
+        "air_year=__HIVE_DEFAULT_PARTITION__",
+    ]
+    assert not (tmp_path / "transcripts.parquet").exists()
+    assert (tmp_path / "related_items.parquet").exists()
+
+    ## -- back to one file per dataset: the shards would otherwise be published too
+    list(publish_datasets(write_flat_datasets(tmp_path), PublishOptions()))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "programs.parquet",
+        "related_items.parquet",
+        "transcripts.parquet",
+    ]
+    assert pl.read_parquet(tmp_path / "transcripts.parquet")["sequence"].to_list() == [
+        0,
+        1,
+        0,
+        1,
+        0,
+        1,
+    ]
+
+
+def test_hf_repo_config_points_at_the_published_files(tmp_path):
+    config_path = tmp_path / "hf_repo.yaml"
+    config_path.write_text("configs: []\nlicense: mit\n")
+    options = PublishOptions(partition_by="program_bucket")
+
+    write_hf_repo_config(
+        config_path, dataset_data_files(["programs", "related_items"], options)
+    )
+
+    assert yaml.safe_load(config_path.read_text()) == {
+        "configs": [
+            {
+                "config_name": "programs",
+                "data_files": "programs/program_bucket=*/*.parquet",
+            },
+            {"config_name": "related_items", "data_files": "related_items.parquet"},
+        ],
+        "license": "mit",
+    }
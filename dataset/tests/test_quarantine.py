@@ -0,0 +1,74 @@
+import httpx
+
+from cspan_booknotes import quarantine as quarantine_module
+from cspan_booknotes.exceptions import DurationNotFoundError
+from cspan_booknotes.quarantine import QuarantineStore, quarantine_record
+from cspan_booknotes.retry import call_with_retries
+
+URL = "https://booknotes.c-span.org/Watch/1-1"
+HTML = b"<html><body><div id='main'>a page without its duration</div></body></html>"
+
+
+def parse_page(html):
+    raise DurationNotFoundError()
+
+
+def test_field_errors_are_quarantined_on_the_first_attempt(tmp_path):
+    attempt = call_with_retries(parse_page, HTML)
+    record = quarantine_record(
+        "1-1", URL, "parse", attempt.error, attempt.attempts, HTML, "digest 1"
+    )
+
+    assert record["attempts"] == 1
+    assert record["error_kind"] == "deterministic"
+    assert record["error_type"] == "DurationNotFoundError"
+    assert record["field"] == "duration"
+    assert record["message"] == DurationNotFoundError.__doc__.strip()
+    assert "a page without its duration" in record["html_snippet"]
+
+    quarantine = QuarantineStore(tmp_path / "quarantine.json")
+    quarantine.add(record)
+    quarantine.save()
+    assert QuarantineStore(tmp_path / "quarantine.json").records == {"1-1": record}
+
+
+def test_quarantined_pages_are_skipped_until_they_change(tmp_path, monkeypatch):
+    path = tmp_path / "quarantine.json"
+    quarantine = QuarantineStore(path)
+    quarantine.add(
+        quarantine_record(
+            "1-1", URL, "parse", DurationNotFoundError(), html_digest="digest 1"
+        )
+    )
+    quarantine.save()
+
+    quarantine = QuarantineStore(path)
+    assert quarantine.should_skip("1-1", "digest 1")
+    assert not quarantine.should_skip("1-1", "digest 2")
+    ## -- an uncached page is fetched again
+    assert not quarantine.should_skip("1-1", None)
+    assert not quarantine.should_skip("2-1", "digest 1")
+
+    ## -- nor is it skipped once the parser changed
+    monkeypatch.setattr(quarantine_module, "PARSER_VERSION", "f" * 16)
+    assert not quarantine.should_skip("1-1", "digest 1")
+    monkeypatch.undo()
+
+    quarantine.release("1-1")
+    assert "1-1" not in quarantine
+    assert not quarantine.should_skip("1-1", "digest 1")
+
+
+def test_transient_failures_are_not_skipped(tmp_path):
+    quarantine = QuarantineStore(tmp_path / "quarantine.json")
+    quarantine.add(
+        quarantine_record(
+            "1-1",
+            URL,
+            "fetch",
+            httpx.ConnectError("connection refused"),
+            attempts=3,
+            html_digest="digest 1",
+        )
+    )
+    assert not quarantine.should_skip("1-1", "digest 1")
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+from cspan_booknotes import rate
+from cspan_booknotes.fetch import Fetcher
+from cspan_booknotes.rate import AdaptiveRateController, TokenBucket
+
+FAST_RETRIES = {"backoff_base": 0.0, "backoff_max": 0.0}
+
+
+async def fetch_all(controller: AdaptiveRateController, urls: list[str], **options):
+    async with Fetcher(controller=controller, **FAST_RETRIES, **options) as fetcher:
+        return await fetcher.fetch_many(urls, return_exceptions=True)
+
+
+def test_429s_shrink_the_window(local_server):
+    url = local_server.route(
+        "/Watch/1-1",
+        *[(429, {"Retry-After": "0"}, b"slow down")] * 3,
+        (200, {}, b"ok"),
+    )
+    controller = AdaptiveRateController(initial_window=8, decrease_cooldown=0.0)
+
+    [result] = asyncio.run(fetch_all(controller, [url]))
+
+    assert result["status"] == 200
+    assert controller.throttled == 3
+    ## -- halved three times (8 -> 1), then one additive increase
+    assert controller.window == 2
+
+
+def test_injected_slowdown_shrinks_the_window(local_server):
+    fast = [
+        local_server.route(f"/fast/{i}", (200, {}, b"ok"), delay=0.02)
+        for i in range(30)
+    ]
+    slow = [
+        local_server.route(f"/slow/{i}", (200, {}, b"ok"), delay=0.3) for i in range(5)
+    ]
+    ## -- tolerant of scheduling jitter on the fast responses (and enough of them for
+    ## -- the latency average to forget a slow first request, e.g. a cold connection)
+    controller = AdaptiveRateController(
+        initial_window=4, decrease_cooldown=0.0, latency_tolerance=4.0
+    )
+
+    asyncio.run(fetch_all(controller, fast, max_concurrency=1))
+    window_before = controller.window
+    assert window_before > 4
+    asyncio.run(fetch_all(controller, slow, max_concurrency=1))
+
+    assert controller.throttled == 0
+    assert (
+        controller.latency_ewma > controller.latency_tolerance * controller.base_latency
+    )
+    assert controller.window < window_before
+
+
+def test_base_latency_is_a_windowed_minimum():
+    controller = AdaptiveRateController(base_latency_window=0.05)
+
+    async def run():
+        await controller.record(0.001)
+        for _ in range(30):
+            await controller.record(0.1)
+        assert controller.base_latency == 0.001
+        ## -- the fast response ages out of the window
+        await asyncio.sleep(0.1)
+        await controller.record(0.1)
+
+    asyncio.run(run())
+    assert controller.base_latency > 0.05
+    window = controller.window
+    asyncio.run(controller.record(0.1))
+    ## -- steady latency is the new normal: the window grows again
+    assert controller.window > window
+
+
+def test_completed_requests_are_trimmed_on_record(monkeypatch):
+    monkeypatch.setattr(rate, "THROUGHPUT_WINDOW", 0.05)
+    controller = AdaptiveRateController()
+
+    async def run():
+        for _ in range(100):
+            await controller.record(0.01)
+        await asyncio.sleep(0.1)
+        await controller.record(0.01)
+
+    asyncio.run(run())
+    assert len(controller._completed_at) == 1
+
+
+def test_token_bucket_caps_the_request_rate():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(11):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    ## -- one burst token, then 10 more at 50/s
+    assert asyncio.run(run()) >= 0.18
@@ -0,0 +1,73 @@
+import httpx
+import pytest
+
+from cspan_booknotes.exceptions import DurationNotFoundError
+from cspan_booknotes.retry import RETRY_POLICIES, call_with_retries, classify_error
+
+## -- the default policies without the backoff sleeps
+POLICIES = {
+    kind: policy._replace(backoff_base=0.0) for kind, policy in RETRY_POLICIES.items()
+}
+
+
+def status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://booknotes.c-span.org/Watch/1-1")
+    return httpx.HTTPStatusError(
+        "", request=request, response=httpx.Response(status_code, request=request)
+    )
+
+
+@pytest.mark.parametrize(
+    ("error", "kind"),
+    [
+        (httpx.ConnectError("connection refused"), "transient"),
+        (httpx.ReadTimeout("timed out"), "transient"),
+        (status_error(503), "transient"),
+        (status_error(429), "transient"),
+        (status_error(404), "deterministic"),
+        (DurationNotFoundError(), "deterministic"),
+        (ValueError("invalid date"), "deterministic"),
+        (KeyError("id"), "unknown"),
+    ],
+)
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def failing(*errors: Exception):
+    """A function raising `errors` on its first calls, then returning "ok"."""
+    calls = []
+
+    def fn(url):
+        calls.append(url)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return fn, calls
+
+
+def test_transient_errors_are_retried():
+    fn, calls = failing(httpx.ConnectError("connection refused"), status_error(503))
+    attempt = call_with_retries(fn, "/Watch/1-1", policies=POLICIES)
+    assert attempt == ("ok", None, 3)
+    assert calls == ["/Watch/1-1"] * 3
+
+
+def test_deterministic_errors_are_not_retried():
+    error = DurationNotFoundError()
+    fn, calls = failing(error)
+    attempt = call_with_retries(fn, "/Watch/1-1", policies=POLICIES)
+    assert attempt == (None, error, 1)
+    assert len(calls) == 1
+
+
+def test_errors_are_returned_once_retries_run_out():
+    fn, calls = failing(*[httpx.ConnectError("connection refused")] * 3)
+    attempt = call_with_retries(fn, "/Watch/1-1", policies=POLICIES)
+    assert isinstance(attempt.error, httpx.ConnectError)
+    assert attempt.attempts == len(calls) == 3
+
+    ## -- unknown errors get a single retry
+    fn, calls = failing(KeyError("id"), KeyError("id"))
+    assert call_with_retries(fn, "/Watch/1-1", policies=POLICIES).attempts == 2
@@ -0,0 +1,18 @@
+import inspect
+
+from cspan_booknotes.models import fields, validators
+from cspan_booknotes.models.schema import schema_fingerprint
+
+
+def test_fingerprint_covers_model_source(monkeypatch):
+    fingerprint = schema_fingerprint()
+    getsource = inspect.getsource
+
+    for module in (fields, validators):
+        ## -- e.g. a change to `TranscriptColumns.check` that the JSON schema can't see
+        monkeypatch.setattr(
+            inspect,
+            "getsource",
+            lambda obj, module=module: getsource(obj) + ("\n" if obj is module else ""),
+        )
+        assert schema_fingerprint() != fingerprint
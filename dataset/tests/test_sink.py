@@ -0,0 +1,92 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from cspan_booknotes.sink import ParquetDatasetSink
+
+SCHEMA = pa.schema([("program_id", pa.string()), ("text", pa.string())])
+
+
+def small_tables(count: int, rows: int, text: str = "turn") -> list[pa.Table]:
+    return [
+        pa.table(
+            {
+                "program_id": [f"{i}-1"] * rows,
+                "text": [f"{text} {i}.{j}" for j in range(rows)],
+            },
+            schema=SCHEMA,
+        )
+        for i in range(count)
+    ]
+
+
+def row_group_sizes(path) -> list[int]:
+    metadata = pq.ParquetFile(path).metadata
+    return [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+
+
+def test_small_tables_are_written_as_full_row_groups(tmp_path):
+    path = tmp_path / "transcripts.parquet"
+    tables = small_tables(100, rows=3)
+    with ParquetDatasetSink({"transcripts": path}, row_group_size=10) as sink:
+        for table in tables:
+            sink.write("transcripts", table)
+
+    ## -- 300 rows: 30 full row groups, none written per incoming table
+    assert pq.ParquetFile(path).metadata.num_row_groups == 30
+    assert row_group_sizes(path) == [10] * 30
+    assert sink.row_groups_written == {"transcripts": 30}
+    assert sink.rows_written == {"transcripts": 300}
+    assert pq.read_table(path).equals(pa.concat_tables(tables))
+
+
+def test_buffers_over_the_ceiling_are_written_early(tmp_path):
+    paths = {
+        "programs": tmp_path / "programs.parquet",
+        "transcripts": tmp_path / "transcripts.parquet",
+    }
+    programs = small_tables(50, rows=1)
+    transcripts = small_tables(50, rows=4, text="a longer transcript turn" * 10)
+    ## -- room for a few incoming tables, far less than a row group
+    max_buffer_bytes = 4 * transcripts[0].nbytes
+    with ParquetDatasetSink(
+        paths, row_group_size=1000, max_buffer_bytes=max_buffer_bytes
+    ) as sink:
+        for program, transcript in zip(programs, transcripts):
+            sink.write("programs", program)
+            sink.write("transcripts", transcript)
+            assert sum(sink._buffered_bytes.values()) <= max_buffer_bytes
+
+    ## -- the larger transcripts buffer is the one written early, in partial row groups
+    transcript_row_groups = row_group_sizes(paths["transcripts"])
+    assert len(transcript_row_groups) > 1
+    assert max(transcript_row_groups) < 1000
+    assert sum(transcript_row_groups) == 200
+    assert pq.read_table(paths["transcripts"]).equals(pa.concat_tables(transcripts))
+    assert pq.read_table(paths["programs"]).equals(pa.concat_tables(programs))
+    assert sink.row_groups_written == {
+        name: pq.ParquetFile(path).metadata.num_row_groups
+        for name, path in paths.items()
+    }
+
+
+def test_datasets_with_a_schema_are_written_empty(tmp_path):
+    path = tmp_path / "programs.parquet"
+    with ParquetDatasetSink({"programs": path}, schemas={"programs": SCHEMA}):
+        pass
+
+    assert pq.read_schema(path) == SCHEMA
+    assert pq.ParquetFile(path).metadata.num_rows == 0
+
+
+def test_a_failed_run_leaves_no_file(tmp_path):
+    path = tmp_path / "transcripts.parquet"
+    with (
+        pytest.raises(RuntimeError),
+        ParquetDatasetSink({"transcripts": path}, row_group_size=10) as sink,
+    ):
+        for table in small_tables(10, rows=3):
+            sink.write("transcripts", table)
+        raise RuntimeError("parse failed")
+
+    assert list(tmp_path.iterdir()) == []
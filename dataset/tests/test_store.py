@@ -0,0 +1,80 @@
+import pyarrow as pa
+
+from cspan_booknotes.store import PARSED_PROGRAM_ARROW_SCHEMA, ParsedProgramStore
+
+
+def program(program_id: str, title: str = "Booknotes") -> dict:
+    return {
+        "id": program_id,
+        "url": f"https://booknotes.c-span.org/Watch/{program_id}",
+        "title": title,
+        "guest": "Guest Author",
+        "description": None,
+        "book_isbn": "",
+        "air_date": "1989-04-02",
+        "transcript": {
+            "index": [0, 1],
+            "speaker_role": ["host", "guest"],
+            "speaker_name": ["BRIAN LAMB", "GUEST AUTHOR"],
+            "text": ["Why this book?", "Because."],
+        },
+        "related": [
+            {"id": "2-1", "url": None, "author": "Another Author", "title": "Another"}
+        ],
+        "schema_fingerprint": "0" * 16,
+    }
+
+
+def record_batch(programs: list[dict]) -> pa.RecordBatch:
+    return pa.RecordBatch.from_pylist(programs, schema=PARSED_PROGRAM_ARROW_SCHEMA)
+
+
+def test_put_batch_round_trip_and_overwrite(tmp_path):
+    programs = [program(f"{i}-1") for i in range(10)]
+    with ParsedProgramStore(tmp_path, batch_size=4) as store:
+        store.put_batch(record_batch(programs[:6]))
+        store.put_batch(record_batch(programs[6:]))
+        ## -- visible before the flush
+        assert store.get("7-1") == programs[7]
+
+    store = ParsedProgramStore(tmp_path)
+    assert len(store) == 10
+    assert all(store.get(p["id"]) == p for p in programs)
+    assert store.get("10-1") is None
+    ## -- one chunk, indexed by (file, record batch, row)
+    assert [path.name for path in store.chunk_paths()] == ["chunk-000000.arrow"]
+    assert store.index["7-1"] == ("chunk-000000.arrow", 1, 1)
+
+    edited = program("7-1", title="Edited")
+    with ParsedProgramStore(tmp_path) as store:
+        store.put_batch(record_batch([edited]))
+
+    store = ParsedProgramStore(tmp_path)
+    assert len(store) == 10
+    assert store.get("7-1") == edited
+    assert store.index["7-1"] == ("chunk-000001.arrow", 0, 0)
+    ## -- the old row is still on disk, but no longer read
+    scanned = store.scan().collect()
+    assert scanned.height == 10
+    assert scanned.filter(id="7-1")["title"].to_list() == ["Edited"]
+    assert sum(batch.num_rows for batch in store.iter_batches()) == 10
+
+    store.compact()
+    assert [path.name for path in store.chunk_paths()] == ["chunk-000002.arrow"]
+    assert ParsedProgramStore(tmp_path).get("7-1") == edited
+    assert sorted(
+        ParsedProgramStore(tmp_path).scan().collect().to_dicts(),
+        key=lambda p: int(p["id"].split("-")[0]),
+    ) == [edited if p["id"] == "7-1" else p for p in programs]
+
+
+def test_later_writes_win_within_a_chunk(tmp_path):
+    with ParsedProgramStore(tmp_path) as store:
+        store.put_batch(record_batch([program("1-1"), program("2-1")]))
+        store.put(program("1-1", title="From put"))
+        store.put_batch(record_batch([program("2-1", title="From put_batch")]))
+
+    store = ParsedProgramStore(tmp_path)
+    assert store.get("1-1")["title"] == "From put"
+    assert store.get("2-1")["title"] == "From put_batch"
+    assert store.scan().collect().height == 2
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark the JSONB payload assembly of `scripts/bulk_upload.py`.
+
+Times the group-by builders (`build_transcript_json`,
+`build_related_episodes_json`) against the previous per-program filter loop
+on synthetic corpora of increasing size, and checks that both produce the
+same payloads. The group-by builders should scale linearly with the corpus
+size (constant time per row); the filter loop rescans every row once per
+program, so its time grows with programs x rows.
+
+Usage:
+    uv run python scripts/benchmark_bulk_upload.py
+    uv run python scripts/benchmark_bulk_upload.py --scales 1 10 100 --legacy-max-scale 10
+"""
+
+import argparse
+import json
+import random
+import time
+
+import polars as pl
+from bulk_upload import build_related_episodes_json, build_transcript_json
+
+## -- SIZE OF THE 1x CORPUS (ROUGHLY THE PUBLISHED DATASET'S PROGRAM COUNT)
+NUM_PROGRAMS: int = 800
+TURNS_PER_PROGRAM: int = 50
+RELATED_PER_PROGRAM: int = 5
+TEXT_CHARS: int = 80
+
+## -- CORPUS SIZES (MULTIPLES OF THE 1x CORPUS) TO TIME
+SCALES: tuple[int, ...] = (1, 10, 100)
+
+## -- THE PER-PROGRAM LOOP IS QUADRATIC; ONLY TIME IT UP TO THIS SCALE
+LEGACY_MAX_SCALE: int = 10
+
+SPEAKERS = ("BRIAN LAMB", "GUEST", None)
+
+
+def synthetic_corpus(num_programs: int, seed: int = 0) -> tuple[pl.DataFrame, ...]:
+    """Transcripts and related items frames shaped like the flat datasets."""
+    rng = random.Random(seed)
+    program_ids = [f"{10000 + i}-1" for i in range(num_programs)]
+    words = ["book", "author", "wrote", "history", "the", "of", "and", "ÿ", '"q"']
+
+    def text() -> str:
+        return " ".join(rng.choice(words) for _ in range(TEXT_CHARS // 5))
+
+    num_turns = num_programs * TURNS_PER_PROGRAM
+    transcripts = pl.DataFrame(
+        {
+            "program_id": [
+                pid for pid in program_ids for _ in range(TURNS_PER_PROGRAM)
+            ],
+            "sequence": [i for _ in program_ids for i in range(TURNS_PER_PROGRAM)],
+            "speaker_name": [rng.choice(SPEAKERS) for _ in range(num_turns)],
+            "text": [text() for _ in range(num_turns)],
+        }
+    ).sample(fraction=1.0, shuffle=True, seed=seed)
+
+    related = pl.DataFrame(
+        {
+            "program_id": [
+                pid for pid in program_ids for _ in range(RELATED_PER_PROGRAM)
+            ],
+            "related_id": [
+                rng.choice(program_ids)
+                for _ in range(num_programs * RELATED_PER_PROGRAM)
+            ],
+            "title": [text()[:30] for _ in range(num_programs * RELATED_PER_PROGRAM)],
+            "guest": [text()[:20] for _ in range(num_programs * RELATED_PER_PROGRAM)],
+        }
+    )
+    return transcripts, related
+
+
+## ------------------------------------------ ##
+## ---- PREVIOUS PER-PROGRAM FILTER LOOP ---- ##
+## ------------------------------------------ ##
+
+
+def legacy_transcript_json(transcripts_df: pl.DataFrame) -> dict[str, str]:
+    transcripts_by_program = {}
+    for program_id in transcripts_df["program_id"].unique().to_list():
+        program_transcripts = (
+            transcripts_df.filter(pl.col("program_id") == program_id)
+            .sort("sequence")
+            .select(["speaker_name", "text"])
+        )
+        transcripts_by_program[program_id] = json.dumps(
+            [
+                {"speaker": row["speaker_name"], "text": row["text"]}
+                for row in program_transcripts.to_dicts()
+            ]
+        )
+    return transcripts_by_program
+
+
+def legacy_related_episodes_json(related_df: pl.DataFrame) -> dict[str, str]:
+    related_by_program = {}
+    for program_id in related_df["program_id"].unique().to_list():
+        related_items = related_df.filter(pl.col("program_id") == program_id).select(
+            ["related_id", "title", "guest"]
+        )
+        related_by_program[program_id] = json.dumps(
+            [
+                {"id": row["related_id"], "title": row["title"], "guest": row["guest"]}
+                for row in related_items.to_dicts()
+            ]
+        )
+    return related_by_program
+
+
+def legacy_payloads(
+    transcripts_df: pl.DataFrame, related_df: pl.DataFrame
+) -> tuple[dict[str, str], dict[str, str]]:
+    return (
+        legacy_transcript_json(transcripts_df),
+        legacy_related_episodes_json(related_df),
+    )
+
+
+## ------------------- ##
+## ---- BENCHMARK ---- ##
+## ------------------- ##
+
+
+def build_payloads(
+    transcripts_df: pl.DataFrame, related_df: pl.DataFrame
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    return build_transcript_json(transcripts_df), build_related_episodes_json(
+        related_df
+    )
+
+
+def timed(fn, *args) -> tuple[object, float]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def same_payloads(built: pl.DataFrame, legacy: dict[str, str]) -> bool:
+    """Whether the encoded payloads decode to the same JSON values."""
+    payloads = dict(built.rows())
+    return payloads.keys() == legacy.keys() and all(
+        json.loads(payloads[program_id]) == json.loads(encoded)
+        for program_id, encoded in legacy.items()
+    )
+
+
+def main(scales: list[int], legacy_max_scale: int):
+    print(
+        f"{'scale':>6} {'rows':>10} {'group-by (s)':>13} {'us/row':>7}"
+        f" {'filter loop (s)':>16} {'speedup':>8}"
+    )
+    for scale in scales:
+        transcripts_df, related_df = synthetic_corpus(NUM_PROGRAMS * scale)
+        num_rows = len(transcripts_df) + len(related_df)
+
+        (transcripts, related), seconds = timed(
+            build_payloads, transcripts_df, related_df
+        )
+
+        legacy_column = speedup_column = "-"
+        if scale <= legacy_max_scale:
+            (legacy_transcripts, legacy_related), legacy_seconds = timed(
+                legacy_payloads, transcripts_df, related_df
+            )
+            if not (
+                same_payloads(transcripts, legacy_transcripts)
+                and same_payloads(related, legacy_related)
+            ):
+                raise AssertionError(
+                    f"Payloads differ from the filter loop at {scale}x"
+                )
+            legacy_column = f"{legacy_seconds:.2f}"
+            speedup_column = f"{legacy_seconds / seconds:.0f}x"
+
+        print(
+            f"{scale:>5}x {num_rows:>10,} {seconds:>13.2f}"
+            f" {seconds / num_rows * 1e6:>7.2f} {legacy_column:>16} {speedup_column:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--legacy-max-scale", type=int, default=LEGACY_MAX_SCALE)
+    args = parser.parse_args()
+    main(args.scales, args.legacy_max_scale)
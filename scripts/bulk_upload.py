@@ -3,30 +3,122 @@
 Bulk upload script for loading Booknotes episode data into Postgres.
 
 Usage:
-    uv run python scripts/bulk_upload.py
+    uv run python scripts/bulk_upload.py [--mode {copy,insert}] [--batch-size N]
+        [--workers N] [--delete-missing]
 
 Requires:
-    - NEON_DATABASE_URL environment variable
+    - NEON_DATABASE_URL environment variable (any Postgres URL, e.g. a local
+      instance for testing: postgresql://postgres@localhost:5432/postgres)
+
+Every row carries a `content_hash` of its normalized content. Programs whose
+hash matches the one already in the database are skipped, so a re-load of
+an unchanged dataset writes nothing; `--delete-missing` also deletes programs
+no longer in the dataset. Every load ends by refreshing `program_list`, the
+narrow materialized view the app lists episodes from.
+
+The default "copy" mode splits the programs into chunks of `--batch-size` and
+loads `--workers` chunks concurrently over a connection pool. Each chunk is
+streamed with COPY FROM STDIN into a temporary staging table and merged into
+`programs` with one set-based upsert, in its own transaction; transient
+errors are retried. Chunks committed by an interrupted run are skipped by the
+next one as unchanged (their content hashes already match). Only the in-flight chunks' JSONB payloads are
+in memory. The "insert" mode builds every row up front and sends a single
+execute_values upsert.
 """
 
-import json
+import argparse
+import hashlib
+import io
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import NamedTuple
 
 import polars as pl
 import psycopg2
 from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 
 DATA_DIR = Path(__file__).parent.parent / "dataset" / "data" / "processed"
 
+# Loader: "copy" (COPY into a staging table, then merge) or "insert" (execute_values)
+LOAD_MODE = "copy"
+
+# Programs per COPY chunk; memory is bounded by LOAD_WORKERS chunks of payloads
+COPY_BATCH_SIZE = 100
+
+# Chunks loaded concurrently, each over its own pooled connection
+LOAD_WORKERS = 4
+
+# Attempts per chunk; connection drops, serialization failures and deadlocks
+# (all OperationalErrors) are retried with jittered exponential backoff
+CHUNK_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 1.0
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+STAGING_TABLE = "programs_staging"
+
+# Columns written by the loaders, in COPY/VALUES order
+PROGRAM_COLUMNS = (
+    "id",
+    "title",
+    "guest",
+    "air_date",
+    "summary",
+    "book_title",
+    "book_isbn",
+    "url",
+    "transcript",
+    "related_episodes",
+)
+
+# Columns actually loaded: the program columns plus a hash of their content
+LOAD_COLUMNS = (*PROGRAM_COLUMNS, "content_hash")
+
+# Delete programs that are no longer in the dataset (also --delete-missing);
+# their conversation_sessions are deleted with them (ON DELETE CASCADE)
+DELETE_MISSING = False
+
+UPSERT_SET = """
+    title = EXCLUDED.title,
+    guest = EXCLUDED.guest,
+    air_date = EXCLUDED.air_date,
+    summary = EXCLUDED.summary,
+    book_title = EXCLUDED.book_title,
+    book_isbn = EXCLUDED.book_isbn,
+    url = EXCLUDED.url,
+    transcript = EXCLUDED.transcript,
+    related_episodes = EXCLUDED.related_episodes,
+    content_hash = EXCLUDED.content_hash,
+    updated_at = CURRENT_TIMESTAMP
+WHERE programs.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+"""
 
-def get_db_connection():
-    """Create a connection to the Neon Postgres database."""
+
+def scan_dataset(name: str) -> pl.LazyFrame:
+    """Scan a flat dataset, written either as one file or as Hive-partitioned shards."""
+    path = DATA_DIR / f"{name}.parquet"
+    if path.exists():
+        return pl.scan_parquet(path)
+    return pl.scan_parquet(DATA_DIR / name / "*" / "*.parquet", hive_partitioning=False)
+
+
+def read_dataset(name: str) -> pl.DataFrame:
+    return scan_dataset(name).collect()
+
+
+def get_database_url() -> str:
     database_url = os.environ.get("NEON_DATABASE_URL")
     if not database_url:
         raise ValueError("NEON_DATABASE_URL environment variable is required")
+    return database_url
 
-    return psycopg2.connect(database_url)
+
+def get_db_connection():
+    """Create a connection to the Neon Postgres database."""
+    return psycopg2.connect(get_database_url())
 
 
 def create_tables(conn):
@@ -44,10 +136,14 @@ def create_tables(conn):
                 url TEXT,
                 transcript JSONB,
                 related_episodes JSONB,
+                content_hash TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
 
+            -- Tables created before content hashes were tracked
+            ALTER TABLE programs ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
             CREATE INDEX IF NOT EXISTS idx_programs_guest ON programs(guest);
             CREATE INDEX IF NOT EXISTS idx_programs_air_date ON programs(air_date);
             CREATE INDEX IF NOT EXISTS idx_programs_transcript ON programs USING GIN(transcript);
@@ -65,108 +161,169 @@ def create_tables(conn):
                 BEFORE UPDATE ON programs
                 FOR EACH ROW
                 EXECUTE FUNCTION update_updated_at_column();
+
+            -- Episode list columns only, so listing never reads the JSONB columns
+            CREATE MATERIALIZED VIEW IF NOT EXISTS program_list AS
+                SELECT id, title, guest, air_date, summary, book_title
+                FROM programs;
+
+            -- The unique index is required by REFRESH ... CONCURRENTLY
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_program_list_id ON program_list(id);
+            CREATE INDEX IF NOT EXISTS idx_program_list_air_date ON program_list(air_date DESC);
         """)
         conn.commit()
 
 
-def build_transcript_json(transcripts_df: pl.DataFrame) -> dict[str, list]:
+def refresh_program_list(conn):
     """
-    Build a dict mapping program_id -> transcript JSONB array.
+    Rebuild the `program_list` view from `programs`.
 
-    Returns:
-        Dict of program_id -> [{"speaker": "...", "text": "..."}, ...]
+    The concurrent refresh diffs the view against the table and applies the
+    changes in one transaction, so readers are never blocked and see either
+    the previous list or the new one.
     """
-    # Group by program_id, sort by sequence, and build the JSON structure
-    transcripts_by_program = {}
-
-    for program_id in transcripts_df["program_id"].unique().to_list():
-        program_transcripts = (
-            transcripts_df.filter(pl.col("program_id") == program_id)
-            .sort("sequence")
-            .select(["speaker_name", "text"])
-        )
+    with conn.cursor() as cur:
+        cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY program_list")
+    conn.commit()
 
-        transcript_list = [
-            {"speaker": row["speaker_name"], "text": row["text"]}
-            for row in program_transcripts.to_dicts()
-        ]
-        transcripts_by_program[program_id] = transcript_list
 
-    return transcripts_by_program
+def build_transcript_json(transcripts_df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Build the transcript JSONB array of every program in one group-by pass.
+
+    Returns:
+        DataFrame of program_id, transcript (JSON-encoded
+        [{"speaker": "...", "text": "..."}, ...], in sequence order)
+    """
+    return (
+        transcripts_df.sort("program_id", "sequence")
+        .group_by("program_id", maintain_order=True)
+        .agg(
+            pl.format(
+                "[{}]",
+                pl.struct(speaker=pl.col("speaker_name"), text=pl.col("text"))
+                .struct.json_encode()
+                .str.join(","),
+            ).alias("transcript")
+        )
+    )
 
 
-def build_related_episodes_json(related_df: pl.DataFrame) -> dict[str, list]:
+def build_related_episodes_json(related_df: pl.DataFrame) -> pl.DataFrame:
     """
-    Build a dict mapping program_id -> related episodes JSONB array.
+    Build the related episodes JSONB array of every program in one group-by pass.
 
     Returns:
-        Dict of program_id -> [{"id": "...", "title": "...", "guest": "..."}, ...]
+        DataFrame of program_id, related_episodes (JSON-encoded
+        [{"id": "...", "title": "...", "guest": "..."}, ...])
     """
-    related_by_program = {}
-
-    for program_id in related_df["program_id"].unique().to_list():
-        related_items = related_df.filter(pl.col("program_id") == program_id).select(
-            ["related_id", "title", "guest"]
+    return related_df.group_by("program_id", maintain_order=True).agg(
+        pl.format(
+            "[{}]",
+            pl.struct(
+                id=pl.col("related_id"), title=pl.col("title"), guest=pl.col("guest")
+            )
+            .struct.json_encode()
+            .str.join(","),
+        ).alias("related_episodes")
+    )
+
+
+def content_hashes(rows: pl.DataFrame) -> pl.Series:
+    """SHA-256 of every row's normalized content: the `PROGRAM_COLUMNS` as
+    text (dates in ISO format, JSONB payloads as encoded), separated by a
+    unit separator, with NULL distinct from an empty string."""
+    normalized = rows.select(
+        pl.concat_str(
+            [
+                pl.col(column).cast(pl.String).fill_null("\x00")
+                for column in PROGRAM_COLUMNS
+            ],
+            separator="\x1f",
         )
+    ).to_series()
+    return pl.Series(
+        "content_hash",
+        [hashlib.sha256(value.encode()).hexdigest() for value in normalized],
+        dtype=pl.String,
+    )
+
+
+def build_program_rows(
+    programs_df: pl.DataFrame, transcripts: pl.DataFrame, related: pl.DataFrame
+) -> pl.DataFrame:
+    """Rows of the programs table (`LOAD_COLUMNS`), with the pre-encoded JSONB
+    payloads attached (programs without any get an empty array)."""
+    rows = (
+        programs_df.join(transcripts, on="program_id", how="left")
+        .join(related, on="program_id", how="left")
+        .select(
+            pl.col("program_id").alias("id"),
+            "title",
+            "guest",
+            pl.col("air_date").cast(pl.Date),
+            pl.col("description").alias("summary"),
+            pl.col("title").alias("book_title"),  # same as title in this dataset
+            "book_isbn",
+            "url",
+            pl.col("transcript").fill_null("[]"),
+            pl.col("related_episodes").fill_null("[]"),
+        )
+    )
+    return rows.with_columns(content_hashes(rows))
 
-        related_list = [
-            {"id": row["related_id"], "title": row["title"], "guest": row["guest"]}
-            for row in related_items.to_dicts()
-        ]
-        related_by_program[program_id] = related_list
 
-    return related_by_program
+def fetch_content_hashes(conn) -> dict[str, str | None]:
+    """Content hash of every program already in the database, by id."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, content_hash FROM programs")
+        return dict(cur.fetchall())
+
+
+def changed_rows(
+    rows: pl.DataFrame, existing_hashes: dict[str, str | None]
+) -> pl.DataFrame:
+    """Rows that are new or whose content hash differs from the database's."""
+    return rows.filter(
+        [
+            existing_hashes.get(program_id, "") != content_hash
+            for program_id, content_hash in zip(rows["id"], rows["content_hash"])
+        ]
+    )
 
 
-def load_programs(conn, programs_df: pl.DataFrame, transcripts: dict, related: dict):
-    """Load all program data into the database."""
+def delete_missing_programs(conn, program_ids: set[str], existing_hashes: dict) -> int:
+    """Delete programs that are in the database but not in the dataset."""
+    missing_ids = sorted(existing_hashes.keys() - program_ids)
+    if missing_ids:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM programs WHERE id = ANY(%s)", (missing_ids,))
+        conn.commit()
+    return len(missing_ids)
 
-    rows = []
-    for program in programs_df.to_dicts():
-        program_id = program["program_id"]
 
-        # Get air_date as date string or None
-        air_date = None
-        if program["air_date"]:
-            air_date = (
-                program["air_date"].date()
-                if hasattr(program["air_date"], "date")
-                else program["air_date"]
-            )
+def load_programs(
+    conn,
+    programs_df: pl.DataFrame,
+    transcripts: pl.DataFrame,
+    related: pl.DataFrame,
+    existing_hashes: dict[str, str | None],
+):
+    """Load new and changed programs into the database."""
 
-        rows.append(
-            (
-                program_id,
-                program["title"],
-                program["guest"],
-                air_date,
-                program["description"],
-                program["title"],  # book_title is same as title in this dataset
-                program["book_isbn"],
-                program["url"],
-                json.dumps(transcripts.get(program_id, [])),
-                json.dumps(related.get(program_id, [])),
-            )
-        )
+    all_rows = build_program_rows(programs_df, transcripts, related)
+    rows = changed_rows(all_rows, existing_hashes).rows()
+    print(f"Skipping {len(all_rows) - len(rows)} unchanged programs")
+    if not rows:
+        return
 
     with conn.cursor() as cur:
         execute_values(
             cur,
-            """
-            INSERT INTO programs (id, title, guest, air_date, summary, book_title,
-                                  book_isbn, url, transcript, related_episodes)
+            f"""
+            INSERT INTO programs ({", ".join(LOAD_COLUMNS)})
             VALUES %s
-            ON CONFLICT (id) DO UPDATE SET
-                title = EXCLUDED.title,
-                guest = EXCLUDED.guest,
-                air_date = EXCLUDED.air_date,
-                summary = EXCLUDED.summary,
-                book_title = EXCLUDED.book_title,
-                book_isbn = EXCLUDED.book_isbn,
-                url = EXCLUDED.url,
-                transcript = EXCLUDED.transcript,
-                related_episodes = EXCLUDED.related_episodes,
-                updated_at = CURRENT_TIMESTAMP
+            ON CONFLICT (id) DO UPDATE SET {UPSERT_SET}
             """,
             rows,
         )
@@ -175,28 +332,176 @@ def load_programs(conn, programs_df: pl.DataFrame, transcripts: dict, related: d
     print(f"Loaded {len(rows)} programs")
 
 
-def main():
-    # Load parquet files
-    print("Loading parquet files...")
-    programs_df = pl.read_parquet(DATA_DIR / "programs.parquet")
-    transcripts_df = pl.read_parquet(DATA_DIR / "transcripts.parquet")
-    related_df = pl.read_parquet(DATA_DIR / "related_items.parquet")
+class ChunkStats(NamedTuple):
+    program_ids: list[str]
+    rows: int  # new or changed programs copied and merged
+    unchanged: int  # programs skipped (same content hash)
+    bytes: int
+    attempts: int
+
 
-    print(f"  Programs: {len(programs_df)} rows")
-    print(f"  Transcripts: {len(transcripts_df)} rows")
-    print(f"  Related items: {len(related_df)} rows")
+def program_chunks(batch_size: int) -> list[list[str]]:
+    """Program ids to load, `batch_size` at a time."""
+    program_ids = [
+        program_id
+        for program_id in scan_dataset("programs")
+        .select("program_id")
+        .collect()["program_id"]
+    ]
+    return [
+        program_ids[offset : offset + batch_size]
+        for offset in range(0, len(program_ids), batch_size)
+    ]
 
-    # Build JSONB structures
-    print("\nBuilding transcript JSON...")
-    transcripts = build_transcript_json(transcripts_df)
-    print(f"  Built transcripts for {len(transcripts)} programs")
 
-    print("\nBuilding related episodes JSON...")
-    related = build_related_episodes_json(related_df)
-    print(f"  Built related episodes for {len(related)} programs")
+def build_chunk_rows(program_ids: list[str]) -> pl.DataFrame:
+    """Rows of the programs table for a chunk of programs.
 
+    Only reads the transcript and related rows of the chunk's programs (the
+    datasets are sorted by program id, so Parquet statistics skip the other
+    row groups).
+    """
+    in_chunk = pl.col("program_id").is_in(program_ids)
+    return build_program_rows(
+        scan_dataset("programs").filter(in_chunk).collect(),
+        build_transcript_json(scan_dataset("transcripts").filter(in_chunk).collect()),
+        build_related_episodes_json(
+            scan_dataset("related_items").filter(in_chunk).collect()
+        ),
+    )
+
+
+def copy_chunk(conn, buffer: io.BytesIO):
+    """COPY one encoded chunk into a staging table and merge it into `programs`,
+    in one transaction."""
+    columns = ", ".join(LOAD_COLUMNS)
+    with conn.cursor() as cur:
+        # Temporary tables are never written to the WAL; this one is private to
+        # the connection and dropped at commit
+        cur.execute(f"""
+            CREATE TEMP TABLE {STAGING_TABLE} (LIKE programs INCLUDING DEFAULTS)
+            ON COMMIT DROP
+        """)
+        buffer.seek(0)
+        cur.copy_expert(
+            f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        cur.execute(f"""
+            INSERT INTO programs ({columns})
+            SELECT {columns} FROM {STAGING_TABLE}
+            ON CONFLICT (id) DO UPDATE SET {UPSERT_SET}
+        """)
+    conn.commit()
+
+
+def load_chunk(
+    pool: ThreadedConnectionPool,
+    program_ids: list[str],
+    existing_hashes: dict[str, str | None],
+) -> ChunkStats:
+    """Build, diff and load a chunk of programs, retrying transient errors."""
+    all_rows = build_chunk_rows(program_ids)
+    rows = changed_rows(all_rows, existing_hashes)
+    unchanged = len(all_rows) - len(rows)
+    if rows.is_empty():
+        return ChunkStats(program_ids, 0, unchanged, 0, 0)
+
+    # CSV: unquoted empty fields are NULL, quoted ones empty strings
+    buffer = io.BytesIO()
+    rows.write_csv(buffer, include_header=False)
+
+    attempt = 0
+    while True:
+        attempt += 1
+        conn = None
+        try:
+            # Connecting is retried too (e.g. a serverless endpoint waking up)
+            conn = pool.getconn()
+            copy_chunk(conn, buffer)
+        except TRANSIENT_ERRORS:
+            # Drop the connection: it may be broken (the pool opens a fresh one)
+            if conn is not None:
+                pool.putconn(conn, close=True)
+            if attempt >= CHUNK_MAX_ATTEMPTS:
+                raise
+            time.sleep(
+                RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            )
+            continue
+        except BaseException:
+            if conn is not None:
+                conn.rollback()
+                pool.putconn(conn)
+            raise
+        pool.putconn(conn)
+        return ChunkStats(
+            program_ids, len(rows), unchanged, buffer.getbuffer().nbytes, attempt
+        )
+
+
+def copy_programs(
+    database_url: str,
+    existing_hashes: dict[str, str | None],
+    batch_size: int = COPY_BATCH_SIZE,
+    workers: int = LOAD_WORKERS,
+) -> list[ChunkStats]:
+    """Load new and changed programs in chunks of `batch_size`, `workers` chunks
+    at a time over a pool of connections.
+
+    Each chunk is COPYed into a staging table and merged into `programs` in
+    its own transaction, so a failed run keeps the chunks committed before it
+    (a re-run skips them as unchanged).
+    """
+    chunks = program_chunks(batch_size)
+    num_programs = sum(len(chunk) for chunk in chunks)
+    num_loaded = 0
+
+    chunk_stats = []
+    # Connections are opened on demand by the workers, which retry failed connects
+    pool = ThreadedConnectionPool(0, workers, database_url)
+    executor = ThreadPoolExecutor(workers)
+    try:
+        futures = [
+            executor.submit(load_chunk, pool, chunk, existing_hashes)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            chunk_stats.append(future.result())
+            num_loaded += len(chunk_stats[-1].program_ids)
+            print(f"  Loaded {num_loaded}/{num_programs} programs")
+    finally:
+        # On failure, don't start the remaining chunks (running ones still commit)
+        executor.shutdown(cancel_futures=True)
+        pool.closeall()
+
+    return chunk_stats
+
+
+def print_copy_report(chunk_stats: list[ChunkStats], seconds: float, workers: int):
+    rows = sum(stats.rows for stats in chunk_stats)
+    unchanged = sum(stats.unchanged for stats in chunk_stats)
+    megabytes = sum(stats.bytes for stats in chunk_stats) / 1e6
+    retries = sum(max(stats.attempts - 1, 0) for stats in chunk_stats)
+    print(
+        f"Loaded {rows} new or changed programs ({megabytes:.1f} MB) in"
+        f" {len(chunk_stats)} chunks over {workers} connections in {seconds:.2f}s;"
+        f" skipped {unchanged} unchanged"
+    )
+    print(
+        f"  Throughput: {rows / max(seconds, 1e-9):,.0f} rows/s,"
+        f" {megabytes / max(seconds, 1e-9):,.1f} MB/s"
+    )
+    print(f"  Retried chunks: {retries}")
+
+
+def main(
+    mode: str = LOAD_MODE,
+    batch_size: int = COPY_BATCH_SIZE,
+    delete_missing: bool = DELETE_MISSING,
+    workers: int = LOAD_WORKERS,
+):
     # Connect to database
-    print("\nConnecting to database...")
+    print("Connecting to database...")
     conn = get_db_connection()
 
     try:
@@ -204,9 +509,58 @@ def main():
         print("Creating tables...")
         create_tables(conn)
 
+        # Content hashes of the programs already loaded (only changes are written)
+        existing_hashes = fetch_content_hashes(conn)
+        print(f"Found {len(existing_hashes)} programs in the database")
+
+        if delete_missing:
+            dataset_ids = scan_dataset("programs").select("program_id").collect()
+            num_deleted = delete_missing_programs(
+                conn, set(dataset_ids["program_id"]), existing_hashes
+            )
+            print(f"Deleted {num_deleted} programs no longer in the dataset")
+
+        if mode == "copy":
+            # Stream chunks straight from the parquet files, in parallel
+            print(
+                f"\nCopying programs in chunks of {batch_size} ({workers} workers)..."
+            )
+            started = time.perf_counter()
+            chunk_stats = copy_programs(
+                get_database_url(), existing_hashes, batch_size, workers
+            )
+            print_copy_report(chunk_stats, time.perf_counter() - started, workers)
+
+            print("\nRefreshing program list...")
+            refresh_program_list(conn)
+            print("\nDone!")
+            return
+
+        # Load parquet files
+        print("\nLoading parquet files...")
+        programs_df = read_dataset("programs")
+        transcripts_df = read_dataset("transcripts")
+        related_df = read_dataset("related_items")
+
+        print(f"  Programs: {len(programs_df)} rows")
+        print(f"  Transcripts: {len(transcripts_df)} rows")
+        print(f"  Related items: {len(related_df)} rows")
+
+        # Build JSONB structures
+        print("\nBuilding transcript JSON...")
+        transcripts = build_transcript_json(transcripts_df)
+        print(f"  Built transcripts for {len(transcripts)} programs")
+
+        print("\nBuilding related episodes JSON...")
+        related = build_related_episodes_json(related_df)
+        print(f"  Built related episodes for {len(related)} programs")
+
         # Load data
         print("\nLoading data...")
-        load_programs(conn, programs_df, transcripts, related)
+        load_programs(conn, programs_df, transcripts, related, existing_hashes)
+
+        print("\nRefreshing program list...")
+        refresh_program_list(conn)
 
         print("\nDone!")
     finally:
@@ -214,4 +568,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("copy", "insert"), default=LOAD_MODE)
+    parser.add_argument("--batch-size", type=int, default=COPY_BATCH_SIZE)
+    parser.add_argument("--delete-missing", action="store_true", default=DELETE_MISSING)
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    args = parser.parse_args()
+    main(
+        mode=args.mode,
+        batch_size=args.batch_size,
+        delete_missing=args.delete_missing,
+        workers=args.workers,
+    )
@@ -0,0 +1,44 @@
+"""
+Shared fixtures for the loader scripts in `scripts/`.
+
+Database tests run against the Postgres instance at `DATABASE_URL` and are
+skipped when it is not set, e.g.:
+
+    DATABASE_URL=postgresql://postgres@localhost:5432/postgres python -m pytest tests
+
+Each test gets a schema of its own (dropped afterwards), so the database's
+own tables are never touched.
+"""
+
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import psycopg2
+import pytest
+from psycopg2.extensions import make_dsn
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+
+def execute(url: str, sql: str) -> None:
+    conn = psycopg2.connect(url)
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute(sql)
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def database_url():
+    """`DATABASE_URL` with its search path set to a fresh, empty schema."""
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        pytest.skip("DATABASE_URL is not set")
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    execute(url, f"CREATE SCHEMA {schema}")
+    yield make_dsn(url, options=f"-c search_path={schema}")
+    execute(url, f"DROP SCHEMA {schema} CASCADE")
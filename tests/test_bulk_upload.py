@@ -0,0 +1,174 @@
+import bulk_upload
+import polars as pl
+import psycopg2
+import pytest
+
+PROGRAMS = pl.DataFrame(
+    {
+        "program_id": ["1-1", "2-1", "3-1"],
+        "title": ["First, Book", 'A "Quoted" Title', "Third Book"],
+        "guest": ["Author One", "Author Two", "Author Three"],
+        "air_date": ["1989-04-02", "1990-01-14", None],
+        "description": ["Line one\nline two", "", None],
+        "book_isbn": ["0123456789", "", None],
+        "url": [f"https://booknotes.c-span.org/Watch/{i}-1" for i in (1, 2, 3)],
+    }
+).with_columns(pl.col("air_date").str.to_date())
+
+TRANSCRIPTS = pl.DataFrame(
+    {
+        "program_id": ["1-1", "1-1", "2-1"],
+        "sequence": [1, 0, 0],
+        "speaker_name": ["GUEST", "LAMB", None],
+        "text": ['He said, "yes"', "Welcome.", ""],
+    }
+)
+
+RELATED_ITEMS = pl.DataFrame(
+    {
+        "program_id": ["1-1"],
+        "related_id": ["2-1"],
+        "title": ['A "Quoted" Title'],
+        "guest": ["Author Two"],
+    }
+)
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    """Write flat datasets for the loader to read; returns a function that
+    (re)writes them."""
+    monkeypatch.setattr(bulk_upload, "DATA_DIR", tmp_path)
+
+    def write(programs: pl.DataFrame = PROGRAMS) -> None:
+        programs.write_parquet(tmp_path / "programs.parquet")
+        TRANSCRIPTS.write_parquet(tmp_path / "transcripts.parquet")
+        RELATED_ITEMS.write_parquet(tmp_path / "related_items.parquet")
+
+    write()
+    return write
+
+
+@pytest.fixture
+def conn(database_url):
+    conn = psycopg2.connect(database_url)
+    bulk_upload.create_tables(conn)
+    yield conn
+    conn.close()
+
+
+def load(database_url: str, conn) -> list[bulk_upload.ChunkStats]:
+    """One `copy` load, diffed against the database's content hashes."""
+    existing_hashes = bulk_upload.fetch_content_hashes(conn)
+    conn.commit()
+    return bulk_upload.copy_programs(
+        database_url, existing_hashes, batch_size=2, workers=2
+    )
+
+
+def select_programs(conn) -> dict[str, dict]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT * FROM programs")
+        columns = [column.name for column in cur.description]
+        rows = {row[0]: dict(zip(columns, row)) for row in cur.fetchall()}
+    conn.commit()
+    return rows
+
+
+def test_copy_round_trip(database_url, dataset, conn):
+    stats = load(database_url, conn)
+
+    assert sum(chunk.rows for chunk in stats) == 3
+    rows = select_programs(conn)
+    assert rows["1-1"]["title"] == "First, Book"
+    assert rows["1-1"]["summary"] == "Line one\nline two"
+    assert rows["2-1"]["title"] == 'A "Quoted" Title'
+    assert str(rows["1-1"]["air_date"]) == "1989-04-02"
+    assert rows["3-1"]["air_date"] is None
+
+    ## -- CSV: NULLs stay NULL and empty strings stay empty
+    assert rows["2-1"]["book_isbn"] == ""
+    assert rows["3-1"]["book_isbn"] is None
+    assert rows["2-1"]["summary"] == ""
+    assert rows["3-1"]["summary"] is None
+
+    ## -- JSONB payloads, in sequence order; programs without any get []
+    assert rows["1-1"]["transcript"] == [
+        {"speaker": "LAMB", "text": "Welcome."},
+        {"speaker": "GUEST", "text": 'He said, "yes"'},
+    ]
+    assert rows["2-1"]["transcript"] == [{"speaker": None, "text": ""}]
+    assert rows["3-1"]["transcript"] == []
+    assert rows["1-1"]["related_episodes"] == [
+        {"id": "2-1", "title": 'A "Quoted" Title', "guest": "Author Two"}
+    ]
+    assert rows["2-1"]["related_episodes"] == []
+
+    ## -- the stored hashes are those of the rows as built from the dataset
+    built = bulk_upload.build_chunk_rows(["1-1", "2-1", "3-1"])
+    assert {row["id"]: row["content_hash"] for row in rows.values()} == dict(
+        zip(built["id"], built["content_hash"])
+    )
+
+    bulk_upload.refresh_program_list(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM program_list")
+        assert cur.fetchone()[0] == 3
+
+
+def test_transient_errors_are_retried(database_url, dataset, conn, monkeypatch):
+    monkeypatch.setattr(bulk_upload, "RETRY_BACKOFF_SECONDS", 0.0)
+    copy_chunk = bulk_upload.copy_chunk
+    calls = []
+
+    def flaky_copy_chunk(chunk_conn, buffer):
+        calls.append(buffer)
+        ## -- the first attempt at every chunk loses its connection mid-transaction
+        if calls.count(buffer) == 1:
+            chunk_conn.close()
+        copy_chunk(chunk_conn, buffer)
+
+    monkeypatch.setattr(bulk_upload, "copy_chunk", flaky_copy_chunk)
+
+    stats = load(database_url, conn)
+
+    assert [chunk.attempts for chunk in stats] == [2, 2]
+    assert len(select_programs(conn)) == 3
+
+
+def row_versions(conn) -> dict[str, str]:
+    """Transaction id that last wrote every row (changes only when it is updated)."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, xmin::text FROM programs")
+        versions = dict(cur.fetchall())
+    conn.commit()
+    return versions
+
+
+def test_reload_only_writes_changed_rows(database_url, dataset, conn):
+    load(database_url, conn)
+    versions = row_versions(conn)
+
+    ## -- unchanged: every program is skipped client-side...
+    stats = load(database_url, conn)
+    assert sum(chunk.rows for chunk in stats) == 0
+    assert sum(chunk.unchanged for chunk in stats) == 3
+    ## -- ...and the upsert itself leaves equal rows alone (e.g. without the diff)
+    bulk_upload.copy_programs(database_url, {}, batch_size=2, workers=2)
+    assert row_versions(conn) == versions
+
+    ## -- one edited field updates exactly that program
+    dataset(
+        PROGRAMS.with_columns(
+            book_isbn=pl.when(pl.col("program_id") == "3-1")
+            .then(pl.lit(""))
+            .otherwise("book_isbn")
+        )
+    )
+    stats = load(database_url, conn)
+
+    assert sum(chunk.rows for chunk in stats) == 1
+    assert sum(chunk.unchanged for chunk in stats) == 2
+    new_versions = row_versions(conn)
+    assert [id for id in versions if new_versions[id] != versions[id]] == ["3-1"]
+    assert select_programs(conn)["3-1"]["book_isbn"] == ""